@@ -333,7 +333,7 @@ class GroupDetailsEndpoint(GroupEndpoint):
             ]
         ).update(status=GroupStatus.PENDING_DELETION)
         if updated:
-            GroupHash.objects.filter(group=group).delete()
+            GroupHash.objects.delete_for_groups([group.id])
             delete_group.apply_async(
                 kwargs={'object_id': group.id},
                 countdown=3600,
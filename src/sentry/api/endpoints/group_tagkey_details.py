@@ -63,9 +63,9 @@ class GroupTagKeyDetailsEndpoint(GroupEndpoint):
         except GroupTagKey.DoesNotExist:
             raise ResourceDoesNotExist
 
-        total_values = GroupTagValue.get_value_count(group.id, lookup_key)
-
-        top_values = GroupTagValue.get_top_values(group.id, lookup_key, limit=9)
+        total_values, top_values = GroupTagValue.get_tag_summary(
+            group.id, [lookup_key], limit=9,
+        )[lookup_key]
 
         data = {
             'id': six.text_type(tag_key.id),
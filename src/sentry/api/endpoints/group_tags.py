@@ -20,12 +20,15 @@ class GroupTagsEndpoint(GroupEndpoint):
             ).values('key'),
         )
 
-        # O(N) db access
+        tag_keys = list(tag_keys)
+        summary = GroupTagValue.get_tag_summary(
+            group.id, [tag_key.key for tag_key in tag_keys], limit=10,
+        )
+
         data = []
         all_top_values = []
         for tag_key in tag_keys:
-            total_values = GroupTagValue.get_value_count(group.id, tag_key.key)
-            top_values = GroupTagValue.get_top_values(group.id, tag_key.key, limit=10)
+            total_values, top_values = summary[tag_key.key]
 
             all_top_values.extend(top_values)
 
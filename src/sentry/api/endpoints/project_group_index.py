@@ -698,7 +698,7 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
                 GroupStatus.DELETION_IN_PROGRESS,
             ]
         ).update(status=GroupStatus.PENDING_DELETION)
-        GroupHash.objects.filter(group__id__in=group_ids).delete()
+        GroupHash.objects.delete_for_groups(group_ids)
         for group in group_list:
             delete_group.apply_async(
                 kwargs={'object_id': group.id},
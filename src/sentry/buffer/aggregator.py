@@ -0,0 +1,238 @@
+"""
+sentry.buffer.aggregator
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+import six
+import threading
+
+from collections import OrderedDict
+from time import time
+
+from sentry.utils import metrics
+from sentry.utils.background import BackgroundService
+
+logger = logging.getLogger(__name__)
+
+
+class Aggregator(BackgroundService):
+    """
+    Base class for worker-local aggregation of writes.
+
+    Pending items are handed to ``flush_func`` once ``max_size`` of them
+    are pending or ``interval`` seconds have passed since the last flush
+    (from a background thread if nothing else is added). Anything still
+    pending is flushed when the worker shuts down.
+    """
+    def __init__(self, flush_func, interval=1, max_size=1000):
+        super(Aggregator, self).__init__()
+        self.flush_func = flush_func
+        self.interval = interval
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.pending = self.new_pending()
+        self.last_flush = time()
+
+    def new_pending(self):
+        raise NotImplementedError
+
+    def _start(self):
+        # anything pending after a fork is the parent process' to write
+        self.pending = self.new_pending()
+        self.lock = threading.Lock()
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if time() - self.last_flush >= self.interval:
+                self.flush()
+
+    def _should_flush(self):
+        # needs to be called with the lock held
+        return (
+            len(self.pending) >= self.max_size or
+            time() - self.last_flush >= self.interval
+        )
+
+    def _take_pending(self):
+        with self.lock:
+            pending, self.pending = self.pending, self.new_pending()
+            self.last_flush = time()
+        return pending
+
+    def shutdown(self):
+        """
+        Stops the background flusher and writes out anything still pending.
+        """
+        super(Aggregator, self).shutdown()
+        self.flush()
+
+    def flush(self):
+        raise NotImplementedError
+
+
+class IncrAggregator(Aggregator):
+    """
+    Worker-local aggregation of buffer increments.
+
+    Increments for the same key are merged in memory (counters are summed,
+    extra values are last write wins) and handed to ``flush_func`` as a list
+    of ``(model, columns, filters, extra)`` tuples once ``max_keys`` distinct
+    keys are pending or ``interval`` seconds have passed since the last
+    flush. Anything still pending is flushed when the worker shuts down.
+
+    When ``flush_func`` fails the increments are merged back into the
+    pending ones to be retried with the next flush, dropping the oldest keys
+    beyond ``max_keys``.
+
+    >>> aggregator = IncrAggregator(buffer.incr_many, buffer._make_key)
+    >>> aggregator.add(Group, {'times_seen': 1}, {'pk': 1})
+    """
+    def __init__(self, flush_func, make_key, interval=1, max_keys=1000):
+        self.make_key = make_key
+        self.coalesced = 0
+        super(IncrAggregator, self).__init__(
+            flush_func, interval=interval, max_size=max_keys)
+
+    def new_pending(self):
+        return OrderedDict()
+
+    def _merge(self, pending, key, model, columns, filters, extra):
+        # needs to be called with the lock held, returns whether the key was
+        # already pending
+        item = pending.get(key)
+        if item is None:
+            pending[key] = (model, dict(columns), filters, dict(extra or {}))
+            return False
+
+        for column, amount in six.iteritems(columns):
+            item[1][column] = item[1].get(column, 0) + amount
+        if extra:
+            item[3].update(extra)
+        return True
+
+    def add(self, model, columns, filters, extra=None):
+        self._ensure_started()
+
+        key = self.make_key(model, filters)
+        with self.lock:
+            if self._merge(self.pending, key, model, columns, filters, extra):
+                self.coalesced += 1
+            should_flush = self._should_flush()
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            coalesced, self.coalesced = self.coalesced, 0
+        pending = self._take_pending()
+
+        if not pending:
+            return
+
+        metrics.timing('buffer.aggregator.flush-size', len(pending))
+        if coalesced:
+            metrics.incr('buffer.aggregator.coalesced', amount=coalesced)
+        try:
+            self.flush_func([
+                (model, columns, filters, extra or None)
+                for model, columns, filters, extra in six.itervalues(pending)
+            ])
+        except Exception:
+            logger.exception('buffer.aggregator.flush-failed')
+            self._requeue(pending)
+
+    def _requeue(self, failed):
+        # the failed increments are older than anything added since, so
+        # they go first and newer extra values still win
+        with self.lock:
+            for key, item in six.iteritems(self.pending):
+                self._merge(failed, key, *item)
+            dropped = 0
+            while len(failed) > self.max_size:
+                failed.popitem(last=False)
+                dropped += 1
+            self.pending = failed
+
+        if dropped:
+            logger.warning('buffer.aggregator.dropped', extra={
+                'count': dropped,
+            })
+            metrics.incr('buffer.aggregator.dropped', amount=dropped)
+
+
+class BatchAggregator(Aggregator):
+    """
+    Worker-local batching of items, which are handed to ``flush_func`` as a
+    list once ``max_size`` of them are pending or ``interval`` seconds have
+    passed since the last flush.
+
+    When ``flush_func`` fails the items are put back in front of the pending
+    ones to be retried with the next flush, dropping the oldest items beyond
+    ``max_size``.
+
+    >>> aggregator = BatchAggregator(write_rows, 'rows')
+    >>> aggregator.add(row)
+    """
+    def __init__(self, flush_func, name, interval=1, max_size=100):
+        self.name = name
+        super(BatchAggregator, self).__init__(
+            flush_func, interval=interval, max_size=max_size)
+
+    def new_pending(self):
+        return []
+
+    def add(self, item):
+        self._ensure_started()
+
+        with self.lock:
+            self.pending.append(item)
+            should_flush = self._should_flush()
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        pending = self._take_pending()
+        if not pending:
+            return
+
+        metrics.timing('aggregator.flush-size', len(pending), tags={
+            'name': self.name,
+        })
+        try:
+            self.flush_func(pending)
+        except Exception:
+            logger.exception('aggregator.flush-failed', extra={
+                'aggregator': self.name,
+            })
+            self._requeue(pending)
+
+    def _requeue(self, failed):
+        with self.lock:
+            pending = failed + self.pending
+            dropped = max(len(pending) - self.max_size, 0)
+            self.pending = pending[dropped:]
+
+        if dropped:
+            logger.warning('aggregator.dropped', extra={
+                'aggregator': self.name,
+                'count': dropped,
+            })
+            metrics.incr('aggregator.dropped', amount=dropped, tags={
+                'name': self.name,
+            })
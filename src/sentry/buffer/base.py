@@ -10,9 +10,11 @@ from __future__ import absolute_import
 import logging
 import six
 
+from collections import defaultdict
 from django.db.models import F
 
-from sentry.signals import buffer_incr_complete
+from sentry.db.models.query import bulk_increment
+from sentry.signals import buffer_batch_complete, buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
 
 
@@ -61,6 +63,15 @@ class Buffer(object):
         return []
 
     def process(self, model, columns, filters, extra=None):
+        self._process(model, columns, filters, extra)
+
+        buffer_batch_complete.send_robust(
+            model=model,
+            batch=[(columns, filters, extra)],
+            sender=model,
+        )
+
+    def _process(self, model, columns, filters, extra=None):
         update_kwargs = dict((c, F(c) + v) for c, v in six.iteritems(columns))
         if extra:
             update_kwargs.update(extra)
@@ -78,3 +89,46 @@ class Buffer(object):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, model, batch):
+        """
+        Applies a batch of ``(columns, filters, extra)`` increments for
+        ``model``.
+
+        Rows which share the same columns are updated with a single statement
+        where the database supports it, and anything else (i.e. rows which do
+        not exist yet) goes through ``Buffer.process`` one by one.
+
+        ``buffer_incr_complete`` is sent for every row, and
+        ``buffer_batch_complete`` once for the whole batch.
+        """
+        shapes = defaultdict(list)
+        for columns, filters, extra in batch:
+            shape = (
+                tuple(sorted(columns)),
+                tuple(sorted(filters)),
+                tuple(sorted(extra or ())),
+            )
+            shapes[shape].append((columns, filters, extra))
+
+        for rows in six.itervalues(shapes):
+            pending = set(bulk_increment(model, rows))
+            for idx, (columns, filters, extra) in enumerate(rows):
+                if idx in pending:
+                    self._process(model, columns, filters, extra)
+                    continue
+
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+        buffer_batch_complete.send_robust(
+            model=model,
+            batch=batch,
+            sender=model,
+        )
@@ -0,0 +1,160 @@
+"""
+sentry.buffer.codecs
+~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import msgpack
+import pytz
+import struct
+import threading
+
+from datetime import datetime, timedelta
+from django.db import models
+from django.utils.functional import SimpleLazyObject
+
+from sentry.utils.compat import pickle
+
+EPOCH = datetime(1970, 1, 1)
+
+# extension type codes used by ``MsgpackCodec``
+DATETIME_EXT = 1
+AWARE_DATETIME_EXT = 2
+SCORE_CLAUSE_EXT = 3
+
+# seconds and microseconds since the epoch
+DATETIME_STRUCT = struct.Struct('>qI')
+
+
+class Codec(object):
+    def encode(self, value):
+        raise NotImplementedError
+
+    def decode(self, value):
+        raise NotImplementedError
+
+
+class PickleCodec(Codec):
+    def encode(self, value):
+        return pickle.dumps(value)
+
+    def decode(self, value):
+        return pickle.loads(value)
+
+
+def _encode_datetime(value):
+    delta = value - EPOCH
+    return DATETIME_STRUCT.pack(delta.days * 86400 + delta.seconds, delta.microseconds)
+
+
+def _decode_datetime(data):
+    seconds, microseconds = DATETIME_STRUCT.unpack(data)
+    return EPOCH + timedelta(seconds=seconds, microseconds=microseconds)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return msgpack.ExtType(DATETIME_EXT, _encode_datetime(value))
+        value = value.astimezone(pytz.utc).replace(tzinfo=None)
+        return msgpack.ExtType(AWARE_DATETIME_EXT, _encode_datetime(value))
+    # Model references are stored by primary key, which is what the buffer
+    # keys are built from as well
+    if isinstance(value, models.Model):
+        return value.pk
+
+    from sentry.event_manager import ScoreClause
+    if isinstance(value, ScoreClause):
+        # only what ``Group.get_score`` needs when the score can't be
+        # calculated by the database
+        group = value.group
+        return msgpack.ExtType(SCORE_CLAUSE_EXT, msgpack.packb(
+            [group.id, group.times_seen, group.last_seen],
+            use_bin_type=True, default=_default,
+        ))
+    raise TypeError('Cannot encode %r' % (value,))
+
+
+def _decode_score_clause(data):
+    from sentry.event_manager import ScoreClause
+    from sentry.models import Group
+
+    group_id, times_seen, last_seen = _unpackb(data)
+    # the group is only needed when the score is calculated in Python
+    return ScoreClause(SimpleLazyObject(lambda: Group(
+        id=group_id, times_seen=times_seen, last_seen=last_seen,
+    )))
+
+
+def _ext_hook(code, data):
+    if code == DATETIME_EXT:
+        return _decode_datetime(data)
+    elif code == AWARE_DATETIME_EXT:
+        return _decode_datetime(data).replace(tzinfo=pytz.utc)
+    elif code == SCORE_CLAUSE_EXT:
+        return _decode_score_clause(data)
+    return msgpack.ExtType(code, data)
+
+
+def _unpackb(value):
+    return msgpack.unpackb(value, encoding='utf-8', ext_hook=_ext_hook)
+
+
+class MsgpackCodec(Codec):
+    """
+    Encodes values with msgpack, with support for (naive and timezone aware)
+    datetimes and Group's ``ScoreClause``. Byte strings and text are kept
+    distinct. Model instances are encoded as their primary key, and anything
+    else raises a ``TypeError``.
+    """
+    def __init__(self):
+        # packers keep an internal buffer, so they can't be shared across
+        # threads
+        self.local = threading.local()
+
+    def encode(self, value):
+        packer = getattr(self.local, 'packer', None)
+        if packer is None:
+            packer = self.local.packer = msgpack.Packer(use_bin_type=True, default=_default)
+        try:
+            return packer.pack(value)
+        except Exception:
+            # the packer's buffer isn't reset when packing fails, so it can't
+            # be used again
+            self.local.packer = None
+            raise
+
+    def decode(self, value):
+        return _unpackb(value)
+
+
+class VersionedCodec(Codec):
+    """
+    Prefixes encoded payloads with a version marker, so that payloads
+    written with an older format can still be read.
+
+    Payloads without the marker are decoded with pickle, which is what the
+    Redis buffer used previously (pickle's output never starts with the
+    marker.)  Once no such payloads are left this can be turned off with the
+    ``legacy`` option, after which they are rejected.
+    """
+    marker = b'\x01'
+
+    def __init__(self, codec=None, legacy=True):
+        self.codec = codec or MsgpackCodec()
+        if legacy is True:
+            legacy = PickleCodec()
+        self.legacy = legacy or None
+
+    def encode(self, value):
+        return self.marker + self.codec.encode(value)
+
+    def decode(self, value):
+        if value[:1] == self.marker:
+            return self.codec.decode(value[1:])
+        if self.legacy is None:
+            raise ValueError('Unversioned payloads are not accepted')
+        return self.legacy.decode(value)
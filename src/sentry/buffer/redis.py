@@ -9,27 +9,62 @@ from __future__ import absolute_import
 
 import six
 
+from collections import defaultdict
 from time import time
 
 from django.db import models
 from django.utils.encoding import force_bytes
 
 from sentry.buffer import Buffer
+from sentry.buffer.aggregator import IncrAggregator
 from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr
 from sentry.utils import metrics
-from sentry.utils.compat import pickle
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
 from sentry.utils.redis import get_cluster_from_options
 
 
+DEFAULT_CODEC = {
+    'path': 'sentry.buffer.codecs.VersionedCodec',
+}
+
+
 class RedisBuffer(Buffer):
+    """
+    Stores pending increments in Redis hashes, which are flushed to the
+    database by ``process_pending``.
+
+    When ``incr_batch_size`` is greater than one, pending keys are flushed in
+    chunks of that size (per Redis host) with a single task each, and the
+    increments of a chunk are applied with one statement per model instead of
+    one per key.
+
+    When ``local_flush_interval`` is set, increments are first merged in
+    memory by each worker and written to Redis at most every that many
+    seconds (or once ``local_max_keys`` distinct keys are pending).
+
+    Filters and extra values are serialized with ``codec`` (msgpack by
+    default, while entries written with pickle by older versions can still be
+    read.)
+    """
     key_expire = 60 * 60  # 1 hour
     pending_key = 'b:p'
 
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_BUFFER_OPTIONS', options)
+        self.incr_batch_size = options.get('incr_batch_size', 1)
+        codec = options.get('codec', DEFAULT_CODEC)
+        self.codec = import_string(codec['path'])(**codec.get('options', {}))
+        if options.get('local_flush_interval'):
+            self.aggregator = IncrAggregator(
+                self.incr_many,
+                self._make_key,
+                interval=options['local_flush_interval'],
+                max_keys=options.get('local_max_keys', 1000),
+            )
+        else:
+            self.aggregator = None
 
     def validate(self):
         try:
@@ -67,25 +102,41 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
         - Add hashmap key to pending flushes
         """
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
-        key = self._make_key(model, filters)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis shard)
-        conn = self.cluster.get_local_client_for_key(key)
-
-        pipe = conn.pipeline()
-        pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
-        pipe.hsetnx(key, 'f', pickle.dumps(filters))
-        for column, amount in six.iteritems(columns):
-            pipe.hincrby(key, 'i+' + column, amount)
-
-        if extra:
-            for column, value in six.iteritems(extra):
-                pipe.hset(key, 'e+' + column, pickle.dumps(value))
-        pipe.expire(key, self.key_expire)
-        pipe.zadd(self.pending_key, time(), key)
-        pipe.execute()
+        if self.aggregator is not None:
+            self.aggregator.add(model, columns, filters, extra)
+        else:
+            self.incr_many([(model, columns, filters, extra)])
+
+    def incr_many(self, items):
+        """
+        Writes a list of ``(model, columns, filters, extra)`` increments with a
+        single pipeline per Redis host.
+        """
+        router = self.cluster.get_router()
+        pipes = {}
+        now = time()
+        for model, columns, filters, extra in items:
+            key = self._make_key(model, filters)
+            # We can't use conn.map() due to wanting to support multiple pending
+            # keys (one per Redis shard)
+            host_id = router.get_host_for_key(key)
+            pipe = pipes.get(host_id)
+            if pipe is None:
+                pipe = pipes[host_id] = self.cluster.get_local_client(host_id).pipeline()
+
+            pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
+            pipe.hsetnx(key, 'f', self.codec.encode(filters))
+            for column, amount in six.iteritems(columns):
+                pipe.hincrby(key, 'i+' + column, amount)
+
+            if extra:
+                for column, value in six.iteritems(extra):
+                    pipe.hset(key, 'e+' + column, self.codec.encode(value))
+            pipe.expire(key, self.key_expire)
+            pipe.zadd(self.pending_key, now, key)
+
+        for pipe in six.itervalues(pipes):
+            pipe.execute()
 
     def process_pending(self):
         client = self.cluster.get_routing_client()
@@ -104,16 +155,39 @@ class RedisBuffer(Buffer):
                     if not keys:
                         continue
                     keycount += len(keys)
-                    for key in keys:
-                        process_incr.apply_async(kwargs={
-                            'key': key,
-                        })
+                    if self.incr_batch_size > 1:
+                        for idx in range(0, len(keys), self.incr_batch_size):
+                            process_incr.apply_async(kwargs={
+                                'batch_keys': keys[idx:idx + self.incr_batch_size],
+                            })
+                    else:
+                        for key in keys:
+                            process_incr.apply_async(kwargs={
+                                'key': key,
+                            })
                     conn.target([host_id]).zrem(self.pending_key, *keys)
             metrics.timing('buffer.pending-size', keycount)
         finally:
             client.delete(lock_key)
 
-    def process(self, key):
+    def _decode_values(self, values):
+        model = import_string(values['m'])
+        filters = self.codec.decode(values['f'])
+        incr_values = {}
+        extra_values = {}
+        for k, v in six.iteritems(values):
+            if k.startswith('i+'):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith('e+'):
+                extra_values[k[2:]] = self.codec.decode(v)
+        return model, incr_values, filters, extra_values
+
+    def process(self, key=None, batch_keys=None):
+        assert (key is None) != (batch_keys is None)
+
+        if batch_keys is not None:
+            return self.process_batch_keys(batch_keys)
+
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
         # prevent a stampede due to the way we use celery etas + duplicate
@@ -136,16 +210,64 @@ class RedisBuffer(Buffer):
                 self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
                 return
 
-            model = import_string(values['m'])
-            filters = pickle.loads(values['f'])
-            incr_values = {}
-            extra_values = {}
-            for k, v in six.iteritems(values):
-                if k.startswith('i+'):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith('e+'):
-                    extra_values[k[2:]] = pickle.loads(v)
-
+            model, incr_values, filters, extra_values = self._decode_values(values)
             super(RedisBuffer, self).process(model, incr_values, filters, extra_values)
         finally:
             client.delete(lock_key)
+
+    def process_batch_keys(self, keys):
+        """
+        Flushes a chunk of pending keys, grouping the increments by model so
+        each model is written with as few statements as possible.
+        """
+        start = time()
+        router = self.cluster.get_router()
+
+        keys_by_host = defaultdict(list)
+        for key in keys:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+
+        batches = defaultdict(list)
+        for host_id, host_keys in six.iteritems(keys_by_host):
+            conn = self.cluster.get_local_client(host_id)
+            # prevent a stampede due to the way we use celery etas + duplicate
+            # tasks
+            pipe = conn.pipeline()
+            for key in host_keys:
+                pipe.set(self._make_lock_key(key), '1', nx=True, ex=10)
+            locked_keys = []
+            for key, locked in zip(host_keys, pipe.execute()):
+                if locked:
+                    locked_keys.append(key)
+                else:
+                    metrics.incr('buffer.revoked', tags={'reason': 'locked'})
+                    self.logger.debug('buffer.revoked.locked', extra={'redis_key': key})
+
+            if not locked_keys:
+                continue
+
+            try:
+                pipe = conn.pipeline()
+                for key in locked_keys:
+                    pipe.hgetall(key)
+                pipe.zrem(self.pending_key, *locked_keys)
+                pipe.delete(*locked_keys)
+                results = pipe.execute()[:len(locked_keys)]
+            finally:
+                conn.delete(*[self._make_lock_key(k) for k in locked_keys])
+
+            for key, values in zip(locked_keys, results):
+                if not values:
+                    metrics.incr('buffer.revoked', tags={'reason': 'empty'})
+                    self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
+                    continue
+                model, incr_values, filters, extra_values = self._decode_values(values)
+                batches[model].append((incr_values, filters, extra_values))
+
+        for model, batch in six.iteritems(batches):
+            metrics.timing('buffer.batch-size', len(batch), tags={
+                'model': model.__name__,
+            })
+            self.process_batch(model, batch)
+
+        metrics.timing('buffer.batch-latency', time() - start)
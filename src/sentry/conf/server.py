@@ -867,6 +867,15 @@ SENTRY_SEARCH_OPTIONS = {}
 #     'timeout': 5,
 # }
 
+# Tag index backend, which keeps track of the most frequently seen tag values
+# of each group as events come in
+SENTRY_TAG_INDEX = 'sentry.tagindex.base.TagIndex'
+SENTRY_TAG_INDEX_OPTIONS = {}
+# SENTRY_TAG_INDEX = 'sentry.tagindex.redis.RedisTagIndex'
+# SENTRY_TAG_INDEX_OPTIONS = {
+#     'capacity': 100,
+# }
+
 # Time-series storage backend
 SENTRY_TSDB = 'sentry.tsdb.dummy.DummyTSDB'
 SENTRY_TSDB_OPTIONS = {}
@@ -884,6 +893,12 @@ SENTRY_METRICS_BACKEND = 'sentry.metrics.dummy.DummyMetricsBackend'
 SENTRY_METRICS_OPTIONS = {}
 SENTRY_METRICS_SAMPLE_RATE = 1.0
 SENTRY_METRICS_PREFIX = 'sentry.'
+# Metrics are aggregated in a background thread of each process and written
+# every this many seconds. Up to ``SENTRY_METRICS_QUEUE_SIZE`` metrics are
+# queued for it, further ones are dropped. Set to 0 to write every metric
+# right away.
+SENTRY_METRICS_FLUSH_INTERVAL = 10
+SENTRY_METRICS_QUEUE_SIZE = 10000
 
 # URI Prefixes for generating DSN URLs
 # (Defaults to URL_PREFIX by default)
@@ -922,6 +937,28 @@ SENTRY_SOURCE_FETCH_SOCKET_TIMEOUT = 2
 # Maximum content length for source files before we abort fetching
 SENTRY_SOURCE_FETCH_MAX_SIZE = 40 * 1024 * 1024
 
+# Number of threads used to fetch the sources (and sourcemaps) referenced by
+# a single event concurrently
+SENTRY_SOURCE_FETCH_WORKERS = 4
+
+# Maximum size (in bytes of the original content) of decoded source files and
+# parsed sourcemaps each worker keeps around between events
+SENTRY_SOURCE_CACHE_MAX_SIZE = 128 * 1024 * 1024
+
+# Models looked up for every event (projects, releases, environments) are
+# kept in a worker-local cache for this many seconds, in front of the
+# shared cache. Set to 0 to disable the local cache.
+SENTRY_LOCAL_CACHE_TTL = 10
+
+# Maximum number of entries of each worker-local cache
+SENTRY_LOCAL_CACHE_SIZE = 1000
+
+# Tags of the events saved by a worker are indexed in batches, which are
+# queued every this many seconds (or once the batch is full.) Set to 0 to
+# queue the tags of every event on their own.
+SENTRY_EVENT_TAG_BATCH_INTERVAL = 1
+SENTRY_EVENT_TAG_BATCH_SIZE = 100
+
 # List of IP subnets which should not be accessible
 SENTRY_DISALLOWED_IPS = ()
 
@@ -377,9 +377,8 @@ class ClientApiHelper(object):
         if ip_address and not is_valid_ip(ip_address, project):
             return True
 
-        for filter_cls in filters.all():
-            filter_obj = filter_cls(project)
-            if filter_obj.is_enabled() and filter_obj.test(data):
+        for filter_obj in filters.get_enabled(project):
+            if filter_obj.test(data):
                 return True
 
         return False
@@ -2,8 +2,11 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.db import connections, router
+from django.db.models import Max, Min
+from django.db.models.sql.subqueries import DeleteQuery
 from django.utils import timezone
 
+from sentry.db.models.fields.node import deferred_node_deletes
 from sentry.utils import db
 
 
@@ -55,7 +58,7 @@ class BulkDeleteQuery(object):
             cursor.execute(query)
             results = cursor.rowcount > 0
 
-    def execute_generic(self, chunk_size=100):
+    def get_queryset(self):
         qs = self.model.objects.all()
 
         if self.days:
@@ -68,15 +71,65 @@ class BulkDeleteQuery(object):
                 qs = qs.filter(project=self.project_id)
             else:
                 qs = qs.filter(project_id=self.project_id)
+        return qs
+
+    def get_partitions(self, count):
+        """
+        Splits the ids of the rows to delete into up to ``count`` ranges of
+        about the same size, as a list of inclusive ``(lower, upper)`` tuples.
+        """
+        result = self.get_queryset().aggregate(lower=Min('id'), upper=Max('id'))
+        lower, upper = result['lower'], result['upper']
+        if lower is None:
+            return []
+        if count == 1:
+            return [(lower, upper)]
+
+        size = max((upper - lower + 1) // count, 1)
+        partitions = []
+        while lower <= upper:
+            if len(partitions) == count - 1:
+                partitions.append((lower, upper))
+                break
+            partitions.append((lower, min(lower + size - 1, upper)))
+            lower += size
+        return partitions
+
+    def delete_ids(self, ids, cascade=True):
+        # rows which were updated since their ids were selected (and are no
+        # longer older than the cutoff) are left alone
+        qs = self.get_queryset().filter(id__in=ids)
+        if cascade:
+            # goes through the deletion collector, which pulls all relations
+            # into memory, so keep the chunks small
+            with deferred_node_deletes():
+                qs.delete()
+        else:
+            DeleteQuery(self.model).delete_qs(qs, self.using)
 
-        # XXX: we step through because the deletion collector will pull all
-        # relations into memory
-        exists = True
-        while exists:
-            exists = False
-            for item in qs[:chunk_size].iterator():
-                item.delete()
-                exists = True
+    def execute_partition(self, lower, upper, chunk_size=100, cascade=True):
+        """
+        Deletes the matching rows with ids between ``lower`` and ``upper``
+        in ascending chunks, keyed on the last id deleted so no chunk has to
+        skip over what was already looked at.
+
+        Yields the last id deleted and the number of rows deleted for every
+        chunk.
+        """
+        qs = self.get_queryset().filter(
+            id__lte=upper,
+        ).order_by('id').values_list('id', flat=True)
+
+        ids = list(qs.filter(id__gte=lower)[:chunk_size])
+        while ids:
+            self.delete_ids(ids, cascade=cascade)
+            yield ids[-1], len(ids)
+            ids = list(qs.filter(id__gt=ids[-1])[:chunk_size])
+
+    def execute_generic(self, chunk_size=100):
+        for partition in self.get_partitions(1):
+            for _ in self.execute_partition(*partition, chunk_size=chunk_size):
+                pass
 
     def execute(self, chunk_size=10000):
         if db.is_postgres():
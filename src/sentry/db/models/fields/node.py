@@ -11,16 +11,18 @@ from __future__ import absolute_import, print_function
 import collections
 import logging
 import six
+import threading
 import warnings
 
+from contextlib import contextmanager
+
 from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_delete
 from south.modelsinspector import add_introspection_rules
 
+from sentry.nodestore.payload import decode, encode
 from sentry.utils.cache import memoize
-from sentry.utils.compat import pickle
-from sentry.utils.strings import decompress, compress
 
 from .gzippeddict import GzippedDictField
 
@@ -28,6 +30,38 @@ __all__ = ('NodeField',)
 
 logger = logging.getLogger('sentry')
 
+_deferred_deletes = threading.local()
+
+
+@contextmanager
+def deferred_node_deletes(deleted=()):
+    """
+    Collects the nodes of all instances deleted within the block, and
+    deletes them with a single ``delete_multi`` at its end. Nodes in
+    ``deleted`` were deleted up front, and are not deleted again.
+
+    >>> with deferred_node_deletes():
+    >>>     Event.objects.filter(group_id=group.id).delete()
+    """
+    from sentry.app import nodestore
+
+    if getattr(_deferred_deletes, 'node_ids', None) is not None:
+        _deferred_deletes.deleted.update(deleted)
+        yield
+        return
+
+    _deferred_deletes.node_ids = node_ids = []
+    _deferred_deletes.deleted = deleted = set(deleted)
+    try:
+        yield
+    finally:
+        _deferred_deletes.node_ids = None
+        _deferred_deletes.deleted = None
+
+    node_ids = [node_id for node_id in node_ids if node_id not in deleted]
+    if node_ids:
+        nodestore.delete_multi(node_ids)
+
 
 class NodeUnpopulated(Exception):
     pass
@@ -137,12 +171,16 @@ class NodeField(GzippedDictField):
         if not value.id:
             return
 
-        nodestore.delete(value.id)
+        node_ids = getattr(_deferred_deletes, 'node_ids', None)
+        if node_ids is not None:
+            node_ids.append(value.id)
+        else:
+            nodestore.delete(value.id)
 
     def to_python(self, value):
         if isinstance(value, six.string_types) and value:
             try:
-                value = pickle.loads(decompress(value))
+                value = decode(value)
             except Exception as e:
                 logger.exception(e)
                 value = {}
@@ -172,9 +210,9 @@ class NodeField(GzippedDictField):
         else:
             nodestore.set(value.id, value.data)
 
-        return compress(pickle.dumps({
+        return encode({
             'node_id': value.id
-        }))
+        })
 
 
 add_introspection_rules([], ["^sentry\.db\.models\.fields\.node\.NodeField"])
@@ -20,7 +20,7 @@ from django.db.models.signals import (
     post_save, post_delete, post_init, class_prepared)
 from django.utils.encoding import smart_text
 
-from sentry.utils.cache import cache
+from sentry.utils.cache import LocalCache, cache
 from sentry.utils.hashlib import md5_text
 
 from .query import create_or_update
@@ -79,7 +79,11 @@ class BaseManager(Manager):
         self.cache_fields = kwargs.pop('cache_fields', [])
         self.cache_ttl = kwargs.pop('cache_ttl', 60 * 5)
         self.cache_version = kwargs.pop('cache_version', None)
+        # keep instances looked up by primary key in a worker-local tier
+        # in front of the shared cache
+        self.cache_local = kwargs.pop('cache_local', False)
         self.__local_cache = threading.local()
+        self.__local_tier = None
         super(BaseManager, self).__init__(*args, **kwargs)
 
     def _get_cache(self):
@@ -102,11 +106,13 @@ class BaseManager(Manager):
         # we cant serialize weakrefs
         d.pop('_BaseManager__cache', None)
         d.pop('_BaseManager__local_cache', None)
+        d.pop('_BaseManager__local_tier', None)
         return d
 
     def __setstate__(self, state):
         self.__dict__.update(state)
         self.__local_cache = weakref.WeakKeyDictionary()
+        self.__local_tier = None
 
     def __class_prepared(self, sender, **kwargs):
         """
@@ -121,6 +127,10 @@ class BaseManager(Manager):
         if not self.cache_version:
             self.cache_version = self._generate_cache_version()
 
+        if self.cache_local:
+            self.__local_tier = LocalCache(
+                'modelcache.%s' % sender.__name__.lower())
+
         post_init.connect(self.__post_init, sender=sender, weak=False)
         post_save.connect(self.__post_save, sender=sender, weak=False)
         post_delete.connect(self.__post_delete, sender=sender, weak=False)
@@ -168,7 +178,7 @@ class BaseManager(Manager):
         instance._state.db = None
         # store actual object
         try:
-            cache.set(
+            self.__get_instance_cache().set(
                 key=self.__get_lookup_cache_key(**{pk_name: pk_val}),
                 value=instance,
                 timeout=self.cache_ttl,
@@ -208,11 +218,19 @@ class BaseManager(Manager):
                 version=self.cache_version,
             )
         # remove actual object
-        cache.delete(
+        self.__get_instance_cache().delete(
             key=self.__get_lookup_cache_key(**{pk_name: instance.pk}),
             version=self.cache_version,
         )
 
+    def __get_instance_cache(self):
+        """
+        Returns the cache which holds instances by primary key.
+        """
+        if self.__local_tier is not None:
+            return self.__local_tier
+        return cache
+
     def __get_lookup_cache_key(self, **kwargs):
         return make_key(self.model, 'modelcache', kwargs)
 
@@ -258,7 +276,11 @@ class BaseManager(Manager):
         if key in self.cache_fields or key == pk_name:
             cache_key = self.__get_lookup_cache_key(**{key: value})
 
-            retval = cache.get(cache_key, version=self.cache_version)
+            if key == pk_name:
+                retval = self.__get_instance_cache().get(
+                    cache_key, version=self.cache_version)
+            else:
+                retval = cache.get(cache_key, version=self.cache_version)
             if retval is None:
                 result = self.get(**kwargs)
                 # Ensure we're pushing it into the cache
@@ -315,7 +337,7 @@ class BaseManager(Manager):
     def uncache_object(self, instance_id):
         pk_name = self.model._meta.pk.name
         cache_key = self.__get_lookup_cache_key(**{pk_name: instance_id})
-        cache.delete(cache_key, version=self.cache_version)
+        self.__get_instance_cache().delete(cache_key, version=self.cache_version)
 
     def post_save(self, instance, **kwargs):
         """
@@ -11,7 +11,7 @@ from __future__ import absolute_import
 import itertools
 import six
 
-from django.db import IntegrityError, router, transaction
+from django.db import IntegrityError, connections, router, transaction
 from django.db.models import Model, Q
 from django.db.models.expressions import ExpressionNode
 from django.db.models.signals import post_save
@@ -19,7 +19,7 @@ from six.moves import reduce
 
 from .utils import resolve_expression_node
 
-__all__ = ('update', 'create_or_update')
+__all__ = ('update', 'create_or_update', 'bulk_increment')
 
 
 def update(self, using=None, **kwargs):
@@ -98,6 +98,174 @@ def create_or_update(model, using=None, **kwargs):
     return affected, False
 
 
+def _get_column_field(model, name):
+    if name == 'pk':
+        return model._meta.pk
+    for field in model._meta.fields:
+        if name in (field.name, field.attname):
+            return field
+    raise ValueError('Unknown field %r on %r' % (name, model))
+
+
+def _get_cast_type(field, connection):
+    # serial types and CHECK constraints are only valid in DDL, so cast to the
+    # underlying type
+    db_type = field.db_type(connection).split(' CHECK ', 1)[0]
+    return {
+        'serial': 'integer',
+        'bigserial': 'bigint',
+    }.get(db_type, db_type)
+
+
+def _render_expression(model, value, connection):
+    from django.db.models.sql.expressions import SQLEvaluator
+    from django.db.models.sql.subqueries import UpdateQuery
+
+    sql, params = SQLEvaluator(
+        value, UpdateQuery(model), allow_joins=False,
+    ).as_sql(connection.ops.quote_name, connection)
+    return sql, tuple(params)
+
+
+def bulk_increment(model, rows, using=None):
+    """
+    Applies many ``(columns, filters, extra)`` increments with a single
+    ``UPDATE ... FROM (VALUES ...)`` statement.
+
+    Every row must use the same column, filter and extra names. Only existing
+    records are updated, and only on PostgreSQL.
+
+    Extra values which evaluate to SQL (such as Group's ``ScoreClause``) are
+    applied as that expression, just like ``update`` does, as long as it is
+    the same for every row.
+
+    Returns the indexes of the rows which were not applied (because the
+    record does not exist yet, the backend does not support bulk updates, or
+    the row could not be expressed in bulk). These should be handled with
+    ``create_or_update``.
+
+    >>> bulk_increment(Group, [
+    >>>     ({'times_seen': 1}, {'id': 1}, {'last_seen': now}),
+    >>>     ({'times_seen': 3}, {'id': 2}, {'last_seen': now}),
+    >>> ])
+    """
+    from sentry.utils.db import is_postgres
+
+    if not rows:
+        return []
+
+    if not using:
+        using = router.db_for_write(model)
+
+    if not is_postgres(using):
+        return list(range(len(rows)))
+
+    connection = connections[using]
+
+    columns, filters, extra = rows[0]
+    column_names = sorted(columns)
+    filter_names = sorted(filters)
+    extra_names = sorted(extra or ())
+    if not column_names or any('__' in name for name in filter_names):
+        return list(range(len(rows)))
+
+    expressions = {}
+    for name, value in six.iteritems(extra or {}):
+        if hasattr(value, 'evaluate') and not isinstance(value, ExpressionNode):
+            expressions[name] = _render_expression(model, value, connection)
+    expression_names = sorted(expressions)
+    extra_names = [n for n in extra_names if n not in expressions]
+
+    column_fields = [_get_column_field(model, n) for n in column_names]
+    filter_fields = [_get_column_field(model, n) for n in filter_names]
+    extra_fields = [_get_column_field(model, n) for n in extra_names]
+    expression_fields = [_get_column_field(model, n) for n in expression_names]
+
+    pending = []
+    params = []
+    seen = set()
+    for idx, (columns, filters, extra) in enumerate(rows):
+        extra = extra or {}
+        values = [extra[n] for n in extra_names] + [filters[n] for n in filter_names]
+        # multiple VALUES rows matching the same record would only be
+        # applied once, so leave duplicates for the caller
+        filter_values = tuple(
+            v.pk if isinstance(v, Model) else v
+            for v in (filters[n] for n in filter_names)
+        )
+        if filter_values in seen or any(
+            isinstance(v, ExpressionNode) or hasattr(v, 'evaluate') for v in values
+        ) or any(
+            not hasattr(extra[n], 'evaluate') or
+            _render_expression(model, extra[n], connection) != expressions[n]
+            for n in expression_names
+        ):
+            pending.append(idx)
+            continue
+        seen.add(filter_values)
+
+        params.append(idx)
+        params.extend(columns[n] for n in column_names)
+        params.extend(
+            f.get_db_prep_save(extra[n], connection=connection)
+            for n, f in zip(extra_names, extra_fields)
+        )
+        params.extend(
+            f.get_db_prep_value(v, connection=connection)
+            for f, v in zip(filter_fields, filter_values)
+        )
+
+    if not params:
+        return pending
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    aliases = (
+        ['idx'] +
+        ['i%d' % n for n in range(len(column_fields))] +
+        ['e%d' % n for n in range(len(extra_fields))] +
+        ['f%d' % n for n in range(len(filter_fields))]
+    )
+    width = len(aliases)
+    values_sql = ', '.join(
+        ['(%s)' % ', '.join(['%s'] * width)] * (len(params) // width)
+    )
+    set_sql = [
+        '%s = %s.%s + CAST(v.i%d AS %s)' % (
+            qn(f.column), table, qn(f.column), n, _get_cast_type(f, connection),
+        ) for n, f in enumerate(column_fields)
+    ] + [
+        '%s = CAST(v.e%d AS %s)' % (qn(f.column), n, _get_cast_type(f, connection))
+        for n, f in enumerate(extra_fields)
+    ] + [
+        '%s = %s' % (qn(f.column), expressions[n][0])
+        for n, f in zip(expression_names, expression_fields)
+    ]
+    where_sql = [
+        '%s.%s = CAST(v.f%d AS %s)' % (table, qn(f.column), n, _get_cast_type(f, connection))
+        for n, f in enumerate(filter_fields)
+    ]
+
+    sql = 'UPDATE %s SET %s FROM (VALUES %s) AS v(%s) WHERE %s RETURNING v.idx' % (
+        table,
+        ', '.join(set_sql),
+        values_sql,
+        ', '.join(aliases),
+        ' AND '.join(where_sql),
+    )
+
+    cursor = connection.cursor()
+    cursor.execute(sql, [
+        p for n in expression_names for p in expressions[n][1]
+    ] + params)
+    applied = set(r[0] for r in cursor.fetchall())
+
+    pending.extend(
+        idx for idx in params[::width] if idx not in applied
+    )
+    return sorted(pending)
+
+
 def in_iexact(column, values):
     from operator import or_
 
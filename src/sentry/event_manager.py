@@ -395,7 +395,7 @@ class EventManager(object):
         return data
 
     def save(self, project, raw=False):
-        from sentry.tasks.post_process import index_event_tags
+        from sentry.tasks.post_process import queue_event_tags
 
         project = Project.objects.get_from_cache(id=project)
 
@@ -627,8 +627,6 @@ class EventManager(object):
         if release:
             counters.append((tsdb.models.release, release.id))
 
-        tsdb.incr_multi(counters, timestamp=event.datetime)
-
         frequencies = [
             # (tsdb.models.frequent_projects_by_organization, {
             #     project.organization_id: {
@@ -656,7 +654,17 @@ class EventManager(object):
                 })
             )
 
-        tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
+        # send all of the time series writes for the event in one go (distinct
+        # counters are idempotent, so recording the user before the duplicate
+        # check below is harmless)
+        with tsdb.batch(timestamp=event.datetime) as tsdb_batch:
+            tsdb_batch.incr_multi(counters)
+            tsdb_batch.record_frequency_multi(frequencies)
+            if event_user:
+                tsdb_batch.record_multi((
+                    (tsdb.models.users_affected_by_group, group.id, (event_user.tag_value,)),
+                    (tsdb.models.users_affected_by_project, project.id, (event_user.tag_value,)),
+                ))
 
         UserReport.objects.filter(
             project=project, event_id=event_id,
@@ -676,7 +684,7 @@ class EventManager(object):
                 })
                 return event
 
-            index_event_tags.delay(
+            queue_event_tags(
                 organization_id=project.organization_id,
                 project_id=project.id,
                 group_id=group.id,
@@ -684,18 +692,12 @@ class EventManager(object):
                 tags=tags,
             )
 
-        if event_user:
-            tsdb.record_multi((
-                (tsdb.models.users_affected_by_group, group.id, (event_user.tag_value,)),
-                (tsdb.models.users_affected_by_project, project.id, (event_user.tag_value,)),
-            ), timestamp=event.datetime)
-
         if is_new and release:
             buffer.incr(Release, {'new_groups': 1}, {
                 'id': release.id,
             })
 
-        safe_execute(Group.objects.add_tags, group, tags,
+        safe_execute(Group.objects.add_tags, group, tags, is_new=is_new,
                      _with_transaction=False)
 
         if not raw:
@@ -750,15 +752,20 @@ class EventManager(object):
 
         return euser
 
-    def _find_hashes(self, project, hash_list):
-        matches = []
-        for hash in hash_list:
-            ghash, _ = GroupHash.objects.get_or_create(
-                project=project,
-                hash=hash,
-            )
-            matches.append((ghash.group_id, ghash.hash))
-        return matches
+    def _find_hashes(self, project, hash_list, use_cache=True):
+        return GroupHash.objects.get_or_create_many(
+            project, hash_list, use_cache=use_cache)
+
+    def _get_group_for_hashes(self, all_hashes):
+        try:
+            existing_group_id = six.next(h[0] for h in all_hashes if h[0])
+        except StopIteration:
+            return None
+
+        try:
+            return Group.objects.get(id=existing_group_id)
+        except Group.DoesNotExist:
+            return None
 
     def _ensure_hashes_merged(self, group, hash_list):
         # TODO(dcramer): there is a race condition with selecting/updating
@@ -780,28 +787,32 @@ class EventManager(object):
                     transaction_id=uuid4().hex,
                 )
 
-        return GroupHash.objects.filter(
+        affected = GroupHash.objects.filter(
             project=group.project,
             hash__in=[h.hash for h in bad_hashes],
         ).update(
             group=group,
         )
+        GroupHash.objects.clear_cache(group.project_id, [h.hash for h in bad_hashes])
+        return affected
 
     def _save_aggregate(self, event, hashes, release, **kwargs):
         project = event.project
 
         # attempt to find a matching hash
         all_hashes = self._find_hashes(project, hashes)
-
-        try:
-            existing_group_id = six.next(h[0] for h in all_hashes if h[0])
-        except StopIteration:
-            existing_group_id = None
+        group = self._get_group_for_hashes(all_hashes)
+        if group is None and any(h[0] for h in all_hashes):
+            # the (cached) group went away, e.g. it was merged into another
+            # one, so look the hashes up again
+            GroupHash.objects.clear_cache(project.id, hashes)
+            all_hashes = self._find_hashes(project, hashes, use_cache=False)
+            group = self._get_group_for_hashes(all_hashes)
 
         # XXX(dcramer): this has the opportunity to create duplicate groups
         # it should be resolved by the hash merging function later but this
         # should be better tested/reviewed
-        if existing_group_id is None:
+        if group is None:
             kwargs['score'] = ScoreClause.calculate(1, kwargs['last_seen'])
             with transaction.atomic():
                 short_id = project.next_short_id()
@@ -811,8 +822,6 @@ class EventManager(object):
                     **kwargs
                 ), True
         else:
-            group = Group.objects.get(id=existing_group_id)
-
             group_is_new = False
 
         # If all hashes are brand new we treat this event as new
@@ -2,7 +2,7 @@ from __future__ import absolute_import, print_function
 
 __all__ = [
     'Filter', 'FilterManager', 'FilterNotRegistered', 'all', 'exists', 'get',
-    'register', 'unregister'
+    'get_enabled', 'register', 'unregister'
 ]
 
 from .base import Filter  # NOQA
@@ -22,5 +22,6 @@ default_manager.register(WebCrawlersFilter)
 all = default_manager.all
 exists = default_manager.exists
 get = default_manager.get
+get_enabled = default_manager.get_enabled
 register = default_manager.register
 unregister = default_manager.unregister
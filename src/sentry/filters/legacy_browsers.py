@@ -1,11 +1,16 @@
 from __future__ import absolute_import
 
+import threading
+
+from collections import OrderedDict
+
 from .base import Filter
 
-from ua_parser.user_agent_parser import Parse
+from ua_parser.user_agent_parser import ParseUserAgent
 from rest_framework import serializers
 from sentry.models import ProjectOption
 from sentry.api.fields import MultipleChoiceField
+from sentry.utils.cache import memoize
 
 MIN_VERSIONS = {
     'Chrome': 0,
@@ -17,6 +22,35 @@ MIN_VERSIONS = {
     'Android': 4,
 }
 
+# real traffic only has a few thousand distinct user agents, which are
+# expensive to parse
+USER_AGENT_CACHE_SIZE = 5000
+
+_user_agent_cache = OrderedDict()
+_user_agent_cache_lock = threading.Lock()
+
+
+def parse_user_agent(value):
+    """
+    Returns the browser of a user agent (as ``ParseUserAgent`` does.) The
+    result is shared between callers and must not be modified.
+    """
+    with _user_agent_cache_lock:
+        try:
+            browser = _user_agent_cache.pop(value)
+        except KeyError:
+            pass
+        else:
+            _user_agent_cache[value] = browser
+            return browser
+
+    browser = ParseUserAgent(value)
+    with _user_agent_cache_lock:
+        _user_agent_cache[value] = browser
+        while len(_user_agent_cache) > USER_AGENT_CACHE_SIZE:
+            _user_agent_cache.popitem(last=False)
+    return browser
+
 
 class LegacyBrowserFilterSerializer(serializers.Serializer):
     active = serializers.BooleanField()
@@ -165,42 +199,48 @@ class LegacyBrowsersFilter(Filter):
 
         return False
 
-    def test(self, data):
-        if data.get('platform') != 'javascript':
-            return False
-
+    @memoize
+    def browser_filters(self):
+        """
+        The ``filter_*`` methods enabled for the project.
+        """
         opts = ProjectOption.objects.get_value(
             project=self.project,
             key='filters:{}'.format(self.id),
         )
 
-        value = self.get_user_agent(data)
-        if not value:
+        # handle old style config
+        if opts == '1':
+            return [self.filter_default]
+
+        # New style is not a simple boolean, but a list of
+        # specific filters to apply
+        rv = []
+        if opts:
+            for key in opts:
+                fn = getattr(self, 'filter_' + key, None)
+                if fn is not None:
+                    rv.append(fn)
+        return rv
+
+    def test(self, data):
+        if data.get('platform') != 'javascript':
             return False
 
-        ua = Parse(value)
-        if not ua:
+        browser_filters = self.browser_filters
+        if not browser_filters:
             return False
 
-        browser = ua['user_agent']
+        value = self.get_user_agent(data)
+        if not value:
+            return False
 
+        browser = parse_user_agent(value)
         if not browser['family']:
             return False
 
-        # handle old style config
-        if opts == '1':
-            return self.filter_default(browser)
-
-        # New style is not a simple boolean, but a list of
-        # specific filters to apply
-        if opts:
-            for key in opts:
-                try:
-                    fn = getattr(self, 'filter_' + key)
-                except AttributeError:
-                    pass
-                else:
-                    if fn(browser):
-                        return True
+        for fn in browser_filters:
+            if fn(browser):
+                return True
 
         return False
@@ -3,17 +3,31 @@ from __future__ import absolute_import, print_function
 __all__ = ['FilterManager', 'FilterNotRegistered']
 
 import six
+import threading
+
+from collections import OrderedDict
 
 
 class FilterNotRegistered(Exception):
     pass
 
 
+def _freeze(value):
+    if isinstance(value, (set, frozenset, list, tuple)):
+        return frozenset(value)
+    return value
+
+
 # TODO(dcramer): a lot of these managers are very similar and should abstracted
 # into some kind of base class
 class FilterManager(object):
+    # number of projects whose enabled filters are kept around
+    cache_size = 10000
+
     def __init__(self):
         self.__values = {}
+        self.__enabled = OrderedDict()
+        self.__lock = threading.Lock()
 
     def __iter__(self):
         return six.itervalues(self.__values)
@@ -31,8 +45,54 @@ class FilterManager(object):
     def exists(self, id):
         return id in self.__values
 
+    def get_enabled(self, project):
+        """
+        Returns the filters enabled for the given project.
+
+        The filter instances are reused for as long as the project's filter
+        options don't change, so that testing an event doesn't need to look
+        at the options again.
+        """
+        from sentry.models import ProjectOption
+
+        options = ProjectOption.objects.get_all_values(project)
+        config = tuple(
+            (cls.id, _freeze(options.get(
+                'filters:{}'.format(cls.id),
+                '1' if cls.default else '0',
+            )))
+            for cls in six.itervalues(self.__values)
+        )
+        key = (project.id, config)
+
+        with self.__lock:
+            try:
+                rv = self.__enabled.pop(key)
+            except KeyError:
+                pass
+            else:
+                self.__enabled[key] = rv
+                return rv
+
+        rv = []
+        for cls in six.itervalues(self.__values):
+            filter_obj = cls(project)
+            if filter_obj.is_enabled():
+                rv.append(filter_obj)
+
+        with self.__lock:
+            self.__enabled[key] = rv
+            while len(self.__enabled) > self.cache_size:
+                self.__enabled.popitem(last=False)
+        return rv
+
+    def clear_cache(self):
+        with self.__lock:
+            self.__enabled.clear()
+
     def register(self, cls):
         self.__values[cls.id] = cls
+        self.clear_cache()
 
     def unregister(self, cls):
         try:
@@ -43,3 +103,4 @@ class FilterManager(object):
             # we gracefully handle a missing provider
             return
         del self.__values[cls.id]
+        self.clear_cache()
@@ -1,8 +1,19 @@
 from __future__ import absolute_import, print_function
 
+import threading
+
+from collections import OrderedDict
+
 from sentry.utils.strings import codec_lookup
 
-__all__ = ['SourceCache', 'SourceMapCache']
+__all__ = ['SourceCache', 'SourceMapCache', 'SharedSourceCache']
+
+
+def decode_source(body, encoding=None):
+    """
+    Decodes a source file body into a list of lines.
+    """
+    return body.decode(codec_lookup(encoding, 'utf-8').name, 'replace').split(u'\n')
 
 
 class SourceCache(object):
@@ -40,7 +51,7 @@ class SourceCache(object):
         if callable(body):
             body = body()
 
-        body = body.decode(codec_lookup(encoding, 'utf-8').name, 'replace').split(u'\n')
+        body = decode_source(body, encoding)
 
         # Set back a marker to indicate we've parsed this url
         self._cache[url] = (True, body)
@@ -66,6 +77,10 @@ class SourceCache(object):
         # on demand when first accessed.
         self._cache[url] = (False, (source, encoding))
 
+    def add_parsed(self, url, lines):
+        url = self._get_canonical_url(url)
+        self._cache[url] = (True, lines)
+
     def add_error(self, url, error):
         url = self._get_canonical_url(url)
         self._errors.setdefault(url, [])
@@ -95,3 +110,60 @@ class SourceMapCache(object):
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class SharedSourceCache(object):
+    """
+    A size bounded LRU cache which lives for the lifetime of the worker, and
+    is shared between ``SourceProcessor`` instances.
+
+    This holds decoded source lines and parsed sourcemap views, keyed by
+    (among others) a hash of the content they were built from, so entries
+    never go stale and are simply evicted once ``max_size`` (in bytes of the
+    original content) is exceeded.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                size, value = self._data.pop(key)
+            except KeyError:
+                return None
+            # re-insert to mark as most recently used
+            self._data[key] = (size, value)
+        return value
+
+    def set(self, key, value, size):
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            try:
+                old_size, _ = self._data.pop(key)
+            except KeyError:
+                pass
+            else:
+                self.size -= old_size
+
+            self._data[key] = (size, value)
+            self.size += size
+
+            while self.size > self.max_size:
+                _, (old_size, _) = self._data.popitem(last=False)
+                self.size -= old_size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
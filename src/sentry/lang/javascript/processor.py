@@ -3,16 +3,19 @@ from __future__ import absolute_import, print_function
 __all__ = ['SourceProcessor']
 
 import codecs
+import hashlib
 import logging
 import re
 import base64
 import six
+import threading
 import time
 import zlib
 
 from django.conf import settings
 from django.core.exceptions import SuspiciousOperation
-from collections import namedtuple
+from django.db import connections
+from collections import defaultdict, namedtuple
 from os.path import splitext
 from requests.exceptions import RequestException, Timeout
 from requests.utils import get_encoding_from_headers
@@ -36,9 +39,10 @@ from sentry.utils.files import compress_file
 from sentry.utils.hashlib import md5_text
 from sentry.utils.http import is_valid_origin
 from sentry.utils.strings import truncatechars
+from sentry.utils.threadpool import ThreadPool
 from sentry.utils import metrics
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, SharedSourceCache, decode_source
 
 
 # number of surrounding lines (on each side) to fetch
@@ -71,6 +75,10 @@ UrlResult = namedtuple('UrlResult', ['url', 'headers', 'body', 'encoding'])
 
 logger = logging.getLogger(__name__)
 
+# decoded sources and parsed sourcemaps, shared by all events processed in
+# this worker
+shared_source_cache = SharedSourceCache(settings.SENTRY_SOURCE_CACHE_MAX_SIZE)
+
 
 def expose_url(url):
     if url is None:
@@ -504,10 +512,10 @@ def is_utf8(encoding):
         return False
 
 
-def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
+def fetch_sourcemap_body(url, project=None, release=None, allow_scraping=True):
     if is_data_uri(url):
         try:
-            body = base64.b64decode(
+            return base64.b64decode(
                 url[BASE64_PREAMBLE_LENGTH:] + (b'=' * (-(len(url) - BASE64_PREAMBLE_LENGTH) % 4))
             )
         except TypeError as e:
@@ -515,20 +523,23 @@ def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
                 'url': '<base64>',
                 'reason': e.message,
             })
-    else:
-        result = fetch_file(url, project=project, release=release,
-                            allow_scraping=allow_scraping)
-        body = result.body
 
-        # This is just a quick sanity check, but doesn't guarantee
-        if not is_utf8(result.encoding):
-            error = {
-                'type': EventError.JS_INVALID_SOURCE_ENCODING,
-                'value': 'utf8',
-                'url': expose_url(url),
-            }
-            raise CannotFetchSource(error)
+    result = fetch_file(url, project=project, release=release,
+                        allow_scraping=allow_scraping)
+
+    # This is just a quick sanity check, but doesn't guarantee
+    if not is_utf8(result.encoding):
+        error = {
+            'type': EventError.JS_INVALID_SOURCE_ENCODING,
+            'value': 'utf8',
+            'url': expose_url(url),
+        }
+        raise CannotFetchSource(error)
+
+    return result.body
 
+
+def parse_sourcemap(url, body):
     try:
         return view_from_json(body)
     except Exception as exc:
@@ -539,6 +550,12 @@ def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
         })
 
 
+def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
+    body = fetch_sourcemap_body(url, project=project, release=release,
+                                allow_scraping=allow_scraping)
+    return parse_sourcemap(url, body)
+
+
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
 
@@ -587,12 +604,21 @@ class SourceProcessor(object):
     Mutates the input ``data`` with expanded context if available.
     """
     def __init__(self, project, max_fetches=MAX_RESOURCE_FETCHES,
-                 allow_scraping=True):
+                 allow_scraping=True, shared_cache=None, fetch_workers=None):
         self.allow_scraping = allow_scraping
         self.max_fetches = max_fetches
         self.fetch_count = 0
+        if fetch_workers is None:
+            fetch_workers = settings.SENTRY_SOURCE_FETCH_WORKERS
+        self.fetch_workers = fetch_workers
+        # results of ``prefetch_sources``, keyed by ``(kind, url)``
+        self.prefetched = {}
         self.cache = SourceCache()
         self.sourcemaps = SourceMapCache()
+        if shared_cache is None:
+            shared_cache = shared_source_cache
+        self.shared_cache = shared_cache
+        self.shared_cache_stats = defaultdict(int)
         self.project = project
 
     def get_stacktraces(self, data):
@@ -653,6 +679,7 @@ class SourceProcessor(object):
         self.populate_source_cache(frames, release)
         with metrics.timer('sourcemaps.expand_frames'):
             expand_errors, sourcemap_applied = self.expand_frames(frames, release)
+        self.record_shared_cache_stats()
         errors.extend(expand_errors or [])
         self.ensure_module_names(frames)
         self.fix_culprit(data, stacktraces)
@@ -866,11 +893,123 @@ class SourceProcessor(object):
                 })
         return all_errors, sourcemap_applied
 
+    def get_shared_cache_key(self, kind, url, release, body):
+        return (
+            kind,
+            release.id if release else None,
+            # the contents of data urls are already covered by the hash
+            None if is_data_uri(url) else url,
+            hashlib.md5(body).hexdigest(),
+        )
+
+    def get_shared(self, kind, key):
+        value = self.shared_cache.get(key)
+        self.shared_cache_stats[(kind, 'miss' if value is None else 'hit')] += 1
+        return value
+
+    def record_shared_cache_stats(self):
+        for (kind, result), count in six.iteritems(self.shared_cache_stats):
+            metrics.incr('sourcemaps.shared_cache.%s' % (result,), amount=count,
+                         tags={'kind': kind})
+        self.shared_cache_stats.clear()
+
     def get_source(self, filename, release):
         if filename not in self.cache:
             self.cache_source(filename, release)
         return self.cache.get(filename)
 
+    def get_prefetched(self, kind, url):
+        try:
+            result = self.prefetched.pop((kind, url))
+        except KeyError:
+            return None
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def fetch_file(self, filename, release):
+        result = self.get_prefetched('source', filename)
+        if result is None:
+            result = fetch_file(filename, project=self.project, release=release,
+                                allow_scraping=self.allow_scraping)
+        return result
+
+    def fetch_sourcemap_body(self, sourcemap_url, release):
+        body = self.get_prefetched('sourcemap', sourcemap_url)
+        if body is None:
+            body = fetch_sourcemap_body(
+                sourcemap_url,
+                project=self.project,
+                release=release,
+                allow_scraping=self.allow_scraping,
+            )
+        return body
+
+    def prefetch_sources(self, filenames, release):
+        """
+        Concurrently fetch the given files, as well as the sourcemaps they
+        reference, so that ``cache_source`` doesn't need to wait on them
+        one at a time.
+
+        Results (and errors) are stored in ``prefetched`` and are consumed in
+        order by ``cache_source``, which keeps error reporting (and the
+        ``max_fetches`` limit) identical to fetching them serially.
+        """
+        pool = ThreadPool(min(self.fetch_workers, len(filenames)))
+        lock = threading.Lock()
+        pending_sourcemaps = set()
+
+        def close_connections():
+            # database connections are per thread, and these threads go away
+            for conn in connections.all():
+                conn.close()
+
+        def fetch_sourcemap(sourcemap_url):
+            try:
+                return fetch_sourcemap_body(
+                    sourcemap_url,
+                    project=self.project,
+                    release=release,
+                    allow_scraping=self.allow_scraping,
+                )
+            finally:
+                close_connections()
+
+        def fetch_source(filename):
+            try:
+                result = fetch_file(filename, project=self.project, release=release,
+                                    allow_scraping=self.allow_scraping)
+            finally:
+                close_connections()
+
+            # start on the sourcemap right away, rather than after all of
+            # the sources have been fetched
+            sourcemap_url = discover_sourcemap(result)
+            if sourcemap_url and not is_data_uri(sourcemap_url) \
+               and sourcemap_url not in self.sourcemaps:
+                with lock:
+                    if sourcemap_url in pending_sourcemaps:
+                        sourcemap_url = None
+                    else:
+                        pending_sourcemaps.add(sourcemap_url)
+                if sourcemap_url:
+                    pool.add(('sourcemap', sourcemap_url), fetch_sourcemap,
+                             args=(sourcemap_url,))
+            return result
+
+        for filename in filenames:
+            pool.add(('source', filename), fetch_source, args=(filename,))
+
+        with metrics.timer('sourcemaps.prefetch'):
+            results = pool.join()
+
+        for key, values in six.iteritems(results):
+            result = values[0]
+            # let ``cache_source`` retry (and report) anything unexpected
+            if isinstance(result, Exception) and not isinstance(result, BadSource):
+                continue
+            self.prefetched[key] = result
+
     def cache_source(self, filename, release):
         sourcemaps = self.sourcemaps
         cache = self.cache
@@ -886,13 +1025,17 @@ class SourceProcessor(object):
         # TODO: respect cache-control/max-age headers to some extent
         logger.debug('Fetching remote source %r', filename)
         try:
-            result = fetch_file(filename, project=self.project, release=release,
-                                allow_scraping=self.allow_scraping)
+            result = self.fetch_file(filename, release)
         except BadSource as exc:
             cache.add_error(filename, exc.data)
             return
 
-        cache.add(filename, result.body, result.encoding)
+        key = self.get_shared_cache_key('source', result.url, release, result.body)
+        lines = self.get_shared('source', key)
+        if lines is None:
+            lines = decode_source(result.body, result.encoding)
+            self.shared_cache.set(key, lines, len(result.body))
+        cache.add_parsed(filename, lines)
         cache.alias(result.url, filename)
 
         sourcemap_url = discover_sourcemap(result)
@@ -904,14 +1047,16 @@ class SourceProcessor(object):
         if sourcemap_url in sourcemaps:
             return
 
-        # pull down sourcemap
+        # pull down sourcemap, skipping parsing when we've seen the exact
+        # same one before
         try:
-            sourcemap_view = fetch_sourcemap(
-                sourcemap_url,
-                project=self.project,
-                release=release,
-                allow_scraping=self.allow_scraping,
-            )
+            sourcemap_body = self.fetch_sourcemap_body(sourcemap_url, release)
+            key = self.get_shared_cache_key('sourcemap', sourcemap_url, release, sourcemap_body)
+            sourcemap_view = self.get_shared('sourcemap', key)
+            if sourcemap_view is None:
+                with metrics.timer('sourcemaps.parse'):
+                    sourcemap_view = parse_sourcemap(sourcemap_url, sourcemap_body)
+                self.shared_cache.set(key, sourcemap_view, len(sourcemap_body))
         except BadSource as exc:
             cache.add_error(filename, exc.data)
             return
@@ -932,7 +1077,8 @@ class SourceProcessor(object):
         Fetch all sources that we know are required (being referenced directly
         in frames).
         """
-        pending_file_list = set()
+        pending_file_list = []
+        seen = set()
         for f in frames:
             # We can't even attempt to fetch source if abs_path is None
             if f.abs_path is None:
@@ -943,7 +1089,14 @@ class SourceProcessor(object):
             # a fetch error that may be confusing.
             if f.abs_path == '<anonymous>':
                 continue
-            pending_file_list.add(f.abs_path)
+            if f.abs_path not in seen:
+                seen.add(f.abs_path)
+                pending_file_list.append(f.abs_path)
+
+        # only fetch what ``cache_source`` is still allowed to use
+        to_prefetch = pending_file_list[:max(self.max_fetches - self.fetch_count, 0)]
+        if self.fetch_workers > 1 and len(to_prefetch) > 1:
+            self.prefetch_sources(to_prefetch, release)
 
         for idx, filename in enumerate(pending_file_list):
             self.cache_source(
@@ -4,19 +4,33 @@ import os
 import uuid
 import time
 import errno
+import fcntl
+import hashlib
+import logging
 import six
-import shutil
+import threading
+
+from contextlib import contextmanager
 
 from sentry import options
-from sentry.models import find_dsym_file
+from sentry.models import find_dsym_files
+from sentry.utils import metrics
+from sentry.utils.threadpool import ThreadPool
 
 
 ONE_DAY = 60 * 60 * 24
 ONE_DAY_AND_A_HALF = int(ONE_DAY * 1.5)
+LOCK_SUFFIX = '.lock'
+
+logger = logging.getLogger(__name__)
 
 
 class DSymCache(object):
 
+    def __init__(self):
+        self._locks_lock = threading.Lock()
+        self._locks = {}
+
     @property
     def dsym_cache_path(self):
         return options.get('dsym.cache-path')
@@ -30,11 +44,23 @@ class DSymCache(object):
     def fetch_dsyms(self, project, uuids):
         bases = set()
         loaded = set()
+        missing = []
         for image_uuid in uuids:
-            base = self.fetch_dsym(project, image_uuid)
+            base = self.get_cached_dsym(project, image_uuid)
             if base is not None:
                 loaded.add(image_uuid)
                 bases.add(base)
+            else:
+                missing.append(image_uuid)
+
+        metrics.incr('dsymcache.hit', amount=len(loaded))
+        if missing:
+            metrics.incr('dsymcache.miss', amount=len(missing))
+            for image_uuid, base in six.iteritems(self.download_dsyms(project, missing)):
+                if base is not None:
+                    loaded.add(image_uuid)
+                    bases.add(base)
+
         return list(bases), loaded
 
     def try_bump_timestamp(self, path, old_stat):
@@ -43,27 +69,102 @@ class DSymCache(object):
             os.utime(path, (now, now))
         return path
 
-    def fetch_dsym(self, project, image_uuid):
+    def get_cached_dsym(self, project, image_uuid):
+        """Returns the base path of a dsym file if it's already cached."""
         image_uuid = image_uuid.lower()
-        for path in self.get_project_path(project), self.get_global_path():
-            base = self.get_project_path(project)
+        for base in self.get_project_path(project), self.get_global_path():
             dsym = os.path.join(base, image_uuid)
             try:
-                os.stat(dsym)
+                self.try_bump_timestamp(dsym, os.stat(dsym))
             except OSError as e:
                 if e.errno != errno.ENOENT:
                     raise
             else:
                 return base
 
-        dsf = find_dsym_file(project, image_uuid)
-        if dsf is None:
-            return None
+    def fetch_dsym(self, project, image_uuid):
+        base = self.get_cached_dsym(project, image_uuid)
+        if base is None:
+            base = self.download_dsyms(project, [image_uuid])[image_uuid]
+        return base
+
+    def download_dsyms(self, project, uuids):
+        """Downloads the given dsyms into the cache concurrently.  Returns a
+        dictionary mapping each uuid to the base path of its dsym, or `None`
+        if it is not available.
+        """
+        rv = dict.fromkeys(uuids)
+        dsym_files = find_dsym_files(project, uuids)
+        if not dsym_files:
+            return rv
+
+        pool = ThreadPool(min(options.get('dsym.fetch-workers'), len(dsym_files)))
+        for image_uuid in uuids:
+            dsf = dsym_files.get(image_uuid.lower())
+            if dsf is None:
+                continue
+            if dsf.is_global:
+                base = self.get_global_path()
+            else:
+                base = self.get_project_path(project)
+            # Opening the file loads its blob index, which needs to happen
+            # here as the database should not be used from the pool.
+            pool.add(image_uuid, self._download_dsym, args=(
+                base, image_uuid.lower(), dsf.file.getfile(), dsf.file.checksum,
+            ))
+
+        for image_uuid, results in six.iteritems(pool.join()):
+            result = results[0]
+            if isinstance(result, Exception):
+                logger.error('dsymcache.fetch-failed', exc_info=(
+                    type(result), result, None))
+                result = None
+            rv[image_uuid] = result
+        return rv
+
+    def _get_lock(self, path):
+        with self._locks_lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    @contextmanager
+    def _lock_dsym(self, dsym):
+        # Threads of this process wait on each other, other processes are
+        # serialized through a lock file.
+        with self._get_lock(dsym):
+            with open(dsym + LOCK_SUFFIX, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
 
-        if dsf.is_global:
-            base = self.get_global_path()
-        else:
-            base = self.get_project_path(project)
+    def _remove_unlocked(self, path):
+        # Entries are only removed while nobody holds their lock, which stays
+        # in place: a process might have opened it and be about to wait on it.
+        lock = self._get_lock(path)
+        if not lock.acquire(False):
+            return False
+        try:
+            try:
+                f = open(path + LOCK_SUFFIX, 'r')
+            except IOError as e:
+                if e.errno != errno.ENOENT:
+                    return False
+                f = None
+            try:
+                if f is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.remove(path)
+            except (IOError, OSError):
+                return False
+            finally:
+                if f is not None:
+                    f.close()
+        finally:
+            lock.release()
+        return True
+
+    def _download_dsym(self, base, image_uuid, sf, checksum):
         dsym = os.path.join(base, image_uuid)
 
         try:
@@ -71,12 +172,32 @@ class DSymCache(object):
         except OSError:
             pass
 
-        with dsf.file.getfile() as sf:
+        with self._lock_dsym(dsym), sf:
+            # Someone else might have fetched it while we were waiting
+            if os.path.isfile(dsym):
+                return base
+
             suffix = '_%s' % uuid.uuid4()
             done = False
             try:
-                with open(dsym + suffix, 'w') as df:
-                    shutil.copyfileobj(sf, df)
+                with metrics.timer('dsymcache.fetch'):
+                    digest = hashlib.sha1()
+                    with open(dsym + suffix, 'wb') as df:
+                        while True:
+                            chunk = sf.read(65536)
+                            if not chunk:
+                                break
+                            digest.update(chunk)
+                            df.write(chunk)
+
+                if checksum and digest.hexdigest() != checksum:
+                    metrics.incr('dsymcache.checksum-mismatch')
+                    logger.error('dsymcache.checksum-mismatch', extra={
+                        'image_uuid': image_uuid,
+                        'checksum': checksum,
+                    })
+                    return None
+
                 os.rename(dsym + suffix, dsym)
                 done = True
             finally:
@@ -97,7 +218,9 @@ class DSymCache(object):
             return
 
         cutoff = int(time.time()) - ONE_DAY_AND_A_HALF
+        max_size = options.get('dsym.cache-max-size')
 
+        entries = []
         for cache_folder in cache_folders:
             cache_folder = os.path.join(self.dsym_cache_path, cache_folder)
             try:
@@ -105,16 +228,30 @@ class DSymCache(object):
             except OSError:
                 continue
             for cached_file in items:
+                if cached_file.endswith(LOCK_SUFFIX):
+                    continue
                 cached_file = os.path.join(cache_folder, cached_file)
                 try:
-                    mtime = os.path.getmtime(cached_file)
+                    st = os.stat(cached_file)
                 except OSError:
                     continue
-                if mtime < cutoff:
-                    try:
-                        os.remove(cached_file)
-                    except OSError:
-                        pass
+                if st.st_mtime < cutoff:
+                    self._remove_unlocked(cached_file)
+                else:
+                    entries.append((st.st_mtime, st.st_size, cached_file))
+
+        # Beyond that, remove the least recently used files until the cache
+        # fits into its size budget again
+        total_size = sum(size for _, size, _ in entries)
+        if total_size <= max_size:
+            return
+
+        entries.sort()
+        for _, size, cached_file in entries:
+            if total_size <= max_size:
+                break
+            if self._remove_unlocked(cached_file):
+                total_size -= size
 
 
 dsymcache = DSymCache()
@@ -4,6 +4,7 @@ import os
 import re
 import sys
 import six
+import itertools
 import time
 import logging
 import posixpath
@@ -289,6 +290,17 @@ def preprocess_apple_crash_event(data):
                      referenced_images=referenced_images)
 
     with sym:
+        # Resolve the system symbols of all threads in one go. Frames which
+        # aren't resolved here are looked up (and fail) one by one.
+        try:
+            sym.resolve_system_symbols(itertools.chain.from_iterable(
+                raw_thread['backtrace']['contents']
+                for raw_thread in six.itervalues(raw_threads)
+                if raw_thread.get('backtrace')
+            ), sdk_info)
+        except Exception:
+            logger.exception('Failed to resolve system symbols')
+
         if crashed_thread is None:
             append_error(data, {
                 'type': EventError.NATIVE_NO_CRASHED_THREAD,
@@ -372,25 +384,42 @@ def resolve_frame_symbols(data):
             logger.debug('Failed to symbolicate',
                          exc_info=(exc_type, exc_value, tb))
 
+    def get_raw_frame(frame):
+        if 'image_addr' not in frame or \
+           'instruction_addr' not in frame or \
+           'symbol_addr' not in frame:
+            return None
+        # Construct a raw frame that is used by the symbolizer backend.
+        return {
+            'object_name': frame.get('package'),
+            'object_addr': frame['image_addr'],
+            'instruction_addr': frame['instruction_addr'],
+            'symbol_addr': frame['symbol_addr'],
+        }
+
     with sym:
+        # Resolve the system symbols of all stacktraces in one go. Frames
+        # which aren't resolved here are looked up (and fail) one by one.
+        try:
+            sym.resolve_system_symbols([
+                raw_frame for raw_frame in (
+                    get_raw_frame(frame)
+                    for stacktrace, _ in stacktraces
+                    for frame in stacktrace['frames']
+                ) if raw_frame is not None
+            ], sdk_info)
+        except Exception:
+            logger.exception('Failed to resolve system symbols')
+
         for stacktrace, container in stacktraces:
             store_raw = False
 
             new_frames = list(stacktrace['frames'])
             for idx, frame in enumerate(stacktrace['frames']):
-                if 'image_addr' not in frame or \
-                   'instruction_addr' not in frame or \
-                   'symbol_addr' not in frame:
+                raw_frame = get_raw_frame(frame)
+                if raw_frame is None:
                     continue
                 try:
-                    # Construct a raw frame that is used by the symbolizer
-                    # backend.
-                    raw_frame = {
-                        'object_name': frame.get('package'),
-                        'object_addr': frame['image_addr'],
-                        'instruction_addr': frame['instruction_addr'],
-                        'symbol_addr': frame['symbol_addr'],
-                    }
                     new_frame = dict(frame)
 
                     try:
@@ -0,0 +1,423 @@
+"""
+sentry.lang.native.symbolindex
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Compact, memory mapped address to symbol indexes for system symbols.
+
+Each ``DSymObject`` gets a single file in the dsym cache folder which
+contains its symbols sorted by address, so that looking up a symbol is a
+binary search instead of a database query.  Building an index stores the
+count and revision of its symbols in the cache, and indexes with a
+different count and revision in their header are rebuilt (i.e. because
+more symbols were imported on another host.)
+
+The layout of a file is::
+
+    header      magic, version, number of symbols, revision (the highest
+                id of the object's symbols when the index was built)
+    addresses   sorted, one uint64 per symbol
+    offsets     one uint32 per symbol (plus an end marker) into the
+                string table
+    strings     utf-8 encoded symbol names
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import errno
+import mmap
+import os
+import six
+import struct
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from django.db.models import Count, Max
+
+from sentry.lang.native.dsymcache import dsymcache
+from sentry.models import DSymObject, DSymSymbol
+from sentry.utils.cache import cache
+from sentry.utils.native import parse_addr
+
+HEADER = struct.Struct('<4sIIQ')
+MAGIC = b'SYMI'
+VERSION = 2
+ADDRESS = struct.Struct('<Q')
+OFFSET = struct.Struct('<I')
+
+# how long the mapping of images to symbol objects is remembered
+OBJECT_CACHE_TTL = 300
+OBJECT_CACHE_SIZE = 10000
+
+# number of resolved symbols remembered per process
+SYMBOL_CACHE_SIZE = 100000
+
+# number of open indexes per process, and how long they are used before
+# checking that their symbols didn't change
+INDEX_CACHE_SIZE = 100
+INDEX_CACHE_TTL = 300
+
+# how long the revision of the last built index of an object is stored, after
+# which it's looked up in the database again
+INDEX_REVISION_TTL = 3600
+
+
+class SymbolIndex(object):
+    """
+    Read access to a symbol index file.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < HEADER.size:
+                raise ValueError('Truncated symbol index')
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, revision = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('Unsupported symbol index')
+
+        self.count = count
+        self.revision = revision
+        self._addresses = HEADER.size
+        self._offsets = self._addresses + count * ADDRESS.size
+        self._strings = self._offsets + (count + 1) * OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+
+    def get_address(self, idx):
+        return ADDRESS.unpack_from(self._map, self._addresses + idx * ADDRESS.size)[0]
+
+    def get_symbol(self, idx):
+        start, = OFFSET.unpack_from(self._map, self._offsets + idx * OFFSET.size)
+        end, = OFFSET.unpack_from(self._map, self._offsets + (idx + 1) * OFFSET.size)
+        return self._map[self._strings + start:self._strings + end].decode('utf-8')
+
+    def lookup(self, addr, min_addr=0):
+        """
+        Returns ``(address, symbol)`` for the symbol with the highest
+        address that is not above ``addr`` (and not below ``min_addr``), or
+        ``None``.
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_address(mid) > addr:
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo == 0:
+            return None
+        address = self.get_address(lo - 1)
+        if address < min_addr:
+            return None
+        return address, self.get_symbol(lo - 1)
+
+
+def write_symbol_index(fileobj, symbols, revision=0):
+    """
+    Writes an index for the given ``(address, symbol)`` pairs, which need
+    to be sorted by address.
+    """
+    addresses = []
+    offsets = [0]
+    strings = []
+    for address, symbol in symbols:
+        if isinstance(symbol, six.text_type):
+            symbol = symbol.encode('utf-8')
+        addresses.append(address)
+        strings.append(symbol)
+        offsets.append(offsets[-1] + len(symbol))
+
+    fileobj.write(HEADER.pack(MAGIC, VERSION, len(addresses), revision))
+    fileobj.write(struct.pack('<%dQ' % len(addresses), *addresses))
+    fileobj.write(struct.pack('<%dI' % len(offsets), *offsets))
+    fileobj.write(b''.join(strings))
+
+
+class SymbolCache(object):
+    """
+    A simple LRU of resolved symbols.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return None
+            self._data[key] = value
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+class SymbolIndexCache(object):
+    """
+    Finds system symbols through the per object symbol indexes, building
+    them from the database the first time an object is used.
+    """
+    def __init__(self, symbol_cache_size=SYMBOL_CACHE_SIZE,
+                 index_cache_size=INDEX_CACHE_SIZE):
+        self._lock = threading.Lock()
+        # object id => (expires, index), least recently used first
+        self._indexes = OrderedDict()
+        self.index_cache_size = index_cache_size
+        self._objects = {}
+        self.symbols = SymbolCache(symbol_cache_size)
+
+    @property
+    def index_path(self):
+        return os.path.join(dsymcache.dsym_cache_path, 'symbols')
+
+    def get_index_path(self, object_id):
+        return os.path.join(self.index_path, '%d.idx' % object_id)
+
+    def build_index(self, object_id):
+        """
+        (Re)builds the index for a ``DSymObject`` and returns its path.
+        """
+        path = self.get_index_path(object_id)
+        try:
+            os.makedirs(self.index_path)
+        except OSError:
+            pass
+
+        symbols = DSymSymbol.objects.filter(
+            object=object_id,
+        ).order_by('address').values_list('address', 'symbol')
+        revision = self._query_revision(object_id)
+
+        suffix = '_%s' % uuid.uuid4()
+        done = False
+        try:
+            with open(path + suffix, 'wb') as f:
+                write_symbol_index(f, symbols.iterator(), revision[1])
+            os.rename(path + suffix, path)
+            done = True
+        finally:
+            if not done:
+                try:
+                    os.remove(path + suffix)
+                except Exception:
+                    pass
+
+        # the open index is dropped rather than closed, as other threads
+        # might still be reading from it
+        with self._lock:
+            self._indexes.pop(object_id, None)
+        cache.set(self.get_revision_cache_key(object_id), revision,
+                  INDEX_REVISION_TTL)
+        return path
+
+    def get_revision_cache_key(self, object_id):
+        return 'symbolindex:revision:%d' % object_id
+
+    def _query_revision(self, object_id):
+        result = DSymSymbol.objects.filter(object=object_id).aggregate(
+            count=Count('id'), revision=Max('id'))
+        return result['count'], result['revision'] or 0
+
+    def get_revision(self, object_id):
+        """
+        Returns the number of symbols of an object and their highest id,
+        which is what its index needs to match.  This is what the index was
+        last built with (on any host), and only queried from the database
+        once it's no longer known.
+        """
+        cache_key = self.get_revision_cache_key(object_id)
+        revision = cache.get(cache_key)
+        if revision is None:
+            revision = self._query_revision(object_id)
+            cache.set(cache_key, revision, INDEX_REVISION_TTL)
+        return tuple(revision)
+
+    def _open_index(self, object_id, revision):
+        path = self.get_index_path(object_id)
+        try:
+            dsymcache.try_bump_timestamp(path, os.stat(path))
+            index = SymbolIndex(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        except ValueError:
+            # a truncated index, or one written by an older version
+            pass
+        else:
+            if (index.count, index.revision) == revision:
+                return index
+            index.close()
+
+        self.build_index(object_id)
+        return SymbolIndex(path)
+
+    def get_index(self, object_id):
+        with self._lock:
+            entry = self._indexes.pop(object_id, None)
+            if entry is not None:
+                self._indexes[object_id] = entry
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+
+        revision = self.get_revision(object_id)
+        if entry is not None and (entry[1].count, entry[1].revision) == revision:
+            index = entry[1]
+        else:
+            index = self._open_index(object_id, revision)
+
+        # Replaced and evicted indexes are only dropped, other threads might
+        # still be reading from them.  Their memory map is closed once they
+        # are collected.
+        with self._lock:
+            self._indexes.pop(object_id, None)
+            self._indexes[object_id] = (time.time() + INDEX_CACHE_TTL, index)
+            while len(self._indexes) > self.index_cache_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _get_objects(self, key, get_queryset):
+        now = time.time()
+        rv = self._objects.get(key)
+        if rv is not None and rv[0] > now:
+            return rv[1]
+
+        objects = list(get_queryset().values_list('id', 'vmaddr').distinct())
+        with self._lock:
+            if len(self._objects) >= OBJECT_CACHE_SIZE:
+                self._objects.clear()
+            self._objects[key] = (now + OBJECT_CACHE_TTL, objects)
+        return objects
+
+    def find_objects_by_uuid(self, uuid):
+        uuid = six.text_type(uuid).lower()
+        return self._get_objects(
+            ('uuid', uuid),
+            lambda: DSymObject.objects.filter(uuid=uuid),
+        )
+
+    def find_objects_by_path(self, sdk_info, cpu_name, object_path):
+        key = ('path', sdk_info['sdk_name'], sdk_info['dsym_type'],
+               sdk_info['version_major'], sdk_info['version_minor'],
+               sdk_info['version_patchlevel'], cpu_name, object_path)
+        return self._get_objects(key, lambda: DSymObject.objects.filter(
+            cpu_name=cpu_name,
+            object_path=object_path,
+            dsymbundle__sdk__sdk_name=sdk_info['sdk_name'],
+            dsymbundle__sdk__dsym_type=sdk_info['dsym_type'],
+            dsymbundle__sdk__version_major=sdk_info['version_major'],
+            dsymbundle__sdk__version_minor=sdk_info['version_minor'],
+            dsymbundle__sdk__version_patchlevel=sdk_info['version_patchlevel'],
+        ))
+
+    def _lookup(self, objects, addr_rel, addr_abs, image_vmaddr):
+        best = None
+        for object_id, vmaddr in objects:
+            if vmaddr is None:
+                continue
+            match = self.get_index(object_id).lookup(vmaddr + addr_rel, vmaddr)
+            if match is not None and (best is None or match[0] > best[0]):
+                best = match
+        if best is not None:
+            return best[1]
+
+        if addr_abs is None:
+            return None
+        for object_id, _ in objects:
+            match = self.get_index(object_id).lookup(addr_abs, image_vmaddr)
+            if match is not None and (best is None or match[0] > best[0]):
+                best = match
+        if best is not None:
+            return best[1]
+
+    def lookup_symbol(self, instruction_addr, image_addr, uuid,
+                      cpu_name=None, object_path=None, sdk_info=None,
+                      image_vmaddr=None):
+        """Finds a system symbol.  This matches the behavior of
+        ``DSymSymbol.objects.lookup_symbol`` without hitting the database
+        for every lookup.
+        """
+        return self.lookup_symbols(
+            [instruction_addr], image_addr, uuid, cpu_name=cpu_name,
+            object_path=object_path, sdk_info=sdk_info,
+            image_vmaddr=image_vmaddr)[instruction_addr]
+
+    def lookup_symbols(self, instruction_addrs, image_addr, uuid,
+                       cpu_name=None, object_path=None, sdk_info=None,
+                       image_vmaddr=None):
+        """Finds the system symbols for many addresses within the same
+        image.  Returns a dictionary mapping each of the given instruction
+        addresses to its symbol (or `None`).
+        """
+        rv = dict.fromkeys(instruction_addrs)
+
+        # If we use the "none" dsym type we never return a symbol here.
+        if sdk_info is not None and sdk_info['dsym_type'] == 'none':
+            return rv
+
+        image_addr = parse_addr(image_addr)
+        if image_vmaddr is not None:
+            image_vmaddr = parse_addr(image_vmaddr)
+        uuid = six.text_type(uuid).lower()
+        if sdk_info is not None:
+            sdk_key = (sdk_info['sdk_name'], sdk_info['dsym_type'],
+                       sdk_info['version_major'], sdk_info['version_minor'],
+                       sdk_info['version_patchlevel'])
+        else:
+            sdk_key = None
+
+        pending = []
+        for instruction_addr in rv:
+            addr_rel = parse_addr(instruction_addr) - image_addr
+            key = (uuid, image_vmaddr, cpu_name, object_path, sdk_key, addr_rel)
+            symbol = self.symbols.get(key)
+            if symbol is None:
+                pending.append((instruction_addr, addr_rel, key))
+            else:
+                rv[instruction_addr] = symbol
+
+        if not pending:
+            return rv
+
+        # First try: exact match on uuid
+        # Second try: exact match on path and arch
+        candidates = [self.find_objects_by_uuid(uuid)]
+        if sdk_info is not None and \
+           cpu_name is not None and \
+           object_path is not None:
+            candidates.append(
+                self.find_objects_by_path(sdk_info, cpu_name, object_path))
+
+        for instruction_addr, addr_rel, key in pending:
+            addr_abs = None
+            if image_vmaddr is not None:
+                addr_abs = image_vmaddr + addr_rel
+            for objects in candidates:
+                symbol = self._lookup(objects, addr_rel, addr_abs, image_vmaddr)
+                if symbol is not None:
+                    self.symbols.set(key, symbol)
+                    rv[instruction_addr] = symbol
+                    break
+        return rv
+
+
+symbolindex = SymbolIndexCache()
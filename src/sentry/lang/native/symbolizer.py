@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import logging
 import re
 import six
 
@@ -8,11 +9,14 @@ from symsynd.report import ReportSymbolizer
 from symsynd.macho.arch import get_cpu_name
 
 from sentry.lang.native.dsymcache import dsymcache
+from sentry.lang.native.symbolindex import symbolindex
 from sentry.utils.safe import trim
 from sentry.utils.compat import implements_to_string
-from sentry.models import DSymSymbol, EventError
+from sentry.models import EventError
 from sentry.constants import MAX_SYM
 
+logger = logging.getLogger(__name__)
+
 
 APP_BUNDLE_PATHS = (
     '/var/containers/Bundle/Application/',
@@ -75,7 +79,7 @@ def trim_frame(frame):
 
 def find_system_symbol(img, instruction_addr, sdk_info=None):
     """Finds a system symbol."""
-    return DSymSymbol.objects.lookup_symbol(
+    return symbolindex.lookup_symbol(
         instruction_addr=instruction_addr,
         image_addr=img['image_addr'],
         image_vmaddr=img['image_vmaddr'],
@@ -87,6 +91,20 @@ def find_system_symbol(img, instruction_addr, sdk_info=None):
     )
 
 
+def find_system_symbols(img, instruction_addrs, sdk_info=None):
+    """Finds the system symbols for many addresses in the same image."""
+    return symbolindex.lookup_symbols(
+        instruction_addrs=instruction_addrs,
+        image_addr=img['image_addr'],
+        image_vmaddr=img['image_vmaddr'],
+        uuid=img['uuid'],
+        cpu_name=get_cpu_name(img['cpu_type'],
+                              img['cpu_subtype']),
+        object_path=img['name'],
+        sdk_info=sdk_info
+    )
+
+
 def make_symbolizer(project, binary_images, referenced_images=None):
     """Creates a symbolizer for the given project and binary images.  If a
     list of referenced images is referenced (UUIDs) then only images
@@ -117,6 +135,8 @@ class Symbolizer(object):
         self.symsynd_symbolizer = make_symbolizer(
             project, binary_images, referenced_images=referenced_images)
         self.images = dict((img['image_addr'], img) for img in binary_images)
+        # system symbols resolved by ``resolve_system_symbols``
+        self.system_symbols = {}
 
     def __enter__(self):
         return self.symsynd_symbolizer.driver.__enter__()
@@ -197,9 +217,43 @@ class Symbolizer(object):
 
         return self._process_frame(new_frame, img)
 
+    def resolve_system_symbols(self, frames, sdk_info=None):
+        """Looks up the system symbols for all of the given frames at once,
+        grouped by image, so that ``symbolize_system_frame`` does not need
+        to look them up one by one.
+
+        Frames which can't be looked up here (i.e. because the lookup
+        failed) are looked up again by ``symbolize_system_frame``, which
+        reports failures of individual frames.
+        """
+        addrs_by_image = {}
+        for frame in frames:
+            try:
+                img = self.images.get(frame['object_addr'])
+                if img is None or self._is_app_bundled_frame(frame, img) or \
+                   (img['uuid'], frame['instruction_addr']) in self.system_symbols:
+                    continue
+                addrs_by_image.setdefault(img['uuid'], (img, set()))[1].add(
+                    frame['instruction_addr'])
+            except Exception:
+                continue
+
+        for img, addrs in six.itervalues(addrs_by_image):
+            try:
+                symbols = find_system_symbols(img, addrs, sdk_info)
+            except Exception:
+                logger.exception('Failed to look up system symbols of %s',
+                                 img['uuid'])
+                continue
+            for addr, symbol in six.iteritems(symbols):
+                self.system_symbols[img['uuid'], addr] = symbol
+
     def symbolize_system_frame(self, frame, img, sdk_info):
         """Symbolizes a frame with system symbols only."""
-        symbol = find_system_symbol(img, frame['instruction_addr'], sdk_info)
+        try:
+            symbol = self.system_symbols[img['uuid'], frame['instruction_addr']]
+        except KeyError:
+            symbol = find_system_symbol(img, frame['instruction_addr'], sdk_info)
         if symbol is None:
             # Simulator frames cannot be symbolicated
             if self._is_simulator_frame(frame, img):
@@ -247,6 +301,11 @@ class Symbolizer(object):
         errors = []
         idx = -1
 
+        try:
+            self.resolve_system_symbols(backtrace, sdk_info)
+        except Exception:
+            logger.exception('Failed to resolve system symbols')
+
         for idx, frm in enumerate(backtrace):
             try:
                 rv.append(self.symbolize_frame(frm, sdk_info))
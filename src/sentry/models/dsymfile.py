@@ -449,6 +449,28 @@ def find_dsym_file(project, image_uuid):
         return None
 
 
+def find_dsym_files(project, image_uuids):
+    """Finds the dsym files for many uuids at once.  Returns a dictionary
+    of the (lowercased) uuids that were found mapped to their dsym files,
+    preferring the ones within the project over global ones.
+    """
+    image_uuids = set(x.lower() for x in image_uuids)
+    rv = {}
+    for dsf in ProjectDSymFile.objects.filter(
+        uuid__in=image_uuids,
+        project=project
+    ).select_related('file'):
+        rv[dsf.uuid] = dsf
+
+    missing = image_uuids - set(rv)
+    if missing:
+        for dsf in GlobalDSymFile.objects.filter(
+            uuid__in=missing,
+        ).select_related('file'):
+            rv[dsf.uuid] = dsf
+    return rv
+
+
 def find_missing_dsym_files(checksums, project=None):
     checksums = [x.lower() for x in checksums]
     missing = set(checksums)
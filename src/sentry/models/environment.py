@@ -13,7 +13,7 @@ from django.utils import timezone
 from sentry.db.models import (
     BoundedPositiveIntegerField, Model, sane_repr
 )
-from sentry.utils.cache import cache
+from sentry.utils.cache import LocalCache
 from sentry.utils.hashlib import md5_text
 
 
@@ -41,12 +41,15 @@ class Environment(Model):
 
         cache_key = cls.get_cache_key(project.id, name)
 
-        env = cache.get(cache_key)
+        env = _local_cache.get(cache_key)
         if env is None:
             env = cls.objects.get_or_create(
                 project_id=project.id,
                 name=name,
             )[0]
-            cache.set(cache_key, env, 3600)
+            _local_cache.set(cache_key, env, 3600)
 
         return env
+
+
+_local_cache = LocalCache('environment', model=Environment)
@@ -163,13 +163,14 @@ class Event(Model):
 
     def get_interfaces(self):
         result = []
-        for key, data in six.iteritems(self.data):
+        # only the data of interfaces is looked at (and decoded)
+        for key in self.data:
             try:
                 cls = get_interface(key)
             except ValueError:
                 continue
 
-            value = safe_execute(cls.to_python, data,
+            value = safe_execute(cls.to_python, self.data[key],
                                  _with_transaction=False)
             if not value:
                 continue
@@ -22,7 +22,7 @@ from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from sentry import eventtypes
-from sentry.app import buffer
+from sentry.app import buffer, tagindex
 from sentry.constants import (
     DEFAULT_LOGGER_NAME, EVENT_ORDERING_KEY, LOG_LEVELS, MAX_CULPRIT_LENGTH
 )
@@ -111,18 +111,21 @@ class GroupManager(BaseManager):
         manager.normalize()
         return manager.save(project)
 
-    def add_tags(self, group, tags):
+    def add_tags(self, group, tags, is_new=False):
         from sentry.models import TagValue, GroupTagValue
 
         project_id = group.project_id
         date = group.last_seen
 
+        tag_values = []
         for tag_item in tags:
             if len(tag_item) == 2:
                 (key, value), data = tag_item, None
             else:
                 key, value, data = tag_item
 
+            tag_values.append((key, value))
+
             buffer.incr(TagValue, {
                 'times_seen': 1,
             }, {
@@ -145,6 +148,8 @@ class GroupManager(BaseManager):
                 'last_seen': date,
             })
 
+        tagindex.record(group.id, tag_values, is_new=is_new)
+
 
 class Group(Model):
     """
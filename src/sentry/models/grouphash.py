@@ -7,9 +7,112 @@ sentry.models.grouphash
 """
 from __future__ import absolute_import
 
-from django.db import models
+import six
+
+from collections import OrderedDict
+from django.db import IntegrityError, models, router, transaction
 
 from sentry.db.models import FlexibleForeignKey, Model
+from sentry.db.models.manager import BaseManager
+from sentry.utils.cache import cache
+
+
+class GroupHashManager(BaseManager):
+    # hashes rarely change groups (only on merges and deletions, which
+    # clear the cache) so this mostly bounds the damage of races
+    hash_cache_ttl = 60
+
+    def _get_cache_key(self, project_id, hash):
+        return 'grouphash:v1:%s:%s' % (project_id, hash)
+
+    def get_or_create_many(self, project, hashes, use_cache=True):
+        """
+        Returns a list of ``(group_id, hash)`` for the given hashes, creating
+        the ones that don't exist yet (with no group).
+
+        Hashes which are already assigned to a group are cached, so that hot
+        groups can be found without hitting the database at all.
+        """
+        found = {}
+        if use_cache:
+            cache_keys = dict(
+                (self._get_cache_key(project.id, hash), hash)
+                for hash in hashes
+            )
+            for key, group_id in six.iteritems(cache.get_many(list(cache_keys))):
+                found[cache_keys[key]] = group_id
+
+        missing = [hash for hash in hashes if hash not in found]
+        if not missing:
+            return [(found[hash], hash) for hash in hashes]
+
+        existing = dict(self.filter(
+            project=project,
+            hash__in=missing,
+        ).values_list('hash', 'group_id'))
+        found.update(existing)
+
+        to_create = [
+            hash for hash in OrderedDict.fromkeys(missing)
+            if hash not in existing
+        ]
+        if to_create:
+            try:
+                with transaction.atomic(using=router.db_for_write(GroupHash)):
+                    self.bulk_create([
+                        GroupHash(project=project, hash=hash)
+                        for hash in to_create
+                    ])
+            except IntegrityError:
+                # some of them were created concurrently
+                for hash in to_create:
+                    found[hash] = self.get_or_create(
+                        project=project,
+                        hash=hash,
+                    )[0].group_id
+            else:
+                found.update(dict.fromkeys(to_create))
+
+        cache.set_many(dict(
+            (self._get_cache_key(project.id, hash), group_id)
+            for hash, group_id in six.iteritems(existing)
+            if group_id is not None
+        ), self.hash_cache_ttl)
+
+        return [(found[hash], hash) for hash in hashes]
+
+    def clear_cache(self, project_id, hashes):
+        cache.delete_many([
+            self._get_cache_key(project_id, hash)
+            for hash in hashes
+        ])
+
+    def clear_cache_for_groups(self, group_ids):
+        """
+        Clears the cached group of the hashes belonging to the given groups.
+        This needs to happen after those hashes were moved, as an event could
+        otherwise cache their old group again in between.
+        """
+        cache.delete_many([
+            self._get_cache_key(project_id, hash)
+            for project_id, hash in self.filter(
+                group__in=group_ids,
+            ).values_list('project_id', 'hash')
+        ])
+
+    def delete_for_groups(self, group_ids):
+        """
+        Removes the hashes of the given groups, and clears their cached group
+        once they are gone.
+        """
+        hashes = list(self.filter(
+            group__in=group_ids,
+        ).values_list('project_id', 'hash'))
+        self.filter(group__in=group_ids).delete()
+        cache.delete_many([
+            self._get_cache_key(project_id, hash)
+            for project_id, hash in hashes
+        ])
 
 
 class GroupHash(Model):
@@ -19,6 +122,8 @@ class GroupHash(Model):
     hash = models.CharField(max_length=32)
     group = FlexibleForeignKey('sentry.Group', null=True)
 
+    objects = GroupHashManager()
+
     class Meta:
         app_label = 'sentry'
         db_table = 'sentry_grouphash'
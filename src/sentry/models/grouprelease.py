@@ -4,7 +4,7 @@ from datetime import timedelta
 from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 
-from sentry.utils.cache import cache
+from sentry.utils.cache import LocalCache
 from sentry.utils.hashlib import md5_text
 from sentry.db.models import (
     BoundedPositiveIntegerField, Model, sane_repr
@@ -39,7 +39,7 @@ class GroupRelease(Model):
     def get_or_create(cls, group, release, environment, datetime, **kwargs):
         cache_key = cls.get_cache_key(group.id, release.id, environment.name)
 
-        instance = cache.get(cache_key)
+        instance = _local_cache.get(cache_key)
         if instance is None:
             try:
                 with transaction.atomic():
@@ -57,7 +57,7 @@ class GroupRelease(Model):
                     group_id=group.id,
                     environment=environment.name,
                 ), False
-            cache.set(cache_key, instance, 3600)
+            _local_cache.set(cache_key, instance, 3600)
         else:
             created = False
 
@@ -72,5 +72,8 @@ class GroupRelease(Model):
                 last_seen=datetime,
             )
             instance.last_seen = datetime
-            cache.set(cache_key, instance, 3600)
+            _local_cache.set(cache_key, instance, 3600)
         return instance
+
+
+_local_cache = LocalCache('grouprelease', model=GroupRelease)
@@ -7,6 +7,9 @@ sentry.models.grouptagvalue
 """
 from __future__ import absolute_import
 
+import six
+
+from collections import defaultdict
 from datetime import timedelta
 from django.db import connections, models
 from django.db.models import Sum
@@ -18,6 +21,11 @@ from sentry.db.models import (
     sane_repr
 )
 from sentry.utils import db
+from sentry.utils.cache import cache
+
+# The tag summary of a group is only cached for a short while, as buffered
+# updates of its tag values don't reach the database right away either.
+TAG_SUMMARY_CACHE_TTL = 60
 
 
 class GroupTagValue(Model):
@@ -108,4 +116,129 @@ class GroupTagValue(Model):
             last_seen__gte=cutoff,
         ).order_by('-times_seen')[:limit])
 
+    @classmethod
+    def get_tag_summary_cache_key(cls, group_id):
+        return 'grouptag-summary:1:%s' % (group_id,)
+
+    @classmethod
+    def get_tag_summary(cls, group_id, keys, limit=10):
+        """
+        Returns the total number of values seen and the ``limit`` most seen
+        values for each of ``keys``, as ``{key: (total, top_values)}``.
+
+        This is the same as ``get_value_count`` and ``get_top_values`` for
+        every key, but the result is cached until the tag values of the group
+        are updated. Keys which aren't in the tag index are summarized with a
+        single query on Postgres, and with a query per key otherwise.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        cache_key = cls.get_tag_summary_cache_key(group_id)
+        cached = cache.get(cache_key)
+        if cached is not None and cached[0] >= limit:
+            cached_limit, summary = cached
+        else:
+            cached_limit, summary = limit, {}
+
+        missing = [k for k in keys if k not in summary]
+        if missing:
+            summary.update(cls._get_tag_summary(group_id, missing, cached_limit))
+            cache.set(cache_key, (cached_limit, summary), TAG_SUMMARY_CACHE_TTL)
+
+        return dict(
+            (k, (summary[k][0], summary[k][1][:limit]))
+            for k in keys
+        )
+
+    @classmethod
+    def clear_tag_summary_cache(cls, group_id):
+        cache.delete(cls.get_tag_summary_cache_key(group_id))
+
+    @classmethod
+    def _get_tag_summary(cls, group_id, keys, limit):
+        from sentry.app import tagindex
+
+        # Keys which aren't indexed are summarized from the database
+        indexed = tagindex.get_top_values(group_id, keys, limit)
+        missing = [k for k in keys if k not in indexed]
+        summary = {}
+        if missing:
+            summary = cls._query_tag_summary(group_id, missing, limit)
+
+        if indexed:
+            # Only the details of the top values are fetched from the database
+            rows = dict(
+                ((v.key, v.value), v) for v in cls.objects.filter(
+                    group=group_id,
+                    key__in=list(indexed),
+                    value__in=set(
+                        value
+                        for _, values in six.itervalues(indexed)
+                        for value, _ in values
+                    ),
+                )
+            )
+            for key, (total, values) in six.iteritems(indexed):
+                summary[key] = (total, [
+                    rows[(key, value)] for value, _ in values
+                    if (key, value) in rows
+                ])
+
+        return summary
+
+    @classmethod
+    def _query_tag_summary(cls, group_id, keys, limit):
+        totals = dict.fromkeys(keys, 0)
+        top_values = defaultdict(list)
+
+        if db.is_postgres():
+            # Just like ``get_value_count`` and ``get_top_values``, this only
+            # considers the most recently seen 10,000 values of each key.
+            # Each key is looked up on its own, so that only its most
+            # recent values are sorted by the times they were seen.
+            for value in cls.objects.raw("""
+                SELECT b.*
+                FROM unnest(%s) AS k
+                CROSS JOIN LATERAL (
+                    SELECT *,
+                        SUM(times_seen) OVER () AS total_values,
+                        ROW_NUMBER() OVER (
+                            ORDER BY times_seen DESC
+                        ) AS times_seen_rank
+                    FROM (
+                        SELECT *
+                        FROM sentry_messagefiltervalue
+                        WHERE group_id = %s
+                        AND key = k
+                        ORDER BY last_seen DESC
+                        LIMIT 10000
+                    ) AS a
+                ) AS b
+                WHERE times_seen_rank <= %s
+                ORDER BY key, times_seen_rank
+            """, [keys, group_id, limit]):
+                totals[value.key] = value.total_values or 0
+                top_values[value.key].append(value)
+        else:
+            cutoff = timezone.now() - timedelta(days=7)
+            queryset = cls.objects.filter(
+                group=group_id,
+                key__in=keys,
+                last_seen__gte=cutoff,
+            )
+            totals.update(
+                queryset.values_list('key').annotate(t=Sum('times_seen'))
+            )
+            for key in keys:
+                top_values[key] = list(queryset.filter(
+                    key=key,
+                ).order_by('-times_seen')[:limit])
+
+        return dict(
+            (key, (total, top_values[key]))
+            for key, total in six.iteritems(totals)
+        )
+
 GroupTag = GroupTagValue
@@ -93,7 +93,7 @@ class Project(Model):
     objects = ProjectManager(cache_fields=[
         'pk',
         'slug',
-    ])
+    ], cache_local=True)
 
     class Meta:
         app_label = 'sentry'
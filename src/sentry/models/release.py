@@ -17,7 +17,7 @@ from sentry.app import locks
 from sentry.db.models import (
     BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr
 )
-from sentry.utils.cache import cache
+from sentry.utils.cache import LocalCache, cache
 from sentry.utils.hashlib import md5_text
 from sentry.utils.retries import TimedRetryPolicy
 
@@ -103,7 +103,7 @@ class Release(Model):
     def get_or_create(cls, project, version, date_added):
         cache_key = cls.get_cache_key(project.id, version)
 
-        release = cache.get(cache_key)
+        release = _local_cache.get(cache_key)
         if release in (None, -1):
             # TODO(dcramer): if the cache result is -1 we could attempt a
             # default create here instead of default get
@@ -136,7 +136,7 @@ class Release(Model):
 
             # TODO(dcramer): upon creating a new release, check if it should be
             # the new "latest release" for this project
-            cache.set(cache_key, release, 3600)
+            _local_cache.set(cache_key, release, 3600)
 
         return release
 
@@ -152,3 +152,6 @@ class Release(Model):
                 ReleaseProject.objects.create(project=project, release=self)
         except IntegrityError:
             pass
+
+
+_local_cache = LocalCache('release', model=Release)
@@ -4,7 +4,7 @@ from datetime import timedelta
 from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 
-from sentry.utils.cache import cache
+from sentry.utils.cache import LocalCache
 from sentry.db.models import (
     BoundedPositiveIntegerField, Model, sane_repr
 )
@@ -39,7 +39,7 @@ class ReleaseEnvironment(Model):
     def get_or_create(cls, project, release, environment, datetime, **kwargs):
         cache_key = cls.get_cache_key(project.id, release.id, environment.id)
 
-        instance = cache.get(cache_key)
+        instance = _local_cache.get(cache_key)
         if instance is None:
             try:
                 with transaction.atomic():
@@ -58,7 +58,7 @@ class ReleaseEnvironment(Model):
                     organization_id=project.organization_id,
                     environment_id=environment.id,
                 ), False
-            cache.set(cache_key, instance, 3600)
+            _local_cache.set(cache_key, instance, 3600)
         else:
             created = False
 
@@ -73,5 +73,8 @@ class ReleaseEnvironment(Model):
                 last_seen=datetime,
             )
             instance.last_seen = datetime
-            cache.set(cache_key, instance, 3600)
+            _local_cache.set(cache_key, instance, 3600)
         return instance
+
+
+_local_cache = LocalCache('releaseenvironment', model=ReleaseEnvironment)
@@ -15,7 +15,7 @@ from sentry.db.models import (
     sane_repr
 )
 from sentry.db.models.manager import BaseManager
-from sentry.utils.cache import cache
+from sentry.utils.cache import LocalCache
 
 
 # TODO(dcramer): pull in enum library
@@ -55,25 +55,25 @@ class Rule(Model):
     @classmethod
     def get_for_project(cls, project_id):
         cache_key = 'project:{}:rules'.format(project_id)
-        rules_list = cache.get(cache_key)
+        rules_list = _local_cache.get(cache_key)
         if rules_list is None:
             rules_list = list(cls.objects.filter(
                 project=project_id,
                 status=RuleStatus.ACTIVE,
             ))
-            cache.set(cache_key, rules_list, 60)
+            _local_cache.set(cache_key, rules_list, 60)
         return rules_list
 
     def delete(self, *args, **kwargs):
         rv = super(Rule, self).delete(*args, **kwargs)
         cache_key = 'project:{}:rules'.format(self.project_id)
-        cache.delete(cache_key)
+        _local_cache.delete(cache_key)
         return rv
 
     def save(self, *args, **kwargs):
         rv = super(Rule, self).save(*args, **kwargs)
         cache_key = 'project:{}:rules'.format(self.project_id)
-        cache.delete(cache_key)
+        _local_cache.delete(cache_key)
         return rv
 
     def get_audit_log_data(self):
@@ -82,3 +82,6 @@ class Rule(Model):
             'data': self.data,
             'status': self.status,
         }
+
+
+_local_cache = LocalCache('rules')
@@ -8,6 +8,7 @@ sentry.models.tagkey
 from __future__ import absolute_import, print_function
 
 import re
+import six
 
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
@@ -18,6 +19,7 @@ from sentry.db.models import (
 )
 from sentry.db.models.manager import BaseManager
 from sentry.utils.cache import cache
+from sentry.utils.hashlib import md5_text
 
 # Valid pattern for tag key names
 TAG_KEY_RE = re.compile(r'^[a-zA-Z0-9_\.:-]+$')
@@ -35,9 +37,62 @@ class TagKeyStatus(object):
 
 
 class TagKeyManager(BaseManager):
+    # ids are only cached for keys which were just seen, so they are far
+    # more recent than anything cleanup removes
+    id_cache_ttl = 300
+
     def _get_cache_key(self, project_id):
         return 'filterkey:all:%s' % project_id
 
+    def _get_id_cache_key(self, project_id, key):
+        return 'tagkey:id:%s:%s' % (project_id, md5_text(key).hexdigest())
+
+    def get_or_create_ids(self, project, keys):
+        """
+        Returns a dictionary mapping each of the given keys to the id of
+        its ``TagKey``, creating the ones that don't exist yet.
+        """
+        cache_keys = dict(
+            (self._get_id_cache_key(project.id, key), key)
+            for key in keys
+        )
+        rv = dict(
+            (cache_keys[cache_key], key_id)
+            for cache_key, key_id in six.iteritems(cache.get_many(list(cache_keys)))
+        )
+
+        missing = [key for key in set(keys) if key not in rv]
+        if not missing:
+            return rv
+
+        found = dict(self.filter(
+            project=project,
+            key__in=missing,
+        ).values_list('key', 'id'))
+        for key in missing:
+            if key not in found:
+                found[key] = self.get_or_create(
+                    project=project,
+                    key=key,
+                )[0].id
+
+        cache.set_many(dict(
+            (self._get_id_cache_key(project.id, key), key_id)
+            for key, key_id in six.iteritems(found)
+        ), self.id_cache_ttl)
+
+        rv.update(found)
+        return rv
+
+    def clear_id_cache(self, project_id, keys):
+        cache.delete_many([
+            self._get_id_cache_key(project_id, key)
+            for key in keys
+        ])
+
+    def post_delete(self, instance, **kwargs):
+        self.clear_id_cache(instance.project_id, [instance.key])
+
     def all_keys(self, project):
         # TODO: cache invalidation via post_save/post_delete signals much like BaseManager
         key = self._get_cache_key(project.id)
@@ -7,6 +7,8 @@ sentry.models.tagvalue
 """
 from __future__ import absolute_import, print_function
 
+import six
+
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.utils import timezone
@@ -16,9 +18,83 @@ from sentry.db.models import (
     Model, BoundedPositiveIntegerField, FlexibleForeignKey, GzippedDictField,
     BaseManager, sane_repr
 )
+from sentry.utils.cache import cache
+from sentry.utils.hashlib import md5_text
 from sentry.utils.http import absolute_uri
 
 
+class TagValueManager(BaseManager):
+    # ids are only cached for values which were just seen, so they are far
+    # more recent than anything cleanup removes
+    id_cache_ttl = 300
+
+    def _get_id_cache_key(self, project_id, key_id, value):
+        return 'tagvalue:id:%s:%s:%s' % (
+            project_id, key_id, md5_text(value).hexdigest())
+
+    def get_or_create_ids(self, project, items, key_ids):
+        """
+        Returns a dictionary mapping each of the given ``(key, value)`` pairs
+        to the id of its ``TagValue``, creating the ones that don't exist
+        yet.
+
+        ``key_ids`` maps the keys to the ids of their ``TagKey``, which scope
+        the cached ids (values of a deleted key are looked up again once
+        the key is recreated.)
+        """
+        cache_keys = dict(
+            (self._get_id_cache_key(project.id, key_ids[key], value), (key, value))
+            for key, value in items
+        )
+        rv = dict(
+            (cache_keys[cache_key], value_id)
+            for cache_key, value_id in six.iteritems(cache.get_many(list(cache_keys)))
+        )
+
+        missing = [item for item in set(items) if item not in rv]
+        if not missing:
+            return rv
+
+        # this might match a few more combinations of keys and values than
+        # needed, which is cheaper than a query per key
+        wanted = set(missing)
+        found = {}
+        for key, value, value_id in self.filter(
+            project=project,
+            key__in=set(key for key, _ in missing),
+            value__in=set(value for _, value in missing),
+        ).values_list('key', 'value', 'id'):
+            if (key, value) in wanted:
+                found[(key, value)] = value_id
+
+        for key, value in missing:
+            if (key, value) not in found:
+                found[(key, value)] = self.get_or_create(
+                    project=project,
+                    key=key,
+                    value=value,
+                )[0].id
+
+        cache.set_many(dict(
+            (self._get_id_cache_key(project.id, key_ids[key], value), value_id)
+            for (key, value), value_id in six.iteritems(found)
+        ), self.id_cache_ttl)
+
+        rv.update(found)
+        return rv
+
+    def post_delete(self, instance, **kwargs):
+        from sentry.models import TagKey
+
+        cache.delete_many([
+            self._get_id_cache_key(instance.project_id, key_id, instance.value)
+            for key_id in TagKey.objects.filter(
+                project=instance.project_id,
+                key=instance.key,
+            ).values_list('id', flat=True)
+        ])
+
+
 class TagValue(Model):
     """
     Stores references to available filters.
@@ -35,7 +111,7 @@ class TagValue(Model):
     first_seen = models.DateTimeField(
         default=timezone.now, db_index=True, null=True)
 
-    objects = BaseManager()
+    objects = TagValueManager()
 
     class Meta:
         app_label = 'sentry'
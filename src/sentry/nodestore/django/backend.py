@@ -10,16 +10,21 @@ from __future__ import absolute_import
 
 import math
 
+from django.db import IntegrityError, router, transaction
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
 from sentry.nodestore.base import NodeStorage
+from sentry.utils.iterators import chunked
 
 
 from .models import Node
 
 
 class DjangoNodeStorage(NodeStorage):
+    # the number of nodes read, written or deleted with a single query
+    chunk_size = 100
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
 
@@ -30,13 +35,17 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
     def get_multi(self, id_list):
-        return {
-            n.id: n.data
-            for n in Node.objects.filter(id__in=id_list)
-        }
+        rv = {}
+        for chunk in chunked(set(id_list), self.chunk_size):
+            rv.update(
+                (n.id, n.data)
+                for n in Node.objects.filter(id__in=chunk)
+            )
+        return rv
 
     def delete_multi(self, id_list):
-        Node.objects.filter(id__in=id_list).delete()
+        for chunk in chunked(set(id_list), self.chunk_size):
+            Node.objects.filter(id__in=chunk).delete()
 
     def set(self, id, data):
         create_or_update(
@@ -48,6 +57,38 @@ class DjangoNodeStorage(NodeStorage):
             },
         )
 
+    def set_multi(self, values):
+        """
+        Inserts the new nodes with a single query (per chunk), and updates
+        the ones which already exist.
+        """
+        now = timezone.now()
+        for chunk in chunked(values.keys(), self.chunk_size):
+            existing = set(Node.objects.filter(
+                id__in=chunk,
+            ).values_list('id', flat=True))
+
+            new_nodes = [
+                Node(id=id, data=values[id], timestamp=now)
+                for id in chunk
+                if id not in existing
+            ]
+            try:
+                if new_nodes:
+                    with transaction.atomic(using=router.db_for_write(Node)):
+                        Node.objects.bulk_create(new_nodes)
+            except IntegrityError:
+                # Someone else created some of them in the meantime
+                for id in chunk:
+                    self.set(id, values[id])
+                continue
+
+            for id in existing:
+                Node.objects.filter(id=id).update(
+                    data=values[id],
+                    timestamp=now,
+                )
+
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
 
@@ -8,20 +8,51 @@ sentry.nodestore.django.models
 
 from __future__ import absolute_import
 
+import logging
+import six
+
 from django.db import models
 from django.utils import timezone
+from south.modelsinspector import add_introspection_rules
 
 from sentry.db.models import (
     BaseModel, GzippedDictField, sane_repr)
+from sentry.nodestore.payload import decode, encode
+
+logger = logging.getLogger('sentry')
+
+
+class NodePayloadField(GzippedDictField):
+    """
+    Stores node data in the format of ``sentry.nodestore.payload``, while
+    still reading the pickled data of existing nodes.
+    """
+    def to_python(self, value):
+        if isinstance(value, six.string_types) and value:
+            try:
+                value = decode(value)
+            except Exception as e:
+                logger.exception(e)
+                return {}
+        elif not value:
+            return {}
+        return value
+
+    def get_prep_value(self, value):
+        if not value and self.null:
+            # save ourselves some storage
+            return None
+        return encode(value)
+
+
+add_introspection_rules([], ["^sentry\.nodestore\.django\.models\.NodePayloadField"])
 
 
 class Node(BaseModel):
     __core__ = False
 
     id = models.CharField(max_length=40, primary_key=True)
-    # TODO(dcramer): this being pickle and not JSON has the ability to cause
-    # hard errors as it accepts other serialization than native JSON
-    data = GzippedDictField()
+    data = NodePayloadField()
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     __repr__ = sane_repr('timestamp')
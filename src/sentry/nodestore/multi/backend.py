@@ -9,14 +9,47 @@ sentry.nodestore.multi.backend
 from __future__ import absolute_import
 
 import random
+import sys
 
 import six
 
+from six.moves.queue import Queue
+from threading import Thread
+
 from sentry.nodestore.base import NodeStorage
+from sentry.utils.background import BackgroundService
 from sentry.utils.imports import import_string
 
+# tells a ``BackendWorker`` to exit
+_STOP = object()
+
+
+class BackendWorker(Thread):
+    """
+    Calls the methods of a backend from a long lived thread, so that the
+    (thread local) connections of the backend are reused between calls.
+    """
+    def __init__(self, backend):
+        Thread.__init__(self)
+        self.daemon = True
+        self.backend = backend
+        self.queue = Queue()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            method, args, results = item
+            try:
+                getattr(self.backend, method)(*args)
+            except Exception:
+                results.put(sys.exc_info())
+            else:
+                results.put(None)
+
 
-class MultiNodeStorage(NodeStorage):
+class MultiNodeStorage(NodeStorage, BackgroundService):
     """
     A backend which will write to multiple backends, and read from a random
     choice.
@@ -24,11 +57,19 @@ class MultiNodeStorage(NodeStorage):
     This is not intended for consistency, but is instead designed to allow you
     to dual-write for purposes of migrations.
 
+    Writes and deletes go to all backends at the same time: the first backend
+    and backends storing nodes in the Django database (which need to share
+    the transaction and connection of the caller) are called from the calling
+    thread, every other backend from a thread of its own.
+
     >>> MultiNodeStorage(backends=[
     >>>     ('sentry.nodestore.django.backend.DjangoNodeStorage', {}),
     >>>     ('sentry.nodestore.riak.backend.RiakNodeStorage', {}),
     >>> ], read_selector=lambda backends: backends[0])
     """
+    # the workers are daemon threads, and have nothing to write out
+    shutdown_on_exit = False
+
     def __init__(self, backends, read_selector=random.choice, **kwargs):
         assert backends, "you should provide at least one backend"
 
@@ -38,8 +79,64 @@ class MultiNodeStorage(NodeStorage):
                 backend = import_string(backend)
             self.backends.append(backend(**backend_options))
         self.read_selector = read_selector
+        self.workers = None
         super(MultiNodeStorage, self).__init__(**kwargs)
 
+    def _is_local(self, backend):
+        from sentry.nodestore.django.backend import DjangoNodeStorage
+
+        return backend is self.backends[0] or isinstance(backend, DjangoNodeStorage)
+
+    def _start(self):
+        self.workers = [
+            BackendWorker(b) for b in self.backends
+            if not self._is_local(b)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _stop(self):
+        for worker in self.workers:
+            worker.queue.put(_STOP)
+        for worker in self.workers:
+            worker.join()
+        self.workers = None
+
+    def close(self):
+        """
+        Stops the worker threads of the calling thread. They are started
+        again when the storage is written to next.
+        """
+        self.shutdown()
+
+    def _call_all(self, method, *args):
+        """
+        Calls ``method`` on all backends, and raises the first error any of
+        them ran into once all of them are done.
+        """
+        self._ensure_started()
+
+        results = Queue()
+        for worker in self.workers:
+            worker.queue.put((method, args, results))
+
+        errors = []
+        for backend in self.backends:
+            if not self._is_local(backend):
+                continue
+            try:
+                getattr(backend, method)(*args)
+            except Exception:
+                errors.append(sys.exc_info())
+
+        for _ in self.workers:
+            exc_info = results.get()
+            if exc_info is not None:
+                errors.append(exc_info)
+
+        if errors:
+            six.reraise(*errors[0])
+
     def get(self, id):
         # just fetch it from a random backend, we're not aiming for consistency
         backend = self.read_selector(self.backends)
@@ -50,45 +147,16 @@ class MultiNodeStorage(NodeStorage):
         return backend.get_multi(id_list=id_list)
 
     def set(self, id, data):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.set(id, data)
-            except Exception:
-                should_raise = True
-
-        if should_raise:
-            raise
+        self._call_all('set', id, data)
 
     def set_multi(self, values):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.set_multi(values)
-            except Exception:
-                should_raise = True
-
-        if should_raise:
-            raise
+        self._call_all('set_multi', values)
 
     def delete(self, id):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.delete(id)
-            except Exception:
-                should_raise = True
+        self._call_all('delete', id)
 
-        if should_raise:
-            raise
+    def delete_multi(self, id_list):
+        self._call_all('delete_multi', list(id_list))
 
     def cleanup(self, cutoff_timestamp):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.cleanup(cutoff_timestamp)
-            except Exception:
-                should_raise = True
-
-        if should_raise:
-            raise
+        self._call_all('cleanup', cutoff_timestamp)
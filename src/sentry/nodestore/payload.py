@@ -0,0 +1,132 @@
+"""
+sentry.nodestore.payload
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import base64
+import collections
+import logging
+import msgpack
+import six
+import zlib
+
+from sentry.utils.compat import pickle
+from sentry.utils.json import better_default_encoder
+from sentry.utils.strings import decompress
+
+logger = logging.getLogger(__name__)
+
+# Marks payloads in the current format. Legacy payloads are base64 encoded
+# zlib streams, which never contain a colon.
+FORMAT_PREFIX = u'v1:'
+
+# Extension type of a top level container, which is encoded on its own so
+# that it's only decoded once it's accessed.
+SECTION_EXT = 16
+
+SECTION_TYPES = (dict, list, tuple)
+
+
+class Section(object):
+    def __init__(self, data):
+        self.data = data
+
+
+def _ext_hook(code, data):
+    if code == SECTION_EXT:
+        return Section(data)
+    return msgpack.ExtType(code, data)
+
+
+def _pack(value):
+    # values msgpack can't represent are stored like they would be as JSON
+    return msgpack.packb(value, use_bin_type=True, default=better_default_encoder)
+
+
+def _unpack(data, **kwargs):
+    return msgpack.unpackb(data, encoding='utf-8', **kwargs)
+
+
+class NodePayload(collections.MutableMapping):
+    """
+    The data of a node, of which every top level container is decoded when
+    it's first accessed.
+    """
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, key):
+        value = self._table[key]
+        if isinstance(value, Section):
+            value = self._table[key] = _unpack(value.data)
+        return value
+
+    def __setitem__(self, key, value):
+        self._table[key] = value
+
+    def __delitem__(self, key):
+        del self._table[key]
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        return dict(self)
+
+    def iter_encoded(self):
+        """
+        Iterates over the keys and values, with the values that were not
+        accessed yet as ``Section``.
+        """
+        return six.iteritems(self._table)
+
+
+def encode(data):
+    """
+    Encodes the data of a node (a dictionary) as text.
+
+    The data is stored as compressed msgpack, with a section for every top
+    level container. Values msgpack can't represent are converted like
+    ``sentry.utils.json`` does, and anything else raises a ``TypeError``.
+    """
+    if isinstance(data, NodePayload):
+        items = data.iter_encoded()
+    else:
+        items = six.iteritems(data)
+
+    try:
+        table = {}
+        for key, value in items:
+            if isinstance(value, Section):
+                value = msgpack.ExtType(SECTION_EXT, value.data)
+            elif isinstance(value, SECTION_TYPES):
+                value = msgpack.ExtType(SECTION_EXT, _pack(value))
+            table[key] = value
+        payload = _pack(table)
+    except (TypeError, ValueError, OverflowError) as exc:
+        logger.error('nodestore.encode-failed', exc_info=True)
+        raise TypeError('Unable to encode node data: %s' % (exc,))
+    return FORMAT_PREFIX + base64.b64encode(zlib.compress(payload)).decode('ascii')
+
+
+def decode(value):
+    """
+    Decodes the data of a node, as encoded by ``encode`` or (for nodes
+    written before it existed) as a compressed pickle.
+    """
+    if value.startswith(FORMAT_PREFIX):
+        return NodePayload(_unpack(
+            zlib.decompress(base64.b64decode(value[len(FORMAT_PREFIX):])),
+            ext_hook=_ext_hook,
+        ))
+    return pickle.loads(decompress(value))
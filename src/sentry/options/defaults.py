@@ -51,6 +51,10 @@ register('redis.options', type=Dict, flags=FLAG_NOSTORE)
 
 # symbolizer specifics
 register('dsym.cache-path', type=String, default='/tmp/sentry-dsym-cache')
+# the least recently used files are removed once the cache grows beyond this
+register('dsym.cache-max-size', default=10 * 1024 * 1024 * 1024)
+# number of dsym files fetched into the cache concurrently
+register('dsym.fetch-workers', default=4)
 
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
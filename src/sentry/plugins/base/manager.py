@@ -11,11 +11,21 @@ __all__ = ('PluginManager',)
 
 import logging
 
+from celery.signals import task_postrun
+from django.core.signals import request_finished
+
 from sentry.utils.managers import InstanceManager
 from sentry.utils.safe import safe_execute
 
 
 class PluginManager(InstanceManager):
+    def __init__(self, *args, **kwargs):
+        super(PluginManager, self).__init__(*args, **kwargs)
+        self.clear_project_cache()
+        # project options are only cached for a request (or task) as well
+        request_finished.connect(self.clear_project_cache)
+        task_postrun.connect(self.clear_project_cache)
+
     def __iter__(self):
         return iter(self.all())
 
@@ -43,12 +53,39 @@ class PluginManager(InstanceManager):
                 return True
         return False
 
+    def clear_project_cache(self, **kwargs):
+        self.__project_cache = {}
+
     def for_project(self, project, version=1):
-        for plugin in self.all(version=version):
-            if not safe_execute(plugin.is_enabled, project,
-                                _with_transaction=False):
-                continue
-            yield plugin
+        """
+        Returns the plugins enabled for ``project``.
+
+        These are looked up once per project and version, and reused until
+        the end of the request (or task) unless the options of the project or
+        the registered plugins change in the meantime.
+        """
+        from sentry.models import ProjectOption
+
+        # the options of a project (and the registered plugins) are kept as
+        # the same object for as long as they don't change
+        options = ProjectOption.objects.get_all_values(project)
+        registry = super(PluginManager, self).all()
+
+        key = (project.id, version)
+        try:
+            cached_options, cached_registry, result = self.__project_cache[key]
+        except KeyError:
+            pass
+        else:
+            if cached_options is options and cached_registry is registry:
+                return iter(result)
+
+        result = [
+            plugin for plugin in self.all(version=version)
+            if safe_execute(plugin.is_enabled, project, _with_transaction=False)
+        ]
+        self.__project_cache[key] = (options, registry, result)
+        return iter(result)
 
     def for_site(self, version=1):
         for plugin in self.all(version=version):
@@ -14,7 +14,7 @@ from sentry.models import (
     Organization, OrganizationMember, Project, User,
     Team, ProjectKey, TagKey, TagValue, GroupTagValue, GroupTagKey
 )
-from sentry.signals import buffer_incr_complete
+from sentry.signals import buffer_batch_complete, buffer_incr_complete
 from sentry.utils import db
 
 PROJECT_SEQUENCE_FIX = """
@@ -184,6 +184,20 @@ def record_group_tag_count(filters, created, extra, **kwargs):
     })
 
 
+@buffer_batch_complete.connect(sender=GroupTagValue, weak=False)
+def clear_group_tag_summaries(batch, **kwargs):
+    # once per group, not for every value that was flushed
+    group_ids = set()
+    for _, filters, _ in batch:
+        group_id = filters.get('group_id')
+        if not group_id:
+            group_id = filters['group'].id
+        group_ids.add(group_id)
+
+    for group_id in group_ids:
+        GroupTagValue.clear_tag_summary_cache(group_id)
+
+
 # Anything that relies on default objects that may not exist with default
 # fields should be wrapped in handle_db_failure
 post_syncdb.connect(
@@ -13,5 +13,13 @@ from sentry.rules.base import RuleBase
 class EventCondition(RuleBase):
     rule_type = 'condition/event'
 
+    @classmethod
+    def prepare(cls, conditions, event):
+        """
+        Called with all conditions of this type which are about to be
+        evaluated for ``event``, before any of them are, so that they can
+        share their lookups.
+        """
+
     def passes(self, event, state):
         raise NotImplementedError
@@ -45,9 +45,18 @@ class BaseEventFrequencyCondition(EventCondition):
         from sentry.app import tsdb
 
         self.tsdb = kwargs.pop('tsdb', tsdb)
+        # interval => rate, shared by the conditions evaluated for an event
+        self.rates = None
 
         super(BaseEventFrequencyCondition, self).__init__(*args, **kwargs)
 
+    @classmethod
+    def prepare(cls, conditions, event):
+        # conditions over the same interval only need to query it once
+        rates = {}
+        for condition in conditions:
+            condition.rates = rates
+
     def passes(self, event, state):
         interval = self.get_option('interval')
         try:
@@ -68,13 +77,19 @@ class BaseEventFrequencyCondition(EventCondition):
         raise NotImplementedError  # subclass must implement
 
     def get_rate(self, event, interval):
+        if self.rates is not None and interval in self.rates:
+            return self.rates[interval]
+
         _, duration = intervals[interval]
         end = timezone.now()
-        return self.query(
+        rate = self.query(
             event,
             end - duration,
             end,
         )
+        if self.rates is not None:
+            self.rates[interval] = rate
+        return rate
 
 
 class EventFrequencyCondition(BaseEventFrequencyCondition):
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import logging
+import six
 
 from collections import defaultdict, namedtuple
 from datetime import timedelta
@@ -33,6 +34,35 @@ class EventCompatibilityProxy(object):
         return self._event.get_legacy_message()
 
 
+class CompiledRule(object):
+    """
+    The parsed data of a rule, with its conditions and actions resolved to
+    their classes.
+    """
+    def __init__(self, rule):
+        self.rule = rule
+        self.match = rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH
+        self.frequency = rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY
+        self.conditions = [
+            (rules.get(data['id']), data)
+            for data in rule.data.get('conditions', ())
+        ]
+        self.actions = [
+            (rules.get(data['id']), data)
+            for data in rule.data.get('actions', ())
+        ]
+
+
+def compile_rule(rule):
+    # The rules of a project are shared between events by the local cache of
+    # ``Rule.get_for_project``, so they're compiled once for as long as they
+    # stay cached (and don't change.)
+    compiled = rule.__dict__.get('_compiled_rule')
+    if compiled is None:
+        compiled = rule._compiled_rule = CompiledRule(rule)
+    return compiled
+
+
 class RuleProcessor(object):
     logger = logging.getLogger('sentry.rules')
 
@@ -51,25 +81,54 @@ class RuleProcessor(object):
     def get_rules(self):
         return Rule.get_for_project(self.project.id)
 
-    def get_rule_status(self, rule):
-        rule_status, _ = GroupRuleStatus.objects.get_or_create(
-            rule=rule,
-            group=self.group,
-            defaults={
-                'project': self.project,
-            },
+    def get_rule_statuses(self, rule_list):
+        statuses = dict(
+            (status.rule_id, status)
+            for status in GroupRuleStatus.objects.filter(
+                group=self.group,
+                rule__in=[rule.id for rule in rule_list],
+            )
         )
 
-        return rule_status
-
-    def condition_matches(self, condition, state, rule):
-        condition_cls = rules.get(condition['id'])
-        if condition_cls is None:
-            self.logger.warn('Unregistered condition %r', condition['id'])
+        for rule in rule_list:
+            if rule.id in statuses:
+                continue
+            statuses[rule.id], _ = GroupRuleStatus.objects.get_or_create(
+                rule=rule,
+                group=self.group,
+                defaults={
+                    'project': self.project,
+                },
+            )
+
+        return statuses
+
+    def get_conditions(self, compiled):
+        conditions = []
+        for condition_cls, data in compiled.conditions:
+            if condition_cls is None:
+                self.logger.warn('Unregistered condition %r', data['id'])
+                conditions.append(None)
+                continue
+            conditions.append(
+                condition_cls(self.project, data=data, rule=compiled.rule)
+            )
+        return conditions
+
+    def prepare_conditions(self, conditions):
+        conditions_by_cls = defaultdict(list)
+        for condition in conditions:
+            if condition is not None:
+                conditions_by_cls[type(condition)].append(condition)
+
+        for condition_cls, condition_list in six.iteritems(conditions_by_cls):
+            safe_execute(condition_cls.prepare, condition_list, self.event,
+                         _with_transaction=False)
+
+    def condition_matches(self, condition, state):
+        if condition is None:
             return
-
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
-        return safe_execute(condition_inst.passes, self.event, state,
+        return safe_execute(condition.passes, self.event, state,
                             _with_transaction=False)
 
     def get_state(self):
@@ -79,29 +138,16 @@ class RuleProcessor(object):
             is_sample=self.is_sample,
         )
 
-    def apply_rule(self, rule):
-        match = rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH
-        condition_list = rule.data.get('conditions', ())
-        frequency = rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY
-
-        # XXX(dcramer): if theres no condition should we really skip it,
-        # or should we just apply it blindly?
-        if not condition_list:
-            return
-
-        status = self.get_rule_status(rule)
-
-        now = timezone.now()
-        freq_offset = now - timedelta(minutes=frequency)
-
-        if status.last_active and status.last_active > freq_offset:
-            return
+    def apply_rule(self, compiled, status, conditions, now):
+        rule = compiled.rule
+        match = compiled.match
+        freq_offset = now - timedelta(minutes=compiled.frequency)
 
         state = self.get_state()
 
         condition_iter = (
-            self.condition_matches(c, state, rule)
-            for c in condition_list
+            self.condition_matches(c, state)
+            for c in conditions
         )
 
         if match == 'all':
@@ -125,8 +171,7 @@ class RuleProcessor(object):
         if not passed:
             return
 
-        for action in rule.data.get('actions', ()):
-            action_cls = rules.get(action['id'])
+        for action_cls, action in compiled.actions:
             if action_cls is None:
                 self.logger.warn('Unregistered action %r', action['id'])
                 continue
@@ -145,6 +190,31 @@ class RuleProcessor(object):
 
     def apply(self):
         self.futures_by_cb = defaultdict(list)
-        for rule in self.get_rules():
-            self.apply_rule(rule)
+
+        # XXX(dcramer): if theres no condition should we really skip it,
+        # or should we just apply it blindly?
+        compiled_rules = [
+            compiled for compiled in map(compile_rule, self.get_rules())
+            if compiled.conditions
+        ]
+        if not compiled_rules:
+            return []
+
+        statuses = self.get_rule_statuses([c.rule for c in compiled_rules])
+
+        now = timezone.now()
+        pending = []
+        for compiled in compiled_rules:
+            status = statuses[compiled.rule.id]
+            freq_offset = now - timedelta(minutes=compiled.frequency)
+            if status.last_active and status.last_active > freq_offset:
+                continue
+            pending.append((compiled, status, self.get_conditions(compiled)))
+
+        self.prepare_conditions(
+            condition for _, _, conditions in pending for condition in conditions
+        )
+
+        for compiled, status, conditions in pending:
+            self.apply_rule(compiled, status, conditions, now)
         return list(self.futures_by_cb.items())
@@ -8,12 +8,23 @@ sentry.runner.commands.cleanup
 from __future__ import absolute_import, print_function
 
 import click
+import hashlib
+import multiprocessing
+import six
+import time
+import traceback
 
+from collections import defaultdict
 from datetime import timedelta
 from django.utils import timezone
+from six.moves import queue
 
 from sentry.runner.decorators import configuration
 
+# How long the progress of an interrupted deletion is kept around for the
+# next run to pick it up.
+CHECKPOINT_TTL = 60 * 60 * 24
+
 
 def get_project(value):
     from sentry.models import Project
@@ -32,14 +43,158 @@ def get_project(value):
         return None
 
 
+def get_checkpoint_key(query):
+    return 'cleanup:checkpoint:{}'.format(hashlib.md5('{}:{}:{}:{}'.format(
+        query.model._meta.db_table,
+        query.dtfield,
+        query.days,
+        query.project_id,
+    )).hexdigest())
+
+
+def get_checkpoint_client(key):
+    from sentry.utils.redis import clusters
+
+    return clusters.get('default').get_local_client_for_key(key)
+
+
+def get_checkpoint(key):
+    from sentry.utils import json
+
+    value = get_checkpoint_client(key).get(key)
+    if value is None:
+        return None
+    return json.loads(value)
+
+
+def set_checkpoint(key, partitions):
+    from sentry.utils import json
+
+    get_checkpoint_client(key).setex(key, CHECKPOINT_TTL, json.dumps(partitions))
+
+
+def delete_checkpoint(key):
+    get_checkpoint_client(key).delete(key)
+
+
+def run_partition(query, index, lower, upper, chunk_size, cascade, report):
+    try:
+        for last_id, count in query.execute_partition(
+            lower, upper, chunk_size=chunk_size, cascade=cascade,
+        ):
+            report((index, last_id, count))
+    except Exception:
+        report((index, None, traceback.format_exc()))
+    else:
+        report((index, None, None))
+
+
+def bulk_delete(query, concurrency=1, chunk_size=100, cascade=True, silent=False):
+    """
+    Deletes the rows matched by a ``BulkDeleteQuery``, splitting their id
+    range across ``concurrency`` worker processes.
+
+    The progress of every partition is checkpointed in Redis, so that when
+    a run is interrupted the next one continues where it stopped.
+    """
+    from django.db import connections
+
+    model_name = query.model.__name__
+    checkpoint_key = get_checkpoint_key(query)
+    partitions = get_checkpoint(checkpoint_key)
+    if partitions is None:
+        partitions = [list(p) for p in query.get_partitions(concurrency)]
+        set_checkpoint(checkpoint_key, partitions)
+    elif not silent:
+        click.echo('>> Resuming %s from checkpoint' % model_name)
+
+    stats = {'deleted': 0, 'failed': []}
+
+    def handle(message):
+        index, last_id, count = message
+        if last_id is None:
+            if count is not None:
+                stats['failed'].append(index)
+                click.echo('Error deleting %s:\n%s' % (model_name, count), err=True)
+            return False
+        partitions[index][0] = last_id + 1
+        stats['deleted'] += count
+        set_checkpoint(checkpoint_key, partitions)
+        return True
+
+    pending = [
+        (index, lower, upper)
+        for index, (lower, upper) in enumerate(partitions)
+        if lower <= upper
+    ]
+
+    started = time.time()
+    if concurrency > 1 and len(pending) > 1:
+        # Every process needs its own database connections
+        for connection in connections.all():
+            connection.close()
+
+        results = multiprocessing.Queue()
+        workers = {}
+        for index, lower, upper in pending:
+            workers[index] = multiprocessing.Process(
+                target=run_partition,
+                args=(query, index, lower, upper, chunk_size, cascade, results.put),
+            )
+            workers[index].start()
+
+        running = dict(workers)
+        exited = set()
+        while running:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                for index, worker in list(running.items()):
+                    if worker.is_alive():
+                        continue
+                    # The last message of a worker which exited normally may
+                    # still be on its way, so it gets another round to
+                    # arrive. Anything else went away without saying so.
+                    if worker.exitcode == 0 and index not in exited:
+                        exited.add(index)
+                        continue
+                    handle((index, None, 'Worker exited with code %s' % worker.exitcode))
+                    del running[index]
+                continue
+            if not handle(message):
+                running.pop(message[0], None)
+
+        for worker in workers.values():
+            worker.join()
+    else:
+        for index, lower, upper in pending:
+            run_partition(query, index, lower, upper, chunk_size, cascade, handle)
+
+    if stats['failed']:
+        raise click.ClickException(
+            'Failed to delete %s, run cleanup again to resume' % model_name)
+
+    delete_checkpoint(checkpoint_key)
+
+    if not silent:
+        duration = time.time() - started
+        click.echo('>> Deleted {count} {model} in {duration:.1f}s ({rate:.0f} rows/s)'.format(
+            count=stats['deleted'],
+            model=model_name,
+            duration=duration,
+            rate=stats['deleted'] / duration if duration else 0,
+        ))
+
+
 @click.command()
 @click.option('--days', default=30, show_default=True, help='Numbers of days to truncate on.')
 @click.option('--project', help='Limit truncation to only entries from project.')
 @click.option('--concurrency', type=int, default=1, show_default=True, help='The number of concurrent workers to run.')
 @click.option('--silent', '-q', default=False, is_flag=True, help='Run quietly. No output on success.')
 @click.option('--model', '-m', multiple=True)
+@click.option('--dry-run-files', default=False, is_flag=True, help='Only report how many unused files there are and their size, without deleting anything.')
 @configuration
-def cleanup(days, project, concurrency, silent, model):
+def cleanup(days, project, concurrency, silent, model, dry_run_files):
     """Delete a portion of trailing data based on creation date.
 
     All data that is older than `--days` will be deleted.  The default for
@@ -47,6 +202,10 @@ def cleanup(days, project, concurrency, silent, model):
     but if you have a specific project you want to limit this to this can be
     done with the `--project` flag which accepts a project ID or a string
     with the form `org/project` where both are slugs.
+
+    With `--concurrency` the rows of every model are split up between that
+    many worker processes.  An interrupted run continues where it stopped
+    when cleanup is run again.
     """
     from sentry.app import nodestore
     from sentry.db.deletion import BulkDeleteQuery
@@ -55,6 +214,10 @@ def cleanup(days, project, concurrency, silent, model):
         LostPasswordHash, TagValue, GroupEmailThread,
     )
 
+    if dry_run_files:
+        cleanup_unused_files(silent, dry_run=True)
+        return
+
     models = {m.lower() for m in model}
 
     def is_filtered(model):
@@ -117,12 +280,14 @@ def cleanup(days, project, concurrency, silent, model):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
-            BulkDeleteQuery(
+            if model is GroupTagValue:
+                delete_tag_index(days, project_id)
+            bulk_delete(BulkDeleteQuery(
                 model=model,
                 dtfield=dtfield,
                 days=days,
                 project_id=project_id,
-            ).execute()
+            ), concurrency, chunk_size=10000, cascade=False, silent=silent)
 
     # EventMapping is fairly expensive and is special cased as it's likely you
     # won't need a reference to an event for nearly as long
@@ -132,12 +297,12 @@ def cleanup(days, project, concurrency, silent, model):
         if not silent:
             click.echo('>> Skipping EventMapping')
     else:
-        BulkDeleteQuery(
+        bulk_delete(BulkDeleteQuery(
             model=EventMapping,
             dtfield='date_added',
             days=min(days, 7),
             project_id=project_id,
-        ).execute()
+        ), concurrency, chunk_size=10000, cascade=False, silent=silent)
 
     # Clean up FileBlob instances which are no longer used and aren't super
     # recent (as there could be a race between blob creation and reference)
@@ -160,15 +325,48 @@ def cleanup(days, project, concurrency, silent, model):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
-            BulkDeleteQuery(
+            bulk_delete(BulkDeleteQuery(
                 model=model,
                 dtfield=dtfield,
                 days=days,
                 project_id=project_id,
-            ).execute_generic()
+            ), concurrency, chunk_size=100, cascade=True, silent=silent)
+
+
+def delete_tag_index(days, project_id=None):
+    """
+    Stops indexing the tags of groups whose values are about to be removed,
+    as the counts of the tag index would no longer match the database.
+    """
+    from sentry.app import tagindex
+    from sentry.models import GroupTagValue
+
+    if not tagindex.enabled:
+        return
+
+    cutoff = timezone.now() - timedelta(days=days)
+    # groups without recent events aren't indexed anymore
+    queryset = GroupTagValue.objects.filter(
+        last_seen__lt=cutoff,
+        group__last_seen__gte=cutoff,
+    )
+    if project_id:
+        queryset = queryset.filter(project_id=project_id)
 
+    keys = defaultdict(set)
+    for group_id, key in queryset.values_list('group_id', 'key').distinct().iterator():
+        keys[group_id].add(key)
+    for group_id, group_keys in six.iteritems(keys):
+        tagindex.delete(group_id, group_keys)
 
-def cleanup_unused_files(quiet=False):
+
+def delete_file(path):
+    from sentry.models.file import get_storage
+
+    get_storage().delete(path)
+
+
+def cleanup_unused_files(quiet=False, dry_run=False, chunk_size=1000, workers=10):
     """
     Remove FileBlob's (and thus the actual files) if they are no longer
     referenced by any File.
@@ -176,21 +374,107 @@ def cleanup_unused_files(quiet=False):
     We set a minimum-age on the query to ensure that we don't try to remove
     any blobs which are brand new and potentially in the process of being
     referenced.
+
+    Blobs are looked at a range of ids at a time, excluding the referenced
+    ones in the same query, and the files of a range are removed from the
+    storage concurrently.  Like `FileBlob.delete` this holds the upload lock
+    of every blob it removes (blobs that are being uploaded again are
+    skipped), and the references are checked again by the DELETE itself.
+    With `dry_run` nothing is removed.  Returns the number of unused (or
+    removed) blobs and their total size.
     """
+    from django.db import router
+    from django.db.models.sql.subqueries import DeleteQuery
+    from sentry.app import locks
     from sentry.models import File, FileBlob, FileBlobIndex
-    if quiet:
-        from sentry.utils.query import RangeQuerySetWrapper
-    else:
-        from sentry.utils.query import RangeQuerySetWrapperWithProgressBar as RangeQuerySetWrapper
+    from sentry.utils.locking import UnableToAcquireLock
+    from sentry.utils.threadpool import ThreadPool
 
     cutoff = timezone.now() - timedelta(days=1)
     queryset = FileBlob.objects.filter(
         timestamp__lte=cutoff,
     )
+    using = router.db_for_write(FileBlob)
+
+    count = size = 0
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(
+            id__gt=last_id,
+        ).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        first_id, last_id = ids[0], ids[-1]
+
+        def unreferenced(queryset):
+            return queryset.exclude(
+                id__in=FileBlobIndex.objects.filter(
+                    blob__gte=first_id,
+                    blob__lte=last_id,
+                ).values('blob'),
+            ).exclude(
+                id__in=File.objects.filter(
+                    blob__gte=first_id,
+                    blob__lte=last_id,
+                ).values('blob'),
+            )
 
-    for blob in RangeQuerySetWrapper(queryset):
-        if FileBlobIndex.objects.filter(blob=blob).exists():
+        unused = list(unreferenced(queryset.filter(
+            id__gte=first_id,
+            id__lte=last_id,
+        )).values_list('id', 'checksum', 'path', 'size'))
+        if not unused:
             continue
-        if File.objects.filter(blob=blob).exists():
+
+        if dry_run:
+            count += len(unused)
+            size += sum(blob_size or 0 for _, _, _, blob_size in unused)
+            continue
+
+        held = []
+        try:
+            for blob in unused:
+                lock = locks.get('fileblob:upload:{}'.format(blob[1]), duration=60 * 10)
+                try:
+                    lock.acquire()
+                except UnableToAcquireLock:
+                    continue
+                held.append((lock, blob))
+
+            if not held:
+                continue
+
+            # The rows go first: an upload of the same content can no longer
+            # pick up a blob whose file is being removed.
+            locked_ids = [blob[0] for _, blob in held]
+            DeleteQuery(FileBlob).delete_qs(unreferenced(FileBlob.objects.filter(
+                id__in=locked_ids,
+            )), using)
+            remaining = set(FileBlob.objects.filter(
+                id__in=locked_ids,
+            ).values_list('id', flat=True))
+        finally:
+            for lock, _ in held:
+                lock.release()
+
+        deleted = [blob for _, blob in held if blob[0] not in remaining]
+        count += len(deleted)
+        size += sum(blob_size or 0 for _, _, _, blob_size in deleted)
+
+        paths = [path for _, _, path, _ in deleted if path]
+        if not paths:
             continue
-        blob.delete()
+        pool = ThreadPool(min(workers, len(paths)))
+        for path in paths:
+            pool.add(path, delete_file, args=(path,))
+        for path, results in six.iteritems(pool.join()):
+            if isinstance(results[0], Exception):
+                click.echo('Error removing file %s: %s' % (path, results[0]), err=True)
+
+    if not quiet:
+        click.echo('>> {verb} {count} unused FileBlob ({size} bytes)'.format(
+            verb='Found' if dry_run else 'Removed',
+            count=count,
+            size=size,
+        ))
+    return count, size
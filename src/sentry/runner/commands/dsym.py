@@ -72,6 +72,7 @@ def load_bundle(q, uuid, data, sdk_info, trim_symbols, demangle):
 def process_archive(members, zip, sdk_info, threads=8, trim_symbols=False,
                     demangle=True):
     from sentry.models import DSymSymbol
+    from sentry.lang.native.symbolindex import symbolindex
     import Queue
     q = Queue.Queue(threads)
 
@@ -89,6 +90,7 @@ def process_archive(members, zip, sdk_info, threads=8, trim_symbols=False,
         t.start()
         pool.append(t)
 
+    object_ids = set()
     for member in members:
         try:
             id = uuid.UUID(member)
@@ -96,6 +98,7 @@ def process_archive(members, zip, sdk_info, threads=8, trim_symbols=False,
             continue
         for chunk in load_bundle(q.put, id, json.load(zip.open(member)),
                                  sdk_info, trim_symbols, demangle):
+            object_ids.add(chunk[0][0])
             q.put(chunk)
 
     for t in pool:
@@ -103,6 +106,11 @@ def process_archive(members, zip, sdk_info, threads=8, trim_symbols=False,
     for t in pool:
         t.join()
 
+    # Build the lookup indexes for the imported objects right away, rather
+    # than when the first event needs them.
+    for object_id in object_ids:
+        symbolindex.build_index(object_id)
+
 
 @click.group(name='dsym')
 def dsym():
@@ -271,6 +271,7 @@ def validate_backends():
         app.quotas,
         app.ratelimiter,
         app.search,
+        app.tagindex,
         app.tsdb,
     )
 
@@ -0,0 +1,19 @@
+-- Stops indexing some tags of a group.
+--
+-- ``KEYS`` starts with the totals hash of the group, followed by the sorted
+-- set of values of every tag, and ``ARGV`` holds the field of every tag in
+-- the totals hash. The tags are marked with a negative total (so that they
+-- aren't recorded anymore), but only if the group is indexed at all.
+assert(#KEYS - 1 == #ARGV, "incorrect number of keys and arguments provided")
+
+local totals_key = KEYS[1]
+
+for i = 2, #KEYS do
+    redis.call('DEL', KEYS[i])
+end
+
+if redis.call('EXISTS', totals_key) == 1 then
+    for i = 1, #ARGV do
+        redis.call('HSET', totals_key, ARGV[i], -1)
+    end
+end
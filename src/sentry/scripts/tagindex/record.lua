@@ -0,0 +1,50 @@
+-- Records the values of an event in the top value tables of its tags.
+--
+-- ``KEYS`` starts with a hash of the total number of values seen for every
+-- tag of the group, followed by a sorted set of the values of every tag
+-- (scored by the number of times they were seen). ``ARGV`` starts with the
+-- capacity of the sorted sets, the number of seconds they should be kept for
+-- and whether this is the first event of the group, followed by the field
+-- of every tag in the totals hash and its value.
+--
+-- Only groups which were indexed from their first event on (which have a
+-- totals hash) are updated, and tags with a negative total are no longer
+-- indexed. Once a table is full, a value which isn't in it yet replaces the
+-- least frequently seen value and inherits its score ("Space-Saving"), which
+-- may overestimate the counts of rare values but never misses frequent ones.
+assert(#ARGV - 3 == (#KEYS - 1) * 2, "incorrect number of keys and arguments provided")
+
+local totals_key = KEYS[1]
+local capacity = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+
+if ARGV[3] == '1' then
+    redis.call('HSETNX', totals_key, '', 1)
+elseif redis.call('EXISTS', totals_key) == 0 then
+    return
+end
+
+for i = 2, #KEYS do
+    local values_key = KEYS[i]
+    local field = ARGV[i * 2]
+    local value = ARGV[i * 2 + 1]
+    local total = tonumber(redis.call('HGET', totals_key, field) or '0')
+
+    if total > 0 and redis.call('EXISTS', values_key) == 0 then
+        -- the values expired on their own, so the counts of this tag are
+        -- incomplete from now on
+        redis.call('HSET', totals_key, field, -1)
+    elseif total >= 0 then
+        if redis.call('ZSCORE', values_key, value) or redis.call('ZCARD', values_key) < capacity then
+            redis.call('ZINCRBY', values_key, 1, value)
+        else
+            local min = redis.call('ZRANGE', values_key, 0, 0, 'WITHSCORES')
+            redis.call('ZREM', values_key, min[1])
+            redis.call('ZADD', values_key, tonumber(min[2]) + 1, value)
+        end
+        redis.call('HINCRBY', totals_key, field, 1)
+        redis.call('EXPIRE', values_key, ttl)
+    end
+end
+
+redis.call('EXPIRE', totals_key, ttl)
@@ -0,0 +1,32 @@
+--[[
+
+Fetch fields from many hashes with a single call.
+
+Counter hashes for the same vnode contain the same fields for every rollup
+interval, so fields are passed once per group rather than once per hash:
+
+- ARGV[1] is the number of field groups,
+- each group is the number of fields followed by the fields themselves,
+- the remaining arguments are the (1-based) group index of each key in KEYS.
+
+Returns a list containing the ``HMGET`` result for each key in KEYS.
+
+]]--
+
+local groups = {}
+local offset = 2
+for i = 1, tonumber(ARGV[1]) do
+    local count = tonumber(ARGV[offset])
+    local fields = {}
+    for j = 1, count do
+        fields[j] = ARGV[offset + j]
+    end
+    groups[i] = fields
+    offset = offset + count + 1
+end
+
+local results = {}
+for i, key in ipairs(KEYS) do
+    results[i] = redis.call('HMGET', key, unpack(groups[tonumber(ARGV[offset + i - 1])]))
+end
+return results
@@ -30,6 +30,7 @@ class BetterSignal(Signal):
 
 regression_signal = BetterSignal(providing_args=["instance"])
 buffer_incr_complete = BetterSignal(providing_args=["model", "columns", "extra", "result"])
+buffer_batch_complete = BetterSignal(providing_args=["model", "batch"])
 event_accepted = BetterSignal(providing_args=["ip", "data", "project"])
 event_dropped = BetterSignal(providing_args=["ip", "data", "project"])
 event_filtered = BetterSignal(providing_args=["ip", "data", "project"])
@@ -0,0 +1,51 @@
+"""
+sentry.tagindex.base
+~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+
+class TagIndex(object):
+    """
+    Tag indexes keep track of the most frequently seen values of each tag of
+    a group as events come in, so that they don't need to be ranked from the
+    ``GroupTagValue`` rows when they're looked up.
+
+    The default implementation doesn't index anything, which means all
+    lookups fall back to the database.
+    """
+    #: Whether anything is indexed, i.e. whether ``delete`` needs to be
+    #: called when tag values are removed from the database.
+    enabled = False
+
+    def validate(self):
+        """
+        Validates the settings for this backend (i.e. such as proper connection
+        info).
+
+        Raise ``InvalidConfiguration`` if there is a configuration error.
+        """
+
+    def record(self, group_id, tags, is_new=False):
+        """
+        Records an event of a group with the given ``(key, value)`` tags.
+        Only groups whose first event (``is_new``) was recorded are indexed,
+        so that their counts are complete.
+        """
+
+    def get_top_values(self, group_id, keys, limit):
+        """
+        Returns the total number of values seen and the ``limit`` most seen
+        values of each indexed key of ``keys``, as ``{key: (total, [(value,
+        times_seen), ...])}``. Keys which aren't indexed are left out.
+        """
+        return {}
+
+    def delete(self, group_id, keys):
+        """
+        Stops indexing the given keys of a group, i.e. when its tag values
+        changed other than through ``record``.
+        """
@@ -0,0 +1,109 @@
+"""
+sentry.tagindex.redis
+~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import six
+
+from django.utils.encoding import force_bytes, force_text
+
+from sentry.exceptions import InvalidConfiguration
+from sentry.tagindex.base import TagIndex
+from sentry.utils.hashlib import md5_text
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+record_values = load_script('tagindex/record.lua')
+delete_values = load_script('tagindex/delete.lua')
+
+
+class RedisTagIndex(TagIndex):
+    """
+    Keeps a bounded table of the most frequently seen values of each tag of a
+    group in Redis, which is updated for every event from the first event of
+    the group on.  Groups which were created before the index was enabled
+    (or which didn't see an event for ``ttl`` seconds) aren't indexed.
+
+    All of the tags of a group are stored on the same host.
+    """
+    enabled = True
+
+    def __init__(self, capacity=100, ttl=60 * 60 * 24 * 7, **options):
+        self.cluster, options = get_cluster_from_options('SENTRY_TAG_INDEX_OPTIONS', options)
+        self.capacity = capacity
+        self.ttl = ttl
+
+    def validate(self):
+        try:
+            with self.cluster.all() as client:
+                client.ping()
+        except Exception as e:
+            raise InvalidConfiguration(six.text_type(e))
+
+    def get_client(self, group_id):
+        return self.cluster.get_local_client_for_key(six.text_type(group_id))
+
+    def make_totals_key(self, group_id):
+        return 'ti:{}:t'.format(group_id)
+
+    def make_field(self, key):
+        return md5_text(key).hexdigest()
+
+    def make_values_key(self, group_id, key):
+        return 'ti:{}:{}:v'.format(group_id, self.make_field(key))
+
+    def record(self, group_id, tags, is_new=False):
+        if not tags and not is_new:
+            return
+
+        keys = [self.make_totals_key(group_id)]
+        args = [self.capacity, self.ttl, int(is_new)]
+        for key, value in tags:
+            keys.append(self.make_values_key(group_id, key))
+            args.extend((self.make_field(key), force_bytes(value)))
+
+        record_values(self.get_client(group_id), keys, args)
+
+    def get_top_values(self, group_id, keys, limit):
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        with self.get_client(group_id).pipeline(transaction=False) as pipe:
+            totals_key = self.make_totals_key(group_id)
+            pipe.exists(totals_key)
+            pipe.hmget(totals_key, [self.make_field(key) for key in keys])
+            for key in keys:
+                pipe.zrevrange(self.make_values_key(group_id, key), 0, limit - 1, withscores=True)
+            results = pipe.execute()
+
+        if not results[0]:
+            return {}
+
+        summary = {}
+        for key, total, values in zip(keys, results[1], results[2:]):
+            total = int(total or 0)
+            # tags which are no longer indexed, or whose values expired
+            if total < 0 or (total and not values):
+                continue
+            summary[key] = (total, [
+                (force_text(value), int(times_seen))
+                for value, times_seen in values
+            ])
+        return summary
+
+    def delete(self, group_id, keys):
+        keys = list(keys)
+        if not keys:
+            return
+
+        delete_values(
+            self.get_client(group_id),
+            [self.make_totals_key(group_id)] + [
+                self.make_values_key(group_id, key) for key in keys
+            ],
+            [self.make_field(key) for key in keys],
+        )
@@ -13,6 +13,7 @@ import logging
 from django.db.models import get_model
 
 from sentry.constants import ObjectStatus
+from sentry.db.models.fields.node import deferred_node_deletes
 from sentry.exceptions import DeleteAborted
 from sentry.signals import pending_delete
 from sentry.tasks.base import instrumented_task, retry
@@ -270,6 +271,7 @@ def delete_group(object_id, transaction_id=None, continuous=True, **kwargs):
                    default_retry_delay=60 * 5, max_retries=None)
 @retry(exclude=(DeleteAborted,))
 def delete_tag_key(object_id, transaction_id=None, continuous=True, **kwargs):
+    from sentry.app import tagindex
     from sentry.models import (
         EventTag, GroupTagKey, GroupTagValue, TagKey, TagKeyStatus, TagValue
     )
@@ -280,6 +282,14 @@ def delete_tag_key(object_id, transaction_id=None, continuous=True, **kwargs):
         return
 
     if tagkey.status != TagKeyStatus.DELETION_IN_PROGRESS:
+        # the key is no longer indexed for any of the groups it was seen in
+        if tagindex.enabled:
+            for group_id in GroupTagKey.objects.filter(
+                project_id=tagkey.project_id,
+                key=tagkey.key,
+            ).values_list('group_id', flat=True).iterator():
+                tagindex.delete(group_id, [tagkey.key])
+
         tagkey.update(status=TagKeyStatus.DELETION_IN_PROGRESS)
 
     bulk_model_list = (
@@ -308,6 +318,7 @@ def delete_tag_key(object_id, transaction_id=None, continuous=True, **kwargs):
 
     tagkey_id = tagkey.id
     tagkey.delete()
+    TagKey.objects.clear_id_cache(tagkey.project_id, [tagkey.key])
     logger.info('object.delete.executed', extra={
         'object_id': tagkey_id,
         'transaction_id': transaction_id,
@@ -363,7 +374,7 @@ def delete_events(relation, transaction_id=None, limit=10000, chunk_limit=100, l
         # delete objects from nodestore first
         node_ids = set(r.data.id for r in result_set if r.data.id)
         if node_ids:
-            nodestore.delete_multi(node_ids)
+            nodestore.delete_multi(list(node_ids))
 
         event_ids = [r.id for r in result_set]
 
@@ -379,8 +390,9 @@ def delete_events(relation, transaction_id=None, limit=10000, chunk_limit=100, l
                 ],
             ))
 
-        # bulk delete by id
-        Event.objects.filter(id__in=event_ids).delete()
+        # bulk delete by id, without deleting the nodes again
+        with deferred_node_deletes(deleted=node_ids):
+            Event.objects.filter(id__in=event_ids).delete()
         if logger is not None:
             # The only reason this is a different log statement is that logging every
             # single event that gets deleted in the relation will destroy disks.
@@ -403,7 +415,8 @@ def delete_objects(models, relation, transaction_id=None, limit=100, logger=None
         for obj in model.objects.filter(**relation)[:limit]:
             obj_id = obj.id
             model_name = type(obj).__name__
-            obj.delete()
+            with deferred_node_deletes():
+                obj.delete()
             if logger is not None:
                 logger.info('object.delete.executed', extra={
                     'object_id': obj_id,
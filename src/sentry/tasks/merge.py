@@ -26,6 +26,7 @@ delete_logger = logging.getLogger('sentry.deletions.async')
 def merge_group(from_object_id=None, to_object_id=None, transaction_id=None,
                 recursed=False, **kwargs):
     # TODO(mattrobenolt): Write tests for all of this
+    from sentry.app import tagindex
     from sentry.models import (
         Activity, Group, GroupAssignee, GroupHash, GroupRuleStatus,
         GroupSubscription, GroupTagKey, GroupTagValue, EventMapping, Event,
@@ -74,6 +75,9 @@ def merge_group(from_object_id=None, to_object_id=None, transaction_id=None,
         GroupRedirect, GroupMeta,
     )
 
+    # the hashes are about to move to the new group
+    GroupHash.objects.clear_cache_for_groups([group.id])
+
     has_more = merge_objects(
         model_list,
         group,
@@ -82,6 +86,10 @@ def merge_group(from_object_id=None, to_object_id=None, transaction_id=None,
         transaction_id=transaction_id,
     )
 
+    # and again once they moved, as events may have cached the old group in
+    # the meantime
+    GroupHash.objects.clear_cache_for_groups([new_group.id])
+
     if has_more:
         merge_group.delay(
             from_object_id=from_object_id,
@@ -93,6 +101,12 @@ def merge_group(from_object_id=None, to_object_id=None, transaction_id=None,
 
     previous_group_id = group.id
 
+    # the tag values of the new group are indexed again from the database
+    tagindex.delete(new_group.id, GroupTagKey.objects.filter(
+        group=new_group,
+    ).values_list('key', flat=True))
+    GroupTagValue.clear_tag_summary_cache(new_group.id)
+
     group.delete()
     delete_logger.info('object.delete.executed', extra={
         'object_id': previous_group_id,
@@ -135,7 +149,7 @@ def rehash_group_events(group_id, transaction_id=None, **kwargs):
     # Clear out existing hashes to preempt new events being added
     # This can cause the new groups to be created before we get to them, but
     # its a tradeoff we're willing to take
-    GroupHash.objects.filter(group=group).delete()
+    GroupHash.objects.delete_for_groups([group.id])
     has_more = _rehash_group_events(group)
 
     if has_more:
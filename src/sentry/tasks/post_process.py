@@ -11,12 +11,14 @@ from __future__ import absolute_import, print_function
 import logging
 import six
 
+from django.conf import settings
 from django.db import IntegrityError, router, transaction
 from raven.contrib.django.models import client as Raven
 
+from sentry.buffer.aggregator import BatchAggregator
 from sentry.plugins import plugins
 from sentry.signals import event_processed
-from sentry.tasks.base import instrumented_task
+from sentry.tasks.base import instrumented_task, retry
 from sentry.utils import metrics
 from sentry.utils.safe import safe_execute
 
@@ -158,34 +160,128 @@ def record_affected_user(event, **kwargs):
 @instrumented_task(
     name='sentry.tasks.index_event_tags',
     default_retry_delay=60 * 5, max_retries=None)
+@retry
 def index_event_tags(organization_id, project_id, event_id, tags, group_id=None, **kwargs):
-    from sentry.models import EventTag, Project, TagKey, TagValue
-
     Raven.tags_context({
         'project': project_id,
     })
 
-    for key, value in tags:
-        tagkey, _ = TagKey.objects.get_or_create(
-            project=Project(id=project_id),
-            key=key,
-        )
+    _index_event_tags([{
+        'organization_id': organization_id,
+        'project_id': project_id,
+        'event_id': event_id,
+        'group_id': group_id,
+        'tags': tags,
+    }])
 
-        tagvalue, _ = TagValue.objects.get_or_create(
-            project=Project(id=project_id, organization_id=organization_id),
-            key=key,
-            value=value,
-        )
 
-        try:
-            # handle replaying of this task
-            with transaction.atomic():
-                EventTag.objects.create(
+@instrumented_task(
+    name='sentry.tasks.index_event_tags_batch',
+    default_retry_delay=60 * 5, max_retries=None)
+def index_event_tags_batch(items, **kwargs):
+    """
+    Indexes the tags of many events at once. ``items`` is a list of
+    dictionaries with the arguments of ``index_event_tags``.
+
+    If the batch fails as a whole, each event is indexed (and retried) by
+    its own ``index_event_tags`` task instead.
+    """
+    try:
+        _index_event_tags(items)
+    except Exception:
+        logger.exception('eventtag.batch-failed', extra={
+            'count': len(items),
+        })
+        for item in items:
+            index_event_tags.delay(**item)
+
+
+def _index_event_tags(items):
+    from sentry.models import EventTag, Project, TagKey, TagValue
+
+    items_by_project = {}
+    for item in items:
+        items_by_project.setdefault(
+            (item['organization_id'], item['project_id']), []).append(item)
+
+    rows = []
+    seen = set()
+    for (organization_id, project_id), project_items in six.iteritems(items_by_project):
+        project = Project(id=project_id, organization_id=organization_id)
+        tags = set(
+            (key, value)
+            for item in project_items
+            for key, value in item['tags']
+        )
+        key_ids = TagKey.objects.get_or_create_ids(
+            project, [key for key, _ in tags])
+        value_ids = TagValue.objects.get_or_create_ids(
+            project, list(tags), key_ids)
+
+        for item in project_items:
+            for key, value in item['tags']:
+                row = (item['event_id'], key_ids[key], value_ids[(key, value)])
+                if row in seen:
+                    continue
+                seen.add(row)
+                rows.append(EventTag(
                     project_id=project_id,
-                    group_id=group_id,
-                    event_id=event_id,
-                    key_id=tagkey.id,
-                    value_id=tagvalue.id,
-                )
-        except IntegrityError:
-            pass
+                    group_id=item.get('group_id'),
+                    event_id=row[0],
+                    key_id=row[1],
+                    value_id=row[2],
+                ))
+
+    if not rows:
+        return
+
+    using = router.db_for_write(EventTag)
+    try:
+        with transaction.atomic(using=using):
+            EventTag.objects.bulk_create(rows)
+    except IntegrityError:
+        # handle replaying of this task (or of a single event's tags)
+        existing = set(EventTag.objects.filter(
+            event_id__in=set(row.event_id for row in rows),
+        ).values_list('event_id', 'key_id', 'value_id'))
+        for row in rows:
+            if (row.event_id, row.key_id, row.value_id) in existing:
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    row.save()
+            except IntegrityError:
+                pass
+
+    metrics.timing('eventtag.batch-size', len(rows))
+
+
+def _queue_event_tags_batch(items):
+    index_event_tags_batch.delay(items=items)
+
+
+event_tag_aggregator = BatchAggregator(
+    _queue_event_tags_batch,
+    'eventtag',
+    interval=settings.SENTRY_EVENT_TAG_BATCH_INTERVAL,
+    max_size=settings.SENTRY_EVENT_TAG_BATCH_SIZE,
+)
+
+
+def queue_event_tags(organization_id, project_id, event_id, tags, group_id=None):
+    """
+    Queues the tags of an event for indexing. The tags of the events a
+    worker saves within ``SENTRY_EVENT_TAG_BATCH_INTERVAL`` are indexed
+    together with a single ``index_event_tags_batch`` task.
+    """
+    item = {
+        'organization_id': organization_id,
+        'project_id': project_id,
+        'event_id': event_id,
+        'group_id': group_id,
+        'tags': tags,
+    }
+    if settings.SENTRY_EVENT_TAG_BATCH_INTERVAL:
+        event_tag_aggregator.add(item)
+    else:
+        index_event_tags_batch.delay(items=[item])
@@ -43,6 +43,7 @@ from sentry.plugins import plugins
 from sentry.rules import EventState
 from sentry.utils import json
 from sentry.utils.auth import SSO_SESSION_KEY
+from sentry.utils.cache import clear_local_caches
 
 from .fixtures import Fixtures
 from .helpers import AuthProvider, Feature, get_auth_header, TaskRunner, override_options
@@ -132,8 +133,10 @@ class BaseTestCase(Fixtures, Exam):
         super(BaseTestCase, self)._pre_setup()
 
         cache.clear()
+        clear_local_caches()
         ProjectOption.objects.clear_local_cache()
         GroupMeta.objects.clear_local_cache()
+        plugins.clear_project_cache()
 
     def _post_teardown(self):
         super(BaseTestCase, self)._post_teardown()
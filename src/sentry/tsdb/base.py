@@ -8,6 +8,7 @@ sentry.tsdb.base
 from __future__ import absolute_import
 
 from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import timedelta
 
 import six
@@ -74,6 +75,40 @@ class TSDBModel(Enum):
     frequent_environments_by_group = 408
 
 
+class Batch(object):
+    """
+    Collects TSDB writes so that a backend can send them together.
+
+    Writes use the batch timestamp unless they provide their own.
+    """
+    def __init__(self, timestamp=None):
+        self.timestamp = timestamp
+        # (items, timestamp, count)
+        self.counters = []
+        # (items, timestamp)
+        self.distinct_counters = []
+        # (requests, timestamp)
+        self.frequencies = []
+
+    def __len__(self):
+        return len(self.counters) + len(self.distinct_counters) + len(self.frequencies)
+
+    def incr(self, model, key, timestamp=None, count=1):
+        self.incr_multi([(model, key)], timestamp, count)
+
+    def incr_multi(self, items, timestamp=None, count=1):
+        self.counters.append((list(items), timestamp or self.timestamp, count))
+
+    def record(self, model, key, values, timestamp=None):
+        self.record_multi([(model, key, values)], timestamp)
+
+    def record_multi(self, items, timestamp=None):
+        self.distinct_counters.append((list(items), timestamp or self.timestamp))
+
+    def record_frequency_multi(self, requests, timestamp=None):
+        self.frequencies.append((list(requests), timestamp or self.timestamp))
+
+
 class BaseTSDB(object):
     models = TSDBModel
 
@@ -218,6 +253,36 @@ class BaseTSDB(object):
         for model, key in items:
             self.incr(model, key, timestamp, count)
 
+    @contextmanager
+    def batch(self, timestamp=None):
+        """
+        Collect the counter, distinct counter and frequency table writes made
+        within the block and send them when it exits (they are discarded if
+        the block raises.)
+
+        >>> with tsdb.batch(timestamp) as batch:
+        >>>     batch.incr_multi([(TimeSeriesModel.project, 1)])
+        >>>     batch.record_multi([(TimeSeriesModel.users_affected_by_project, 1, ('foo',))])
+        """
+        batch = Batch(timestamp)
+        yield batch
+        if batch:
+            self.flush_batch(batch)
+
+    def flush_batch(self, batch):
+        """
+        Write everything collected in ``batch``. Backends which can combine
+        the writes into fewer round trips should override this.
+        """
+        for items, timestamp, count in batch.counters:
+            self.incr_multi(items, timestamp, count)
+
+        for requests, timestamp in batch.frequencies:
+            self.record_frequency_multi(requests, timestamp)
+
+        for items, timestamp in batch.distinct_counters:
+            self.record_multi(items, timestamp)
+
     def get_range(self, model, keys, start, end, rollup=None):
         """
         To get a range of data for group ID=[1, 2, 3]:
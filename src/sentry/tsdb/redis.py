@@ -12,6 +12,7 @@ import logging
 import operator
 import random
 import uuid
+from array import array
 from binascii import crc32
 from collections import defaultdict, namedtuple
 from hashlib import md5
@@ -22,7 +23,7 @@ from pkg_resources import resource_string
 from redis.client import Script
 
 from sentry.tsdb.base import BaseTSDB
-from sentry.utils.dates import to_datetime, to_timestamp
+from sentry.utils.dates import to_timestamp
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options
 from sentry.utils.versioning import Version
 from six.moves import reduce
@@ -38,6 +39,11 @@ CountMinScript = Script(
     resource_string('sentry', 'scripts/tsdb/cmsketch.lua'),
 )
 
+MultipleHashGetScript = Script(
+    None,
+    resource_string('sentry', 'scripts/tsdb/hmget.lua'),
+)
+
 
 class RedisTSDB(BaseTSDB):
     """
@@ -128,14 +134,15 @@ class RedisTSDB(BaseTSDB):
         """
         Make a key that is used for counter values.
         """
+        return '{0}{1}:{2}:{3}'.format(self.prefix, model.value, epoch, self.get_vnode(model_key))
+
+    def get_vnode(self, model_key):
         if isinstance(model_key, six.integer_types):
-            vnode = model_key % self.vnodes
-        else:
-            if isinstance(model_key, six.text_type):
-                model_key = model_key.encode('utf-8')
-            vnode = crc32(model_key) % self.vnodes
+            return model_key % self.vnodes
 
-        return '{0}{1}:{2}:{3}'.format(self.prefix, model.value, epoch, vnode)
+        if isinstance(model_key, six.text_type):
+            model_key = model_key.encode('utf-8')
+        return crc32(model_key) % self.vnodes
 
     def get_model_key(self, key):
         # We specialize integers so that a pure int-map can be optimized by
@@ -157,22 +164,25 @@ class RedisTSDB(BaseTSDB):
 
         >>> incr_multi([(TimeSeriesModel.project, 1), (TimeSeriesModel.group, 5)])
         """
+        commands = {}
+        self._add_counter_commands(commands, items, timestamp, count)
+        self.cluster.execute_commands(commands)
+
+    def _add_counter_commands(self, commands, items, timestamp=None, count=1):
         make_key = self.make_counter_key
         normalize_to_rollup = self.normalize_to_rollup
         if timestamp is None:
             timestamp = timezone.now()
 
-        with self.cluster.map() as client:
-            for rollup, max_values in six.iteritems(self.rollups):
-                norm_rollup = normalize_to_rollup(timestamp, rollup)
-                for model, key in items:
-                    model_key = self.get_model_key(key)
-                    hash_key = make_key(model, norm_rollup, model_key)
-                    client.hincrby(hash_key, model_key, count)
-                    client.expireat(
-                        hash_key,
-                        self.calculate_expiry(rollup, max_values, timestamp),
-                    )
+        for rollup, max_values in six.iteritems(self.rollups):
+            norm_rollup = normalize_to_rollup(timestamp, rollup)
+            expiry = self.calculate_expiry(rollup, max_values, timestamp)
+            for model, key in items:
+                model_key = self.get_model_key(key)
+                hash_key = make_key(model, norm_rollup, model_key)
+                cmds = commands.setdefault(hash_key, [])
+                cmds.append(('HINCRBY', hash_key, model_key, count))
+                cmds.append(('EXPIREAT', hash_key, expiry))
 
     def get_range(self, model, keys, start, end, rollup=None):
         """
@@ -184,34 +194,71 @@ class RedisTSDB(BaseTSDB):
         >>>          end=now)
         """
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
-        series = map(to_datetime, series)
+        counts = self.get_range_counts(model, keys, series, rollup)
 
-        results = []
-        with self.cluster.map() as client:
-            for key in keys:
-                model_key = self.get_model_key(key)
-                for timestamp in series:
-                    hash_key = self.make_counter_key(
-                        model,
-                        self.normalize_to_rollup(
-                            timestamp,
-                            rollup
-                        ),
-                        model_key,
-                    )
-                    results.append((
-                        to_timestamp(timestamp),
-                        key,
-                        client.hget(hash_key, model_key)
-                    ))
+        timestamps = [float(timestamp) for timestamp in series]
+        return {key: zip(timestamps, values) for key, values in six.iteritems(counts)}
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+    def get_sums(self, model, keys, start, end, rollup=None):
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        counts = self.get_range_counts(model, keys, series, rollup)
 
-        for key, points in six.iteritems(results_by_key):
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        return {key: sum(values) for key, values in six.iteritems(counts)}
+
+    def get_range_counts(self, model, keys, series, rollup):
+        """
+        Fetch the counters for ``keys`` at each timestamp in ``series``.
+
+        Returns a mapping of key => array of counts (in the same order as
+        ``series``.) Keys that share a vnode are stored in the same hashes, so
+        all buckets are read with a single script call per host rather than
+        one command per key and bucket.
+        """
+        keys_by_vnode = defaultdict(list)
+        for key in set(keys):
+            model_key = self.get_model_key(key)
+            keys_by_vnode[self.get_vnode(model_key)].append((key, model_key))
+        groups = list(six.itervalues(keys_by_vnode))
+
+        router = self.cluster.get_router()
+        epochs = [self.normalize_ts_to_rollup(timestamp, rollup) for timestamp in series]
+
+        # host => [(hash key, group, bucket index), ...]
+        requests = defaultdict(list)
+        for vnode, group in zip(six.iterkeys(keys_by_vnode), groups):
+            for index, epoch in enumerate(epochs):
+                hash_key = '{0}{1}:{2}:{3}'.format(self.prefix, model.value, epoch, vnode)
+                requests[router.get_host_for_key(hash_key)].append((hash_key, group, index))
+
+        commands = {}
+        for host, host_requests in six.iteritems(requests):
+            group_indexes = {}
+            arguments = [0]
+            hash_keys = []
+            key_groups = []
+            for hash_key, group, index in host_requests:
+                group_index = group_indexes.get(id(group))
+                if group_index is None:
+                    group_index = group_indexes[id(group)] = len(group_indexes) + 1
+                    arguments.append(len(group))
+                    arguments.extend(model_key for _, model_key in group)
+                hash_keys.append(hash_key)
+                key_groups.append(group_index)
+            arguments[0] = len(group_indexes)
+            arguments.extend(key_groups)
+
+            # route by the first hash key, since all keys are on this host
+            commands[hash_keys[0]] = [(MultipleHashGetScript, hash_keys, arguments)]
+
+        empty = array('l', [0]) * len(series)
+        results = {key: array('l', empty) for key in keys}
+        for routing_key, responses in six.iteritems(self.cluster.execute_commands(commands)):
+            host_requests = requests[router.get_host_for_key(routing_key)]
+            for (_, group, index), counts in zip(host_requests, responses[0].value):
+                for (key, _), count in zip(group, counts):
+                    if count is not None:
+                        results[key][index] = int(count)
+        return results
 
     def record(self, model, key, values, timestamp=None):
         self.record_multi(((model, key, values),), timestamp)
@@ -220,30 +267,35 @@ class RedisTSDB(BaseTSDB):
         """
         Record an occurence of an item in a distinct counter.
         """
+        commands = {}
+        self._add_distinct_counter_commands(commands, items, timestamp)
+        self.cluster.execute_commands(commands)
+
+    def _add_distinct_counter_commands(self, commands, items, timestamp=None):
         if timestamp is None:
             timestamp = timezone.now()
 
         ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
 
-        with self.cluster.fanout() as client:
-            for model, key, values in items:
-                c = client.target_key(key)
-                for rollup, max_values in six.iteritems(self.rollups):
-                    k = self.make_key(
-                        model,
+        for model, key, values in items:
+            cmds = commands.setdefault(key, [])
+            for rollup, max_values in six.iteritems(self.rollups):
+                k = self.make_key(
+                    model,
+                    rollup,
+                    ts,
+                    key,
+                )
+                cmds.append(('PFADD', k) + tuple(values))
+                cmds.append((
+                    'EXPIREAT',
+                    k,
+                    self.calculate_expiry(
                         rollup,
-                        ts,
-                        key,
-                    )
-                    c.pfadd(k, *values)
-                    c.expireat(
-                        k,
-                        self.calculate_expiry(
-                            rollup,
-                            max_values,
-                            timestamp,
-                        ),
-                    )
+                        max_values,
+                        timestamp,
+                    ),
+                ))
 
     def get_distinct_counts_series(self, model, keys, start, end=None, rollup=None):
         """
@@ -392,13 +444,16 @@ class RedisTSDB(BaseTSDB):
         if not self.enable_frequency_sketches:
             return
 
+        commands = {}
+        self._add_frequency_commands(commands, requests, timestamp)
+        self.cluster.execute_commands(commands)
+
+    def _add_frequency_commands(self, commands, requests, timestamp=None):
         if timestamp is None:
             timestamp = timezone.now()
 
         ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
 
-        commands = {}
-
         for model, request in requests:
             for key, items in six.iteritems(request):
                 keys = []
@@ -425,6 +480,23 @@ class RedisTSDB(BaseTSDB):
                 for k, t in expirations.items():
                     cmds.append(('EXPIREAT', k, t))
 
+    def flush_batch(self, batch):
+        """
+        Write all counters, distinct counters and frequency tables collected
+        in ``batch`` with a single round trip to each host.
+        """
+        commands = {}
+
+        for items, timestamp, count in batch.counters:
+            self._add_counter_commands(commands, items, timestamp, count)
+
+        for items, timestamp in batch.distinct_counters:
+            self._add_distinct_counter_commands(commands, items, timestamp)
+
+        if self.enable_frequency_sketches:
+            for requests, timestamp in batch.frequencies:
+                self._add_frequency_commands(commands, requests, timestamp)
+
         self.cluster.execute_commands(commands)
 
     def get_most_frequent(self, model, keys, start, end=None, rollup=None, limit=None):
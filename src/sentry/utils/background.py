@@ -0,0 +1,79 @@
+"""
+sentry.utils.background
+~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import os
+import threading
+import weakref
+
+
+class BackgroundService(object):
+    """
+    Base class for objects which do their work in background threads.
+
+    Threads don't survive a fork, so ``_start`` (which starts them) is
+    called by ``_ensure_started`` once in each process the object is used
+    in. ``shutdown`` calls ``_stop`` to stop them again, which unless
+    ``shutdown_on_exit`` is disabled also happens when the process or its
+    celery worker exits.
+    """
+    shutdown_on_exit = True
+
+    def __init__(self):
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._hooks_registered = False
+
+    def _start(self):
+        raise NotImplementedError
+
+    def _stop(self):
+        pass
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._start_lock:
+            if self._pid == pid:
+                return
+
+            self._start()
+            if self.shutdown_on_exit and not self._hooks_registered:
+                self._register_hooks()
+            self._pid = pid
+
+    def _register_hooks(self):
+        # forked processes inherit the hooks, so they're only registered
+        # once, and they don't keep the service alive
+        from celery.signals import worker_process_shutdown, worker_shutdown
+        import atexit
+
+        ref = weakref.ref(self)
+
+        def shutdown(**kwargs):
+            service = ref()
+            if service is not None:
+                service.shutdown()
+
+        atexit.register(shutdown)
+        worker_shutdown.connect(shutdown, weak=False)
+        worker_process_shutdown.connect(shutdown, weak=False)
+        self._hooks_registered = True
+
+    def shutdown(self):
+        """
+        Stops the background threads of this process, if they are running.
+        They are started again when the service is used next.
+        """
+        with self._start_lock:
+            if self._pid != os.getpid():
+                return
+            self._stop()
+            self._pid = None
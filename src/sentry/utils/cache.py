@@ -7,13 +7,35 @@ sentry.utils.cache
 """
 from __future__ import absolute_import, print_function
 
+import copy
 import functools
+import threading
+import weakref
 
+from collections import OrderedDict
+from django.conf import settings
 from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from time import time
+
+from sentry.utils import metrics
 
 
 default_cache = cache
 
+# how often the hit rates of local caches are reported
+LOCAL_CACHE_STATS_INTERVAL = 10
+
+_local_caches = weakref.WeakSet()
+
+
+def clear_local_caches():
+    """
+    Empties the local tier of all ``LocalCache`` instances.
+    """
+    for local_cache in list(_local_caches):
+        local_cache.clear()
+
 
 class memoize(object):
     """
@@ -76,3 +98,123 @@ class cached_for_request(memoize):
 
     def __get__(self, obj, type=None):
         return functools.partial(self.__call__, obj)
+
+
+class LocalCache(object):
+    """
+    A worker-local tier in front of the shared cache.
+
+    Values are kept in a bounded LRU for a few seconds
+    (``SENTRY_LOCAL_CACHE_TTL`` and ``SENTRY_LOCAL_CACHE_SIZE``), so that
+    lookups repeated for every event don't need a round trip to the
+    shared cache. Local hits return a shallow copy, as cached model
+    instances are shared between callers otherwise.
+
+    Hits and misses of both tiers are reported as ``cache.local.*`` and
+    ``cache.shared.*``, tagged with the name of the cache.
+
+    If a ``model`` is given, local entries holding one of its instances are
+    dropped when the instance is saved or deleted.
+
+    >>> release_cache = LocalCache('release', model=Release)
+    >>> release_cache.set(key, release, 3600)
+    >>> release_cache.get(key)
+    """
+    def __init__(self, name, backend=None, model=None):
+        self.name = name
+        self.backend = backend or default_cache
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        self.stats = {}
+        self.last_stats_flush = time()
+        _local_caches.add(self)
+
+        if model is not None:
+            post_save.connect(self._on_save, sender=model, weak=False)
+            post_delete.connect(self._on_delete, sender=model, weak=False)
+
+    def _on_save(self, instance, created, **kwargs):
+        # new rows can't be cached yet
+        if not created:
+            self.delete_instance(instance)
+
+    def _on_delete(self, instance, **kwargs):
+        self.delete_instance(instance)
+
+    def __len__(self):
+        return len(self.data)
+
+    def _incr_stat(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+            if time() - self.last_stats_flush < LOCAL_CACHE_STATS_INTERVAL:
+                return
+            stats, self.stats = self.stats, {}
+            self.last_stats_flush = time()
+
+        for key, amount in stats.items():
+            metrics.incr(key, amount=amount, tags={'cache': self.name})
+
+    def get_local(self, key):
+        with self.lock:
+            try:
+                expires, value = self.data.pop(key)
+            except KeyError:
+                return None
+            if expires <= time():
+                return None
+            self.data[key] = (expires, value)
+        return copy.copy(value)
+
+    def set_local(self, key, value, timeout=None):
+        ttl = settings.SENTRY_LOCAL_CACHE_TTL
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            return
+        value = copy.copy(value)
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (time() + ttl, value)
+            while len(self.data) > settings.SENTRY_LOCAL_CACHE_SIZE:
+                self.data.popitem(last=False)
+
+    def get(self, key, **kwargs):
+        value = self.get_local(key)
+        if value is not None:
+            self._incr_stat('cache.local.hit')
+            return value
+        self._incr_stat('cache.local.miss')
+
+        value = self.backend.get(key, **kwargs)
+        if value is None:
+            self._incr_stat('cache.shared.miss')
+        else:
+            self._incr_stat('cache.shared.hit')
+            self.set_local(key, value)
+        return value
+
+    def set(self, key, value, timeout=None, **kwargs):
+        self.backend.set(key, value, timeout, **kwargs)
+        self.set_local(key, value, timeout)
+
+    def delete(self, key, **kwargs):
+        self.backend.delete(key, **kwargs)
+        self.delete_local(key)
+
+    def delete_local(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def delete_instance(self, instance):
+        """
+        Drops all local entries holding the given model instance.
+        """
+        with self.lock:
+            for key, (_, value) in list(self.data.items()):
+                if type(value) is type(instance) and value.pk == instance.pk:
+                    del self.data[key]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
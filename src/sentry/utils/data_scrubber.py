@@ -12,33 +12,97 @@ import six
 
 from sentry.constants import DEFAULT_SCRUBBED_FIELDS, FILTER_MASK
 
+CONTAINER_TYPES = (dict, list, tuple)
+
+# compiled patterns of the field lists in use, which are usually the same
+# for every event of a project
+FIELDS_RE_CACHE_SIZE = 1000
+_fields_re_cache = {}
+
+
+def compile_fields(fields):
+    """
+    Returns a pattern matching any of the given fields anywhere in a
+    string, or ``None`` if there are no fields.
+    """
+    fields = frozenset(fields)
+    try:
+        return _fields_re_cache[fields]
+    except KeyError:
+        pass
+
+    if fields:
+        fields_re = re.compile(u'|'.join(re.escape(field) for field in fields))
+    else:
+        fields_re = None
+
+    if len(_fields_re_cache) >= FIELDS_RE_CACHE_SIZE:
+        _fields_re_cache.clear()
+    _fields_re_cache[fields] = fields_re
+    return fields_re
+
 
 def varmap(func, var, context=None, name=None):
     """
     Executes ``func(key_name, value)`` on all values
     recurisively discovering dict and list scoped
     values.
+
+    Dicts and lists are updated in place (tuples are replaced by lists) and
+    nested values are visited with an explicit stack, so large or deeply
+    nested values are neither copied nor limited by the recursion limit.
+    Recursive references are replaced with ``func(key_name, '<...>')``.
     """
     if context is None:
         context = set()
 
-    objid = id(var)
-    if objid in context:
-        return func(name, '<...>')
-    context.add(objid)
-
-    if isinstance(var, dict):
-        ret = dict((k, varmap(func, v, context, k)) for k, v in six.iteritems(var))
-    elif isinstance(var, (list, tuple)):
+    root = [var]
+    stack = [(root, 0, name)]
+    while stack:
+        parent, key, name = stack.pop()
+        if parent is None:
+            # all children of the container ``key`` have been visited
+            context.discard(key)
+            continue
+
+        value = parent[key]
+        if isinstance(value, (dict, list)):
+            # tuples can't be part of a cycle on their own (and are
+            # replaced anyways), so only mutable containers are tracked
+            if id(value) in context:
+                parent[key] = func(name, '<...>')
+                continue
+            context.add(id(value))
+            stack.append((None, id(value), None))
+        elif isinstance(value, tuple):
+            value = parent[key] = list(value)
+        else:
+            parent[key] = func(name, value)
+            continue
+
+        if isinstance(value, dict):
+            for k, v in six.iteritems(value):
+                if isinstance(v, CONTAINER_TYPES):
+                    stack.append((value, k, k))
+                else:
+                    value[k] = func(k, v)
         # treat it like a mapping
-        if all(isinstance(v, (list, tuple)) and len(v) == 2 for v in var):
-            ret = [[k, varmap(func, v, context, k)] for k, v in var]
+        elif all(isinstance(v, (list, tuple)) and len(v) == 2 for v in value):
+            for idx, pair in enumerate(value):
+                if isinstance(pair, tuple):
+                    pair = value[idx] = list(pair)
+                if isinstance(pair[1], CONTAINER_TYPES):
+                    stack.append((pair, 1, pair[0]))
+                else:
+                    pair[1] = func(pair[0], pair[1])
         else:
-            ret = [varmap(func, f, context, name) for f in var]
-    else:
-        ret = func(name, var)
-    context.remove(objid)
-    return ret
+            for idx, v in enumerate(value):
+                if isinstance(v, CONTAINER_TYPES):
+                    stack.append((value, idx, name))
+                else:
+                    value[idx] = func(name, v)
+
+    return root[0]
 
 
 class SensitiveDataFilter(object):
@@ -65,6 +129,7 @@ class SensitiveDataFilter(object):
             fields += DEFAULT_SCRUBBED_FIELDS
         self.exclude_fields = set(exclude_fields)
         self.fields = set(fields)
+        self.fields_re = compile_fields(self.fields)
 
     def apply(self, data):
         # TODO(dcramer): move this into each interface
@@ -105,6 +170,11 @@ class SensitiveDataFilter(object):
         if key and key in self.exclude_fields:
             return value
 
+        fields_re = self.fields_re
+        if key and fields_re is not None and fields_re.search(key):
+            # store mask as a fixed length for security
+            return FILTER_MASK
+
         if isinstance(value, six.string_types):
             if self.VALUES_RE.search(value):
                 return FILTER_MASK
@@ -115,17 +185,9 @@ class SensitiveDataFilter(object):
             if '//' in value and '@' in value:
                 value = self.URL_PASSWORD_RE.sub(r'\1' + FILTER_MASK + '@', value)
 
-        original_value = value
-        if isinstance(value, six.string_types):
-            value = value.lower()
-        else:
-            value = ''
-
-        for field in self.fields:
-            if field in key or field in value:
-                # store mask as a fixed length for security
+            if fields_re is not None and fields_re.search(value.lower()):
                 return FILTER_MASK
-        return original_value
+        return value
 
     def filter_stacktrace(self, data):
         if 'frames' not in data:
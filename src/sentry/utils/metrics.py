@@ -2,11 +2,17 @@ from __future__ import absolute_import
 
 __all__ = ['timing', 'incr']
 
+from collections import defaultdict
 from contextlib import contextmanager
 from django.conf import settings
 from random import random
+from six.moves.queue import Empty, Full, Queue
 from time import time
 import logging
+import six
+import threading
+
+from sentry.utils.background import BackgroundService
 
 
 def get_default_backend():
@@ -56,9 +62,9 @@ def _incr_internal(key, instance=None, tags=None, amount=1):
             logger.exception('Unable to incr internal metric')
 
 
-def incr(key, amount=1, instance=None, tags=None):
-    sample_rate = settings.SENTRY_METRICS_SAMPLE_RATE
-    _incr_internal(key, instance, tags, amount)
+def _incr_backend(key, instance=None, tags=None, amount=1, sample_rate=None):
+    if sample_rate is None:
+        sample_rate = settings.SENTRY_METRICS_SAMPLE_RATE
     try:
         backend.incr(key, instance, tags, amount, sample_rate)
     except Exception:
@@ -66,7 +72,7 @@ def incr(key, amount=1, instance=None, tags=None):
         logger.exception('Unable to record backend metric')
 
 
-def timing(key, value, instance=None, tags=None):
+def _timing_backend(key, value, instance=None, tags=None):
     # TODO(dcramer): implement timing for tsdb
     # TODO(dcramer): implement sampling for timing
     sample_rate = settings.SENTRY_METRICS_SAMPLE_RATE
@@ -77,6 +83,146 @@ def timing(key, value, instance=None, tags=None):
         logger.exception('Unable to record backend metric')
 
 
+def _freeze_tags(tags):
+    if not tags:
+        return None
+    return tuple(sorted(six.iteritems(tags)))
+
+
+# tells the background thread of a ``MetricsPipeline`` to stop
+_STOP = object()
+
+
+class MetricsPipeline(BackgroundService):
+    """
+    Emits metrics from a background thread.
+
+    Metrics are put on a bounded queue, and dropped when it is full instead
+    of blocking the caller. The background thread sums up the counters for
+    the same key and collects timings, and every ``interval`` seconds writes
+    the counters to TSDB (with a single batch) and everything to the metrics
+    backend.
+    """
+    def __init__(self, interval=10, max_size=10000):
+        super(MetricsPipeline, self).__init__()
+        self.interval = interval
+        self.max_size = max_size
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.queue = Queue(self.max_size)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _stop(self):
+        # everything queued before is written first
+        self.queue.put(_STOP)
+        self._thread.join()
+
+    def _put(self, item):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(item)
+        except Full:
+            with self.lock:
+                self.dropped += 1
+
+    def incr(self, key, amount=1, instance=None, tags=None):
+        self._put(('incr', key, instance, _freeze_tags(tags), amount))
+
+    def timing(self, key, value, instance=None, tags=None):
+        self._put(('timing', key, instance, _freeze_tags(tags), value))
+
+    def _run(self):
+        counters = defaultdict(int)
+        timings = []
+        next_flush = time() + self.interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(next_flush - time(), 0))
+            except Empty:
+                item = None
+
+            if item is not None and item is not _STOP:
+                kind, key, instance, tags, value = item
+                try:
+                    if kind == 'incr':
+                        counters[(key, instance, tags)] += value
+                    else:
+                        timings.append((key, instance, tags, value))
+                except Exception:
+                    logger = logging.getLogger('sentry.errors')
+                    logger.exception('Unable to aggregate metric')
+
+            if item is _STOP or time() >= next_flush:
+                self.flush(counters, timings)
+                counters = defaultdict(int)
+                timings = []
+                next_flush = time() + self.interval
+            if item is _STOP:
+                return
+
+    def flush(self, counters, timings):
+        from sentry.app import tsdb
+
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            counters[('metrics.dropped', None, None)] += dropped
+
+        if counters:
+            # counters with the same amount are written together
+            keys_by_amount = defaultdict(list)
+            for (key, instance, tags), amount in six.iteritems(counters):
+                if instance:
+                    key = '{}.{}'.format(key, instance)
+                keys_by_amount[amount].append((tsdb.models.internal, key))
+
+            try:
+                with tsdb.batch() as batch:
+                    for amount, items in six.iteritems(keys_by_amount):
+                        batch.incr_multi(items, count=amount)
+            except Exception:
+                logger = logging.getLogger('sentry.errors')
+                logger.exception('Unable to incr internal metric')
+
+            # the counters are exact, there is no need to sample them
+            for (key, instance, tags), amount in six.iteritems(counters):
+                _incr_backend(key, instance, dict(tags or ()), amount, sample_rate=1)
+
+        for key, instance, tags, value in timings:
+            _timing_backend(key, value, instance, dict(tags or ()))
+
+pipeline = MetricsPipeline(
+    interval=settings.SENTRY_METRICS_FLUSH_INTERVAL,
+    max_size=settings.SENTRY_METRICS_QUEUE_SIZE,
+)
+
+
+def incr(key, amount=1, instance=None, tags=None):
+    if settings.SENTRY_METRICS_FLUSH_INTERVAL:
+        # sampled like the synchronous TSDB writes, the aggregated counters
+        # are exact for what is sampled
+        if _should_sample():
+            pipeline.incr(key, _sampled_value(amount), instance, tags)
+        return
+
+    _incr_internal(key, instance, tags, amount)
+    _incr_backend(key, instance, tags, amount)
+
+
+def timing(key, value, instance=None, tags=None):
+    if settings.SENTRY_METRICS_FLUSH_INTERVAL:
+        pipeline.timing(key, value, instance, tags)
+        return
+
+    _timing_backend(key, value, instance, tags)
+
+
 @contextmanager
 def timer(key, instance=None, tags=None):
     if tags is None:
@@ -90,6 +90,15 @@ def pytest_configure(config):
 
     settings.DISABLE_RAVEN = True
 
+    # fetching sources from worker threads would use database connections
+    # outside of the test transaction
+    settings.SENTRY_SOURCE_FETCH_WORKERS = 1
+
+    # index event tags right away instead of batching them in a background
+    # thread
+    settings.SENTRY_EVENT_TAG_BATCH_INTERVAL = 0
+    settings.SENTRY_METRICS_FLUSH_INTERVAL = 0
+
     settings.CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
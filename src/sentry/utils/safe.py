@@ -42,52 +42,85 @@ def safe_execute(func, *args, **kwargs):
         return result
 
 
-def trim(value, max_size=settings.SENTRY_MAX_VARIABLE_SIZE, max_depth=3,
-         object_hook=None, _depth=0, _size=0, **kwargs):
+def _get_sizes(value):
+    if isinstance(value, six.text_type):
+        return len(value), len(repr(value))
+    return len(force_text(value)), len(repr(value))
+
+
+def _trim(value, max_size, max_depth, object_hook, depth, size):
     """
-    Truncates a value to ```MAX_VARIABLE_SIZE```.
+    Returns the trimmed value along with a ``(len(force_text(result)),
+    len(repr(result)))`` tuple, or ``None`` if the sizes weren't needed
+    to trim it (which is the case for everything but dicts and lists.)
 
-    The method of truncation depends on the type of value.
+    The size of dicts and lists is derived from the sizes of their items,
+    so that nested values don't need to be converted to text again at
+    every level.
     """
-    options = {
-        'max_depth': max_depth,
-        'max_size': max_size,
-        'object_hook': object_hook,
-        '_depth': _depth + 1,
-    }
+    if depth > max_depth:
+        return truncatechars(repr(value), max_size - size), None
 
-    if _depth > max_depth:
-        return trim(repr(value), _size=_size, max_size=max_size)
+    sizes = None
+    if isinstance(value, six.string_types):
+        result = truncatechars(value, max_size - size)
 
     elif isinstance(value, dict):
         result = {}
-        _size += 2
+        size += 2
+        repr_size = 2
         for k, v in six.iteritems(value):
-            trim_v = trim(v, _size=_size, **options)
+            trim_v, v_sizes = _trim(v, max_size, max_depth, object_hook, depth + 1, size)
+            if v_sizes is None:
+                v_sizes = _get_sizes(trim_v)
             result[k] = trim_v
-            _size += len(force_text(trim_v)) + 1
-            if _size >= max_size:
+            size += v_sizes[0] + 1
+            # "k: v, "
+            repr_size += len(repr(k)) + v_sizes[1] + 4
+            if size >= max_size:
                 break
+        if result:
+            repr_size -= 2
+        sizes = (repr_size, repr_size)
 
     elif isinstance(value, (list, tuple)):
         result = []
-        _size += 2
+        size += 2
+        repr_size = 2
         for v in value:
-            trim_v = trim(v, _size=_size, **options)
+            trim_v, v_sizes = _trim(v, max_size, max_depth, object_hook, depth + 1, size)
+            if v_sizes is None:
+                v_sizes = _get_sizes(trim_v)
             result.append(trim_v)
-            _size += len(force_text(trim_v))
-            if _size >= max_size:
+            size += v_sizes[0]
+            # "v, "
+            repr_size += v_sizes[1] + 2
+            if size >= max_size:
                 break
-
-    elif isinstance(value, six.string_types):
-        result = truncatechars(value, max_size - _size)
+        if result:
+            repr_size -= 2
+        sizes = (repr_size, repr_size)
 
     else:
         result = value
 
     if object_hook is None:
-        return result
-    return object_hook(result)
+        return result, sizes
+
+    hooked = object_hook(result)
+    if hooked is not result:
+        sizes = None
+    return hooked, sizes
+
+
+def trim(value, max_size=settings.SENTRY_MAX_VARIABLE_SIZE, max_depth=3,
+         object_hook=None, _depth=0, _size=0, **kwargs):
+    """
+    Truncates a value to ```MAX_VARIABLE_SIZE```.
+
+    The method of truncation depends on the type of value.
+    """
+    return _trim(value, max_size, max_depth, object_hook, _depth, _size)[0]
 
 
 def trim_pairs(iterable, max_items=settings.SENTRY_MAX_DICTIONARY_ITEMS, **kwargs):
@@ -38,3 +38,10 @@ class GroupTagsTest(APITestCase):
         response = self.client.get(url, format='json')
         assert response.status_code == 200, response.content
         assert len(response.data) == 2
+
+        data = sorted(response.data, key=lambda x: x['key'])
+        assert data[0]['key'] == 'biz'
+        assert data[0]['totalValues'] == 0
+        assert [v['value'] for v in data[0]['topValues']] == ['baz']
+        assert data[1]['key'] == 'foo'
+        assert [v['value'] for v in data[1]['topValues']] == ['bar']
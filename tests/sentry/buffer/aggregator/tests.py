@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import mock
+
+from sentry.buffer.aggregator import BatchAggregator, IncrAggregator
+from sentry.buffer.redis import RedisBuffer
+from sentry.models import Group
+from sentry.testutils import TestCase
+
+
+def make_key(model, filters):
+    return '%s:%s' % (model.__name__, sorted(filters.items()))
+
+
+class IncrAggregatorTest(TestCase):
+    def setUp(self):
+        self.flush_func = mock.Mock()
+        self.aggregator = IncrAggregator(
+            self.flush_func, make_key, interval=3600, max_keys=3)
+        self.addCleanup(self.aggregator.shutdown)
+
+    def test_add_coalesces_same_key(self):
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 1}, {'foo': 'bar'})
+        self.aggregator.add(Group, {'times_seen': 2}, {'pk': 1}, {'foo': 'baz'})
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 2})
+        assert not self.flush_func.called
+        assert self.aggregator.coalesced == 1
+
+        self.aggregator.flush()
+        self.flush_func.assert_called_once_with([
+            (Group, {'times_seen': 3}, {'pk': 1}, {'foo': 'baz'}),
+            (Group, {'times_seen': 1}, {'pk': 2}, None),
+        ])
+        assert self.aggregator.coalesced == 0
+
+    def test_add_flushes_on_max_keys(self):
+        for pk in range(3):
+            self.aggregator.add(Group, {'times_seen': 1}, {'pk': pk})
+        assert len(self.flush_func.call_args[0][0]) == 3
+        assert not self.aggregator.pending
+
+    def test_add_flushes_on_interval(self):
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 1})
+        assert not self.flush_func.called
+
+        later = self.aggregator.last_flush + 3600
+        with mock.patch('sentry.buffer.aggregator.time', return_value=later):
+            self.aggregator.add(Group, {'times_seen': 1}, {'pk': 1})
+        self.flush_func.assert_called_once_with([
+            (Group, {'times_seen': 2}, {'pk': 1}, None),
+        ])
+
+    def test_shutdown_flushes(self):
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 1})
+        self.aggregator.shutdown()
+        assert not self.aggregator._thread.is_alive()
+        self.flush_func.assert_called_once_with([
+            (Group, {'times_seen': 1}, {'pk': 1}, None),
+        ])
+
+    def test_flush_without_pending(self):
+        self.aggregator.flush()
+        assert not self.flush_func.called
+
+    def test_flush_failure_requeues(self):
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 1}, {'foo': 'bar'})
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 2})
+        self.flush_func.side_effect = Exception('boom')
+        self.aggregator.flush()
+
+        self.aggregator.add(Group, {'times_seen': 2}, {'pk': 1}, {'foo': 'baz'})
+        self.flush_func.side_effect = None
+        self.flush_func.reset_mock()
+        self.aggregator.flush()
+        self.flush_func.assert_called_once_with([
+            (Group, {'times_seen': 3}, {'pk': 1}, {'foo': 'baz'}),
+            (Group, {'times_seen': 1}, {'pk': 2}, None),
+        ])
+
+    def test_flush_failure_drops_oldest_keys(self):
+        self.flush_func.side_effect = Exception('boom')
+        for pk in range(3):
+            self.aggregator.add(Group, {'times_seen': 1}, {'pk': pk})
+
+        # this flushes (and fails) again, dropping the oldest key
+        self.aggregator.add(Group, {'times_seen': 1}, {'pk': 3})
+        assert [item[2] for item in self.aggregator.pending.values()] == [
+            {'pk': 1}, {'pk': 2}, {'pk': 3},
+        ]
+
+    @mock.patch('atexit.register')
+    def test_restarts_after_fork(self, register):
+        with mock.patch('os.getpid', return_value=1):
+            self.aggregator.add(Group, {'times_seen': 1}, {'pk': 1})
+            thread, stopped = self.aggregator._thread, self.aggregator._stopped
+        with mock.patch('os.getpid', return_value=2):
+            self.aggregator.add(Group, {'times_seen': 1}, {'pk': 2})
+            assert self.aggregator._thread is not thread
+            assert self.aggregator._pid == 2
+            self.aggregator._stopped.set()
+        stopped.set()
+        assert list(self.aggregator.pending) == [make_key(Group, {'pk': 2})]
+        # the forked process inherits the shutdown hooks
+        assert register.call_count == 1
+
+
+class BatchAggregatorTest(TestCase):
+    def setUp(self):
+        self.flush_func = mock.Mock()
+        self.aggregator = BatchAggregator(
+            self.flush_func, 'test', interval=3600, max_size=3)
+        self.addCleanup(self.aggregator.shutdown)
+
+    def test_add(self):
+        self.aggregator.add(1)
+        self.aggregator.add(2)
+        assert not self.flush_func.called
+
+        self.aggregator.flush()
+        self.flush_func.assert_called_once_with([1, 2])
+        assert self.aggregator.pending == []
+
+    def test_add_flushes_on_max_size(self):
+        for item in range(4):
+            self.aggregator.add(item)
+        self.flush_func.assert_called_once_with([0, 1, 2])
+        assert self.aggregator.pending == [3]
+
+    def test_flush_failure_requeues(self):
+        self.flush_func.side_effect = Exception('boom')
+        self.aggregator.add(1)
+        self.aggregator.flush()
+        assert self.aggregator.pending == [1]
+
+        self.flush_func.side_effect = None
+        self.aggregator.add(2)
+        self.aggregator.flush()
+        self.flush_func.assert_called_with([1, 2])
+        assert self.aggregator.pending == []
+
+    def test_flush_failure_drops_oldest_items(self):
+        self.flush_func.side_effect = Exception('boom')
+        for item in range(3):
+            self.aggregator.add(item)
+        self.aggregator.add(3)
+        self.aggregator.flush()
+        assert self.aggregator.pending == [1, 2, 3]
+
+
+class RedisBufferAggregatorTest(TestCase):
+    def setUp(self):
+        self.buf = RedisBuffer(local_flush_interval=3600)
+        self.addCleanup(self.buf.aggregator.shutdown)
+
+    def test_incr_is_aggregated(self):
+        client = self.buf.cluster.get_routing_client()
+        key = self.buf._make_key(Group, {'pk': 1})
+        self.buf.incr(Group, {'times_seen': 1}, {'pk': 1})
+        self.buf.incr(Group, {'times_seen': 1}, {'pk': 1})
+        assert not client.exists(key)
+
+        self.buf.aggregator.flush()
+        assert client.hget(key, 'i+times_seen') == '2'
+        assert client.zrange('b:p', 0, -1) == [key]
@@ -6,8 +6,13 @@ import mock
 
 from datetime import timedelta
 from django.utils import timezone
+from django.db import connection
+
 from sentry.buffer.base import Buffer
+from sentry.db.models.query import bulk_increment
+from sentry.event_manager import ScoreClause
 from sentry.models import Group, Project
+from sentry.signals import buffer_batch_complete, buffer_incr_complete
 from sentry.testutils import TestCase
 
 
@@ -52,3 +57,74 @@ class BufferTest(TestCase):
         group_ = Group.objects.get(id=group.id)
         assert group_.times_seen == group.times_seen + 1
         assert group_.last_seen.replace(microsecond=0) == the_date
+
+    def test_process_batch_saves_data(self):
+        group = Group.objects.create(project=Project(id=1))
+        the_date = (timezone.now() + timedelta(days=5)).replace(microsecond=0)
+        self.buf.process_batch(Group, [
+            ({'times_seen': 2}, {'id': group.id}, {'last_seen': the_date}),
+            ({'times_seen': 1}, {'message': 'foo bar', 'project_id': 1}, None),
+        ])
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 2
+        assert group_.last_seen.replace(microsecond=0) == the_date
+        assert Group.objects.get(message='foo bar').times_seen == 2
+
+    def test_process_batch_saves_score(self):
+        group = Group.objects.create(project=Project(id=1), times_seen=1)
+        group.times_seen = 3
+        self.buf.process_batch(Group, [
+            ({'times_seen': 2}, {'id': group.id}, {'score': ScoreClause(group)}),
+        ])
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == 3
+        assert group_.score == group.get_score()
+
+    @mock.patch('sentry.utils.db.is_postgres', mock.Mock(return_value=True))
+    @mock.patch('sentry.event_manager.get_db_engine', mock.Mock(return_value='postgresql'))
+    def test_bulk_increment_renders_score(self):
+        groups = [Group.objects.create(project=Project(id=1)) for _ in range(2)]
+        cursor = mock.Mock()
+        cursor.fetchall.return_value = [(0,), (1,)]
+        with mock.patch.object(connection, 'cursor', return_value=cursor):
+            assert bulk_increment(Group, [
+                ({'times_seen': 1}, {'id': group.id}, {'score': ScoreClause(group)})
+                for group in groups
+            ]) == []
+
+        sql, params = cursor.execute.call_args[0]
+        # evaluated by the database on the updated row, like ``update`` does
+        assert '"score" = log(times_seen) * 600 + last_seen::abstime::int' in sql
+        assert params == [0, 1, groups[0].id, 1, 1, groups[1].id]
+
+    def test_process_batch_sends_signal(self):
+        group = Group.objects.create(project=Project(id=1))
+        receiver = mock.Mock()
+        buffer_incr_complete.connect(receiver, sender=Group, weak=False)
+        try:
+            self.buf.process_batch(Group, [
+                ({'times_seen': 1}, {'id': group.id}, {}),
+                ({'times_seen': 1}, {'id': group.id + 1, 'project_id': 1}, {}),
+            ])
+        finally:
+            buffer_incr_complete.disconnect(receiver, sender=Group)
+        assert len(receiver.mock_calls) == 2
+        created = sorted(c[2]['created'] for c in receiver.mock_calls)
+        assert created == [False, True]
+
+    def test_process_batch_sends_batch_signal_once(self):
+        group = Group.objects.create(project=Project(id=1))
+        batch = [
+            ({'times_seen': 1}, {'id': group.id}, {}),
+            ({'times_seen': 1}, {'id': group.id + 1, 'project_id': 1}, {}),
+        ]
+        receiver = mock.Mock()
+        buffer_batch_complete.connect(receiver, sender=Group, weak=False)
+        try:
+            self.buf.process_batch(Group, batch)
+            self.buf.process(Group, {'times_seen': 1}, {'id': group.id})
+        finally:
+            buffer_batch_complete.disconnect(receiver, sender=Group)
+        assert [c[2]['batch'] for c in receiver.mock_calls] == [
+            batch, [({'times_seen': 1}, {'id': group.id}, None)],
+        ]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from datetime import datetime
+from django.utils import timezone
+
+from sentry.buffer.codecs import MsgpackCodec, PickleCodec, VersionedCodec
+from sentry.event_manager import ScoreClause
+from sentry.models import Project
+from sentry.testutils import TestCase
+
+
+class MsgpackCodecTest(TestCase):
+    def setUp(self):
+        self.codec = MsgpackCodec()
+
+    def test_roundtrip(self):
+        value = {
+            'project_id': 1,
+            'key': 'sentry:user',
+            'value': u'”',
+            'data': None,
+        }
+        result = self.codec.decode(self.codec.encode(value))
+        assert result == value
+        assert type(result['key']) is str
+        assert type(result['value']) is unicode
+
+    def test_datetimes(self):
+        aware = datetime(2016, 10, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        naive = datetime(2016, 10, 1, 12, 30, 15, 123456)
+        result = self.codec.decode(self.codec.encode([aware, naive]))
+        assert result == [aware, naive]
+        assert result[0].tzinfo is not None
+        assert result[1].tzinfo is None
+
+    def test_model_instances(self):
+        assert self.codec.decode(self.codec.encode(Project(id=1))) == 1
+
+    def test_score_clause(self):
+        group = self.create_group(times_seen=5)
+        data = self.codec.encode({'score': ScoreClause(group)})
+        assert b'sentry.models' not in data
+
+        result = self.codec.decode(data)
+        assert isinstance(result['score'], ScoreClause)
+        assert result['score'].group == group
+        assert int(result['score']) == group.get_score()
+
+    def test_other_objects(self):
+        value = {'pk': 1}
+        expected = self.codec.encode(value)
+        with self.assertRaises(TypeError):
+            self.codec.encode({'pk': 1, 'callback': lambda: None})
+        # the packer can still be used
+        assert self.codec.encode(value) == expected
+
+    def test_smaller_than_pickle(self):
+        value = {'last_seen': timezone.now(), 'project': 1}
+        assert len(self.codec.encode(value)) < len(PickleCodec().encode(value))
+
+
+class VersionedCodecTest(TestCase):
+    def setUp(self):
+        self.codec = VersionedCodec()
+
+    def test_roundtrip(self):
+        value = {'pk': 1}
+        assert self.codec.encode(value).startswith('\x01')
+        assert self.codec.decode(self.codec.encode(value)) == value
+
+    def test_reads_legacy_pickle(self):
+        assert self.codec.decode("(dp1\nS'pk'\np2\nI1\ns.") == {'pk': 1}
+        assert self.codec.decode(PickleCodec().encode({'pk': 1})) == {'pk': 1}
+
+    def test_without_legacy(self):
+        codec = VersionedCodec(legacy=False)
+        assert codec.decode(codec.encode({'pk': 1})) == {'pk': 1}
+        with self.assertRaises(ValueError):
+            codec.decode(PickleCodec().encode({'pk': 1}))
@@ -4,7 +4,10 @@ from __future__ import absolute_import
 
 import mock
 
+from datetime import datetime
+from django.utils import timezone
 from sentry.buffer.redis import RedisBuffer
+from sentry.event_manager import EventManager
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
 
@@ -32,6 +35,46 @@ class RedisBufferTest(TestCase):
         client = self.buf.cluster.get_routing_client()
         assert client.zrange('b:p', 0, -1) == []
 
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_batched(self, process_incr):
+        self.buf.incr_batch_size = 2
+        with self.buf.cluster.map() as client:
+            client.zadd('b:p', 1, 'foo')
+            client.zadd('b:p', 2, 'bar')
+            client.zadd('b:p', 3, 'baz')
+        self.buf.process_pending()
+        assert len(process_incr.apply_async.mock_calls) == 2
+        process_incr.apply_async.assert_any_call(kwargs={'batch_keys': ['foo', 'bar']})
+        process_incr.apply_async.assert_any_call(kwargs={'batch_keys': ['baz']})
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == []
+
+    @mock.patch('sentry.buffer.base.Buffer.process_batch')
+    def test_process_batch_keys_groups_by_model(self, process_batch):
+        client = self.buf.cluster.get_routing_client()
+        client.hmset('foo', {
+            'e+foo': "S'bar'\np1\n.",
+            'f': "(dp1\nS'pk'\np2\nI1\ns.",
+            'i+times_seen': '2',
+            'm': 'sentry.models.Group',
+        })
+        client.hmset('bar', {
+            'f': "(dp1\nS'pk'\np2\nI2\ns.",
+            'i+times_seen': '1',
+            'm': 'sentry.models.Group',
+        })
+        client.zadd('b:p', 1, 'foo')
+        client.zadd('b:p', 2, 'bar')
+        self.buf.process(batch_keys=['foo', 'bar', 'missing'])
+        process_batch.assert_called_once_with(Group, [
+            ({'times_seen': 2}, {'pk': 1}, {'foo': 'bar'}),
+            ({'times_seen': 1}, {'pk': 2}, {}),
+        ])
+        assert client.zrange('b:p', 0, -1) == []
+        assert not client.exists('foo')
+        assert not client.exists('bar')
+        assert not client.exists('l:foo')
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.base.Buffer.process')
     def test_process_does_bubble_up(self, process):
@@ -48,6 +91,21 @@ class RedisBufferTest(TestCase):
         self.buf.process('foo')
         process.assert_called_once_with(Group, columns, filters, extra)
 
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    @mock.patch('sentry.buffer.base.Buffer.process')
+    def test_process_reads_codec_values(self, process):
+        client = self.buf.cluster.get_routing_client()
+        the_date = datetime(2016, 1, 1, tzinfo=timezone.utc)
+        client.hmset('foo', {
+            'e+last_seen': self.buf.codec.encode(the_date),
+            'f': self.buf.codec.encode({'pk': 1}),
+            'i+times_seen': '2',
+            'm': 'sentry.models.Group',
+        })
+        self.buf.process('foo')
+        process.assert_called_once_with(
+            Group, {'times_seen': 2}, {'pk': 1}, {'last_seen': the_date})
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
     def test_incr_saves_to_redis(self):
@@ -59,8 +117,8 @@ class RedisBufferTest(TestCase):
         self.buf.incr(model, columns, filters, extra={'foo': 'bar'})
         result = client.hgetall('foo')
         assert result == {
-            'e+foo': "S'bar'\np1\n.",
-            'f': "(dp1\nS'pk'\np2\nI1\ns.",
+            'e+foo': '\x01\xc4\x03bar',
+            'f': '\x01\x81\xc4\x02pk\x01',
             'i+times_seen': '1',
             'm': 'mock.Mock',
         }
@@ -69,10 +127,29 @@ class RedisBufferTest(TestCase):
         self.buf.incr(model, columns, filters, extra={'foo': 'bar'})
         result = client.hgetall('foo')
         assert result == {
-            'e+foo': "S'bar'\np1\n.",
-            'f': "(dp1\nS'pk'\np2\nI1\ns.",
+            'e+foo': '\x01\xc4\x03bar',
+            'f': '\x01\x81\xc4\x02pk\x01',
             'i+times_seen': '2',
             'm': 'mock.Mock',
         }
         pending = client.zrange('b:p', 0, -1)
         assert pending == ['foo']
+
+    def test_event_manager_save(self):
+        # increments of existing groups carry a ``ScoreClause``
+        for event_id in ('a' * 32, 'b' * 32):
+            manager = EventManager({
+                'event_id': event_id,
+                'message': 'foo',
+                'checksum': 'a' * 32,
+            })
+            manager.normalize()
+            with mock.patch('sentry.event_manager.buffer', self.buf), \
+                    mock.patch('sentry.models.group.buffer', self.buf):
+                event = manager.save(self.project.id)
+
+        client = self.buf.cluster.get_routing_client()
+        for key in client.zrange('b:p', 0, -1):
+            self.buf.process(key)
+
+        assert Group.objects.get(id=event.group_id).times_seen == 2
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import mock
+
 from datetime import timedelta
 from django.utils import timezone
 
@@ -41,3 +43,53 @@ class BulkDeleteQueryTest(TestCase):
         assert not Group.objects.filter(id=group1_1.id).exists()
         assert not Group.objects.filter(id=group1_2.id).exists()
         assert Group.objects.filter(id=group1_3.id).exists()
+
+    def test_partitions(self):
+        project = self.create_project()
+        groups = [self.create_group(project) for _ in range(7)]
+        query = BulkDeleteQuery(model=Group, project_id=project.id)
+
+        partitions = query.get_partitions(3)
+        assert len(partitions) == 3
+        assert partitions[0][0] == groups[0].id
+        assert partitions[-1][1] == groups[-1].id
+        for (_, upper), (lower, _) in zip(partitions, partitions[1:]):
+            assert lower == upper + 1
+
+        assert query.get_partitions(100) == [(g.id, g.id) for g in groups]
+        assert BulkDeleteQuery(model=Group, project_id=project.id + 1).get_partitions(3) == []
+
+    def test_execute_partition(self):
+        project = self.create_project()
+        groups = [self.create_group(project) for _ in range(5)]
+        query = BulkDeleteQuery(model=Group, project_id=project.id)
+
+        progress = list(query.execute_partition(
+            groups[1].id, groups[3].id, chunk_size=2,
+        ))
+        assert progress == [(groups[2].id, 2), (groups[3].id, 1)]
+        assert list(Group.objects.values_list('id', flat=True).order_by('id')) == [
+            groups[0].id, groups[4].id,
+        ]
+
+    def test_delete_ids_rechecks_cutoff(self):
+        now = timezone.now()
+        project = self.create_project()
+        old_group = self.create_group(project, last_seen=now - timedelta(days=2))
+        # seen again since its id was selected
+        new_group = self.create_group(project, last_seen=now)
+        query = BulkDeleteQuery(model=Group, dtfield='last_seen', days=1)
+
+        query.delete_ids([old_group.id, new_group.id], cascade=False)
+        assert not Group.objects.filter(id=old_group.id).exists()
+        assert Group.objects.filter(id=new_group.id).exists()
+
+        query.delete_ids([new_group.id], cascade=True)
+        assert Group.objects.filter(id=new_group.id).exists()
+
+    @mock.patch('sentry.utils.db.is_postgres', mock.Mock(return_value=False))
+    def test_execute_chunk_size(self):
+        query = BulkDeleteQuery(model=Group)
+        with mock.patch.object(query, 'execute_generic') as execute_generic:
+            query.execute(chunk_size=500)
+        execute_generic.assert_called_once_with(500)
@@ -1,10 +1,12 @@
 from __future__ import absolute_import
 
+import mock
+
 from django.core.urlresolvers import reverse
 
 from ua_parser.user_agent_parser import Parse
 
-from sentry.filters.legacy_browsers import LegacyBrowsersFilter
+from sentry.filters.legacy_browsers import LegacyBrowsersFilter, parse_user_agent
 from sentry.models import ProjectOption
 from sentry.testutils import APITestCase, TestCase
 
@@ -340,3 +342,14 @@ class LegacyBrowsersFilterTest(TestCase):
         ua = Parse(ua_data)
         browser = ua['user_agent']
         assert self.filter_cls(self.project).filter_android_pre_4(browser) is False
+
+    def test_parse_user_agent(self):
+        for value in USER_AGENTS.values():
+            assert parse_user_agent(value) == Parse(value)['user_agent']
+            assert parse_user_agent(value) is parse_user_agent(value)
+
+    def test_does_not_parse_when_disabled(self):
+        data = self.get_mock_data(USER_AGENTS['ie_5'])
+        with mock.patch('sentry.filters.legacy_browsers.parse_user_agent') as parse:
+            assert self.apply_filter(data) is False
+        assert not parse.called
@@ -0,0 +1,59 @@
+from __future__ import absolute_import
+
+from sentry.filters.base import Filter
+from sentry.filters.manager import FilterManager
+from sentry.models import ProjectOption
+from sentry.testutils import TestCase
+
+
+class EnabledFilter(Filter):
+    id = 'enabled-filter'
+    default = True
+
+
+class DisabledFilter(Filter):
+    id = 'disabled-filter'
+
+
+class FilterManagerTest(TestCase):
+    def setUp(self):
+        self.manager = FilterManager()
+        self.manager.register(EnabledFilter)
+        self.manager.register(DisabledFilter)
+
+    def test_get_enabled(self):
+        project = self.create_project()
+        enabled = self.manager.get_enabled(project)
+        assert [type(f) for f in enabled] == [EnabledFilter]
+        assert enabled[0].project == project
+
+    def test_reuses_filters(self):
+        project = self.create_project()
+        enabled = self.manager.get_enabled(project)
+        assert self.manager.get_enabled(project) is enabled
+        assert self.manager.get_enabled(self.create_project()) is not enabled
+
+    def test_invalidated_by_options(self):
+        project = self.create_project()
+        enabled = self.manager.get_enabled(project)
+
+        ProjectOption.objects.set_value(project, 'filters:disabled-filter', '1')
+        assert sorted(type(f).__name__ for f in self.manager.get_enabled(project)) == [
+            'DisabledFilter', 'EnabledFilter',
+        ]
+
+        ProjectOption.objects.set_value(project, 'filters:disabled-filter', '0')
+        assert self.manager.get_enabled(project) is enabled
+
+    def test_invalidated_by_register(self):
+        project = self.create_project()
+        self.manager.get_enabled(project)
+        self.manager.unregister(EnabledFilter)
+        assert self.manager.get_enabled(project) == []
+
+    def test_bounded(self):
+        self.manager.cache_size = 1
+        project = self.create_project()
+        enabled = self.manager.get_enabled(project)
+        self.manager.get_enabled(self.create_project())
+        assert self.manager.get_enabled(project) is not enabled
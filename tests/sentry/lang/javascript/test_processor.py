@@ -2,9 +2,11 @@
 
 from __future__ import absolute_import
 
+import base64
 import pytest
 import responses
 import six
+import threading
 from libsourcemap import Token
 
 from mock import patch
@@ -16,6 +18,7 @@ from sentry.lang.javascript.processor import (
     SourceProcessor, trim_line, UrlResult, fetch_release_file, CannotFetchSource,
     UnparseableSourcemap,
 )
+from sentry.lang.javascript.cache import SharedSourceCache
 from sentry.lang.javascript.errormapping import (
     rewrite_exception, REACT_MAPPING_URL
 )
@@ -429,6 +432,152 @@ class SourceProcessorTest(TestCase):
         exc = result['sentry.interfaces.Exception']['values'][0]
         assert exc['stacktrace']['frames'][1]['module'] == 'foo/bar'
 
+    @patch('sentry.lang.javascript.processor.view_from_json')
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_shared_cache_skips_parsing(self, mock_fetch_file, mock_view_from_json):
+        from libsourcemap import from_json
+        mock_view_from_json.side_effect = from_json
+        mock_fetch_file.return_value = UrlResult(
+            'http://example.com/foo.js',
+            {},
+            b'//# sourceMappingURL=' + base64_sourcemap.encode('ascii') + b'\nconsole.log("hello");',
+            'utf-8',
+        )
+
+        def get_data():
+            return {
+                'message': 'hello',
+                'platform': 'javascript',
+                'sentry.interfaces.Stacktrace': {
+                    'frames': [{
+                        'abs_path': 'http://example.com/foo.js',
+                        'filename': 'foo.js',
+                        'lineno': 2,
+                        'colno': 0,
+                    }],
+                },
+            }
+
+        shared_cache = SharedSourceCache(1024 * 1024)
+
+        processor = SourceProcessor(project=self.project, shared_cache=shared_cache)
+        first = processor.process(get_data())
+        assert mock_view_from_json.call_count == 1
+        assert len(shared_cache) == 2
+
+        processor = SourceProcessor(project=self.project, shared_cache=shared_cache)
+        with patch.object(processor, 'record_shared_cache_stats') as record:
+            second = processor.process(get_data())
+        assert mock_view_from_json.call_count == 1
+        assert processor.shared_cache_stats == {
+            ('source', 'hit'): 1,
+            ('sourcemap', 'hit'): 1,
+        }
+        assert record.call_count == 1
+
+        frame = second['sentry.interfaces.Stacktrace']['frames'][0]
+        assert frame['abs_path'] == '/test.js'
+        assert frame['context_line'] == 'console.log("hello, World!")'
+        assert first == second
+
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_populate_source_cache_concurrently(self, mock_fetch_file):
+        b_started = threading.Event()
+        sourcemap_body = base64.b64decode(base64_sourcemap[len('data:application/json;base64,'):])
+
+        def fetch_file(url, **kwargs):
+            if url == 'http://example.com/a.js':
+                # only finishes in time if b.js is fetched at the same time
+                assert b_started.wait(5)
+                return UrlResult(url, {}, b'//# sourceMappingURL=a.map\nfoo();', 'utf-8')
+            elif url == 'http://example.com/b.js':
+                b_started.set()
+                raise CannotFetchSource({
+                    'type': EventError.JS_MISSING_SOURCE,
+                    'url': url,
+                })
+            elif url == 'http://example.com/a.map':
+                return UrlResult(url, {}, sourcemap_body, 'utf-8')
+            raise AssertionError(url)
+
+        mock_fetch_file.side_effect = fetch_file
+
+        frames = Stacktrace.to_python({
+            'frames': [
+                {'abs_path': 'http://example.com/a.js', 'lineno': 2, 'colno': 0},
+                {'abs_path': 'http://example.com/b.js', 'lineno': 1, 'colno': 0},
+                {'abs_path': 'http://example.com/a.js', 'lineno': 2, 'colno': 0},
+            ],
+        }).frames
+
+        processor = SourceProcessor(project=self.project, fetch_workers=4)
+        processor.populate_source_cache(frames, None)
+
+        assert sorted(c[0][0] for c in mock_fetch_file.call_args_list) == [
+            'http://example.com/a.js',
+            'http://example.com/a.map',
+            'http://example.com/b.js',
+        ]
+        assert processor.fetch_count == 2
+        assert processor.prefetched == {}
+        assert processor.cache.get('http://example.com/a.js') == [u'//# sourceMappingURL=a.map', u'foo();']
+        assert processor.sourcemaps.get_link('http://example.com/a.js')[1] is not None
+        assert processor.cache.get_errors('http://example.com/b.js') == [{
+            'type': EventError.JS_MISSING_SOURCE,
+            'url': 'http://example.com/b.js',
+        }]
+
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_populate_source_cache_respects_max_fetches(self, mock_fetch_file):
+        mock_fetch_file.side_effect = lambda url, **kwargs: UrlResult(url, {}, b'foo();', 'utf-8')
+
+        frames = Stacktrace.to_python({
+            'frames': [
+                {'abs_path': 'http://example.com/%d.js' % i, 'lineno': 1, 'colno': 0}
+                for i in range(5)
+            ],
+        }).frames
+
+        processor = SourceProcessor(project=self.project, fetch_workers=4, max_fetches=3)
+        processor.populate_source_cache(frames, None)
+
+        assert mock_fetch_file.call_count == 3
+        assert processor.cache.get_errors('http://example.com/4.js') == [{
+            'type': EventError.JS_TOO_MANY_REMOTE_SOURCES,
+        }]
+
+
+class SharedSourceCacheTest(TestCase):
+    def test_get_set(self):
+        cache = SharedSourceCache(100)
+        assert cache.get('foo') is None
+        cache.set('foo', ['a'], 10)
+        assert cache.get('foo') == ['a']
+        assert cache.size == 10
+
+        cache.set('foo', ['b'], 20)
+        assert cache.get('foo') == ['b']
+        assert cache.size == 20
+
+    def test_evicts_least_recently_used(self):
+        cache = SharedSourceCache(100)
+        cache.set('a', 1, 40)
+        cache.set('b', 2, 40)
+        # mark "a" as recently used, so "b" is the one to go
+        assert cache.get('a') == 1
+        cache.set('c', 3, 40)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert cache.size == 80
+
+    def test_ignores_oversized_values(self):
+        cache = SharedSourceCache(100)
+        cache.set('a', 1, 101)
+        assert 'a' not in cache
+        assert cache.size == 0
+
 
 class ErrorMappingTest(TestCase):
 
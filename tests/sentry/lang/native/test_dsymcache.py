@@ -0,0 +1,102 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import time
+
+from six import BytesIO
+
+from sentry.lang.native.dsymcache import DSymCache
+from sentry.models import File, ProjectDSymFile
+from sentry.testutils import TestCase
+
+
+UUID1 = 'c05b4ddd-69a7-3840-a649-32180d341587'
+UUID2 = 'b78cb4fb-3a90-4039-9efd-c58932803ae5'
+
+
+class DSymCacheTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache = DSymCache()
+
+    def create_dsym_file(self, uuid, contents):
+        file = File.objects.create(
+            name='dSYM',
+            type='project.dsym',
+            headers={'Content-Type': 'application/x-mach-binary'},
+        )
+        file.putfile(BytesIO(contents))
+        return ProjectDSymFile.objects.create(
+            file=file,
+            object_name='SentryTest',
+            cpu_name='arm64',
+            project=self.project,
+            uuid=uuid,
+        )
+
+    def test_fetch_dsyms(self):
+        self.create_dsym_file(UUID1, b'foo')
+        self.create_dsym_file(UUID2, b'bar')
+
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            base = self.cache.get_project_path(self.project)
+            bases, loaded = self.cache.fetch_dsyms(
+                self.project, [UUID1.upper(), UUID2, '00000000-0000-0000-0000-000000000000'])
+            assert bases == [base]
+            assert loaded == set([UUID1.upper(), UUID2])
+            with open(os.path.join(base, UUID1)) as f:
+                assert f.read() == 'foo'
+            with open(os.path.join(base, UUID2)) as f:
+                assert f.read() == 'bar'
+
+            # second time around it is served from the cache
+            with self.assertNumQueries(0):
+                assert self.cache.fetch_dsyms(self.project, [UUID1, UUID2]) == (
+                    [base], set([UUID1, UUID2]))
+
+    def test_checksum_mismatch(self):
+        dsf = self.create_dsym_file(UUID1, b'foo')
+        dsf.file.update(checksum='0' * 40)
+
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            assert self.cache.fetch_dsyms(self.project, [UUID1]) == ([], set())
+            base = self.cache.get_project_path(self.project)
+            assert os.listdir(base) == [UUID1 + '.lock']
+
+    def test_clear_old_entries(self):
+        now = time.time()
+        folder = os.path.join(self.tmpdir, 'global')
+        os.makedirs(folder)
+        for name, age in ('old', 2 * 86400), ('older', 3600), ('newer', 60), ('new', 0):
+            path = os.path.join(folder, name)
+            with open(path, 'w') as f:
+                f.write('x' * 100)
+            os.utime(path, (now - age, now - age))
+
+        with self.options({'dsym.cache-path': self.tmpdir,
+                           'dsym.cache-max-size': 250}):
+            self.cache.clear_old_entries()
+
+        assert sorted(os.listdir(folder)) == ['new', 'newer']
+
+    def test_clear_old_entries_keeps_locked_entries(self):
+        folder = os.path.join(self.tmpdir, 'global')
+        os.makedirs(folder)
+        for name in 'locked', 'unlocked':
+            path = os.path.join(folder, name)
+            with open(path, 'w') as f:
+                f.write('x' * 100)
+            os.utime(path, (0, 0))
+            open(path + '.lock', 'w').close()
+
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            with self.cache._lock_dsym(os.path.join(folder, 'locked')):
+                self.cache.clear_old_entries()
+
+        # lock files stay, other processes might be waiting on them
+        assert sorted(os.listdir(folder)) == [
+            'locked', 'locked.lock', 'unlocked.lock',
+        ]
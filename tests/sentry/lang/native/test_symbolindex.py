@@ -0,0 +1,196 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+
+from sentry.lang.native.symbolindex import (
+    SymbolCache, SymbolIndex, SymbolIndexCache, write_symbol_index
+)
+from sentry.models import DSymBundle, DSymObject, DSymSDK, DSymSymbol
+from sentry.testutils import TestCase
+
+
+SDK_INFO = {
+    'dsym_type': 'macho',
+    'sdk_name': 'iOS',
+    'version_major': 9,
+    'version_minor': 3,
+    'version_patchlevel': 0,
+}
+
+
+class SymbolIndexTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def make_index(self, symbols):
+        path = os.path.join(self.tmpdir, 'test.idx')
+        with open(path, 'wb') as f:
+            write_symbol_index(f, symbols)
+        return SymbolIndex(path)
+
+    def test_lookup(self):
+        index = self.make_index([
+            (0x1000, 'foo'),
+            (0x1010, u'b\xe4r'),
+            (0x1080, 'baz'),
+        ])
+        assert len(index) == 3
+        assert index.lookup(0x0fff) is None
+        assert index.lookup(0x1000) == (0x1000, u'foo')
+        assert index.lookup(0x100f) == (0x1000, u'foo')
+        assert index.lookup(0x1010) == (0x1010, u'b\xe4r')
+        assert index.lookup(0x2000) == (0x1080, u'baz')
+        assert index.lookup(0x1050, min_addr=0x1020) is None
+
+    def test_empty(self):
+        index = self.make_index([])
+        assert len(index) == 0
+        assert index.lookup(0x1000) is None
+
+
+class SymbolIndexCacheTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        sdk = DSymSDK.objects.create(
+            version_build='13E230',
+            **SDK_INFO
+        )
+        self.object = DSymObject.objects.create(
+            cpu_name='arm64',
+            object_path='/usr/lib/libobjc.A.dylib',
+            uuid='c6d6b6b1-6ad6-3a8a-a9b8-61ea57c0b0cc',
+            vmaddr=0x10000000,
+            vmsize=0x10000,
+        )
+        DSymBundle.objects.create(sdk=sdk, object=self.object)
+        for offset, symbol in (0x100, 'objc_msgSend'), (0x400, 'objc_retain'), \
+                (0x800, 'objc_release'):
+            DSymSymbol.objects.create(
+                object=self.object,
+                address=0x10000000 + offset,
+                symbol=symbol,
+            )
+
+    def test_matches_database_lookup(self):
+        cache = SymbolIndexCache()
+        lookups = [
+            # relative addresses by uuid
+            dict(instruction_addr=0x1000500, image_addr=0x1000000,
+                 uuid=self.object.uuid),
+            # before the first symbol
+            dict(instruction_addr=0x1000050, image_addr=0x1000000,
+                 uuid=self.object.uuid),
+            # absolute addresses by uuid
+            dict(instruction_addr=0x1000900, image_addr=0x1000000,
+                 image_vmaddr=0x10000000, uuid=self.object.uuid.upper()),
+            # path and arch fallback
+            dict(instruction_addr='0x1000420', image_addr='0x1000000',
+                 uuid='00000000-0000-0000-0000-000000000000',
+                 cpu_name='arm64', object_path='/usr/lib/libobjc.A.dylib',
+                 sdk_info=SDK_INFO),
+            dict(instruction_addr=0x1000420, image_addr=0x1000000,
+                 uuid='00000000-0000-0000-0000-000000000000',
+                 cpu_name='armv7', object_path='/usr/lib/libobjc.A.dylib',
+                 sdk_info=SDK_INFO),
+            dict(instruction_addr=0x1000420, image_addr=0x1000000,
+                 uuid=self.object.uuid,
+                 sdk_info=dict(SDK_INFO, dsym_type='none')),
+        ]
+
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            results = [cache.lookup_symbol(**kwargs) for kwargs in lookups]
+            assert os.path.isfile(cache.get_index_path(self.object.id))
+
+        assert results == [
+            DSymSymbol.objects.lookup_symbol(**kwargs) for kwargs in lookups
+        ]
+        assert results == [
+            'objc_retain', None, 'objc_release', 'objc_retain',
+            None, None,
+        ]
+
+    def test_lookup_does_not_query(self):
+        cache = SymbolIndexCache()
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            assert cache.lookup_symbol(0x1000500, 0x1000000, self.object.uuid) == 'objc_retain'
+            with self.assertNumQueries(0):
+                assert cache.lookup_symbol(0x1000810, 0x1000000, self.object.uuid) == 'objc_release'
+
+    def test_lookup_symbols(self):
+        cache = SymbolIndexCache()
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            assert cache.lookup_symbols(
+                [0x1000500, 0x1000810, 0x1000050, 0x1000500],
+                0x1000000, self.object.uuid,
+            ) == {
+                0x1000500: 'objc_retain',
+                0x1000810: 'objc_release',
+                0x1000050: None,
+            }
+            assert len(cache.symbols) == 2
+
+            # resolved symbols are remembered, even when the same image is
+            # loaded at a different address
+            cache._objects.clear()
+            with self.assertNumQueries(0):
+                assert cache.lookup_symbols(
+                    [0x2000500, 0x2000810], 0x2000000, self.object.uuid,
+                ) == {
+                    0x2000500: 'objc_retain',
+                    0x2000810: 'objc_release',
+                }
+
+    def test_evicts_least_recently_used_indexes(self):
+        other = DSymObject.objects.create(
+            cpu_name='arm64',
+            object_path='/usr/lib/libSystem.B.dylib',
+            uuid='5c3ae4b6-b5e1-3b5e-9f04-62ba4d1c3a33',
+            vmaddr=0x20000000,
+            vmsize=0x10000,
+        )
+        cache = SymbolIndexCache(index_cache_size=1)
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            index = cache.get_index(self.object.id)
+            cache.get_index(other.id)
+
+        assert list(cache._indexes) == [other.id]
+        # other threads can keep using an evicted index
+        assert index.lookup(0x10000100) == (0x10000100, u'objc_msgSend')
+
+    def test_rebuilds_stale_index(self):
+        cache = SymbolIndexCache()
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            assert cache.lookup_symbol(0x1000a10, 0x1000000, self.object.uuid) == 'objc_release'
+
+            # symbols imported by another process, which builds the index
+            DSymSymbol.objects.create(
+                object=self.object,
+                address=0x10000a00,
+                symbol='objc_autorelease',
+            )
+            other_cache = SymbolIndexCache()
+            other_cache.build_index(self.object.id)
+            assert other_cache.lookup_symbol(0x1000a10, 0x1000000, self.object.uuid) == 'objc_autorelease'
+
+            # indexes already in use are checked once they expire, without
+            # querying the symbols
+            object_id, (expires, index) = next(iter(cache._indexes.items()))
+            cache._indexes[object_id] = (0, index)
+            cache.symbols = SymbolCache(10)
+            with self.assertNumQueries(0):
+                assert cache.lookup_symbol(0x1000a10, 0x1000000, self.object.uuid) == 'objc_autorelease'
+            # the replaced index is still readable
+            assert index.lookup(0x10000a10) == (0x10000800, u'objc_release')
+
+    def test_rebuilds_index_of_older_version(self):
+        cache = SymbolIndexCache()
+        with self.options({'dsym.cache-path': self.tmpdir}):
+            os.makedirs(cache.index_path)
+            with open(cache.get_index_path(self.object.id), 'wb') as f:
+                f.write(b'SYMI\x01\x00\x00\x00\x00\x00\x00\x00')
+            assert cache.lookup_symbol(0x1000500, 0x1000000, self.object.uuid) == 'objc_retain'
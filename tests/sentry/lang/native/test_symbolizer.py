@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.lang.native.symbolizer import Symbolizer
+from sentry.testutils import TestCase
+
+
+SYSTEM_IMAGE = {
+    'uuid': 'c6d6b6b1-6ad6-3a8a-a9b8-61ea57c0b0cc',
+    'image_addr': 0x1000000,
+    'image_vmaddr': 0x180000000,
+    'cpu_type': 16777228,
+    'cpu_subtype': 0,
+    'name': '/usr/lib/libobjc.A.dylib',
+}
+
+OTHER_SYSTEM_IMAGE = dict(
+    SYSTEM_IMAGE,
+    uuid='b78cb4fb-3a90-4039-9efd-c58932803ae5',
+    image_addr=0x2000000,
+    name='/usr/lib/system/libdyld.dylib',
+)
+
+
+def make_frame(img, instruction_addr):
+    return {
+        'object_addr': img['image_addr'],
+        'instruction_addr': instruction_addr,
+        'symbol_addr': instruction_addr,
+    }
+
+
+class SymbolizerTest(TestCase):
+    @patch('sentry.lang.native.symbolizer.find_system_symbol')
+    @patch('sentry.lang.native.symbolizer.find_system_symbols')
+    @patch('sentry.lang.native.symbolizer.make_symbolizer')
+    def test_symbolize_backtrace_batches_system_frames(self, mock_make_symbolizer,
+                                                       mock_find_system_symbols,
+                                                       mock_find_system_symbol):
+        mock_find_system_symbols.side_effect = lambda img, addrs, sdk_info: dict(
+            (addr, '%s_%x' % (img['name'].rsplit('/', 1)[-1], addr))
+            for addr in addrs
+        )
+
+        sym = Symbolizer(self.project, [SYSTEM_IMAGE, OTHER_SYSTEM_IMAGE])
+        backtrace = [
+            make_frame(SYSTEM_IMAGE, 0x1000010),
+            make_frame(OTHER_SYSTEM_IMAGE, 0x2000010),
+            make_frame(SYSTEM_IMAGE, 0x1000020),
+            make_frame(SYSTEM_IMAGE, 0x1000010),
+        ]
+        frames, errors = sym.symbolize_backtrace(backtrace)
+
+        assert errors == []
+        assert [f['symbol_name'] for f in frames] == [
+            'libobjc.A.dylib_1000010',
+            'libdyld.dylib_2000010',
+            'libobjc.A.dylib_1000020',
+            'libobjc.A.dylib_1000010',
+        ]
+        assert mock_find_system_symbol.call_count == 0
+        assert sorted(
+            (img['uuid'], sorted(addrs))
+            for (img, addrs, _), _ in mock_find_system_symbols.call_args_list
+        ) == [
+            (OTHER_SYSTEM_IMAGE['uuid'], [0x2000010]),
+            (SYSTEM_IMAGE['uuid'], [0x1000010, 0x1000020]),
+        ]
+
+        # already resolved frames are not looked up again
+        sym.symbolize_backtrace(backtrace)
+        assert mock_find_system_symbols.call_count == 2
+
+    @patch('sentry.lang.native.symbolizer.find_system_symbol')
+    @patch('sentry.lang.native.symbolizer.find_system_symbols')
+    @patch('sentry.lang.native.symbolizer.make_symbolizer')
+    def test_symbolize_backtrace_falls_back_to_frames(self, mock_make_symbolizer,
+                                                      mock_find_system_symbols,
+                                                      mock_find_system_symbol):
+        mock_find_system_symbols.side_effect = ValueError('broken index')
+        mock_find_system_symbol.side_effect = lambda img, addr, sdk_info: (
+            None if addr == 0x1000020 else 'sym_%x' % addr
+        )
+
+        sym = Symbolizer(self.project, [SYSTEM_IMAGE])
+        frames, errors = sym.symbolize_backtrace([
+            make_frame(SYSTEM_IMAGE, 0x1000010),
+            make_frame(SYSTEM_IMAGE, 0x1000020),
+        ])
+
+        assert frames[0]['symbol_name'] == 'sym_1000010'
+        assert 'symbol_name' not in frames[1]
+        assert len(errors) == 1
+        assert mock_find_system_symbol.call_count == 2
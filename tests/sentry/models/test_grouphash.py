@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+
+from sentry.models import GroupHash
+from sentry.testutils import TestCase
+
+
+class GroupHashManagerTest(TestCase):
+    def test_get_or_create_many(self):
+        group = self.create_group(project=self.project)
+        GroupHash.objects.create(project=self.project, hash='a' * 32, group=group)
+        GroupHash.objects.create(project=self.project, hash='b' * 32)
+
+        result = GroupHash.objects.get_or_create_many(
+            self.project, ['a' * 32, 'b' * 32, 'c' * 32, 'd' * 32])
+        assert result == [
+            (group.id, 'a' * 32),
+            (None, 'b' * 32),
+            (None, 'c' * 32),
+            (None, 'd' * 32),
+        ]
+        assert sorted(GroupHash.objects.filter(
+            project=self.project,
+        ).values_list('hash', flat=True)) == ['a' * 32, 'b' * 32, 'c' * 32, 'd' * 32]
+
+    def test_get_or_create_many_uses_cache(self):
+        group = self.create_group(project=self.project)
+        GroupHash.objects.create(project=self.project, hash='a' * 32, group=group)
+
+        assert GroupHash.objects.get_or_create_many(self.project, ['a' * 32]) == [
+            (group.id, 'a' * 32),
+        ]
+        with self.assertNumQueries(0):
+            assert GroupHash.objects.get_or_create_many(self.project, ['a' * 32]) == [
+                (group.id, 'a' * 32),
+            ]
+
+        GroupHash.objects.clear_cache_for_groups([group.id])
+        with self.assertNumQueries(1):
+            GroupHash.objects.get_or_create_many(self.project, ['a' * 32])
+
+    def test_get_or_create_many_does_not_cache_unassigned(self):
+        GroupHash.objects.get_or_create_many(self.project, ['a' * 32])
+        with self.assertNumQueries(1):
+            assert GroupHash.objects.get_or_create_many(self.project, ['a' * 32]) == [
+                (None, 'a' * 32),
+            ]
+
+    def test_delete_for_groups_clears_cache(self):
+        group = self.create_group(project=self.project)
+        GroupHash.objects.create(project=self.project, hash='a' * 32, group=group)
+        GroupHash.objects.get_or_create_many(self.project, ['a' * 32])
+
+        GroupHash.objects.delete_for_groups([group.id])
+        assert GroupHash.objects.get_or_create_many(self.project, ['a' * 32]) == [
+            (None, 'a' * 32),
+        ]
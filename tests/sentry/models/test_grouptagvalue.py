@@ -0,0 +1,75 @@
+from __future__ import absolute_import
+
+import mock
+
+from sentry.app import buffer
+from sentry.models import GroupTagValue
+from sentry.testutils import TestCase
+
+
+class GroupTagValueSummaryTest(TestCase):
+    def setUp(self):
+        self.group = self.create_group()
+        for key, values in (('foo', 'abcd'), ('bar', 'xy')):
+            for idx, value in enumerate(values):
+                GroupTagValue.objects.create(
+                    project=self.group.project,
+                    group=self.group,
+                    key=key,
+                    value=value,
+                    times_seen=idx + 1,
+                )
+
+    def test_matches_value_count_and_top_values(self):
+        summary = GroupTagValue.get_tag_summary(
+            self.group.id, ['foo', 'bar', 'baz'], limit=3,
+        )
+        for key in ('foo', 'bar'):
+            total, top_values = summary[key]
+            assert total == GroupTagValue.get_value_count(self.group.id, key)
+            assert top_values == GroupTagValue.get_top_values(self.group.id, key, limit=3)
+        assert summary['baz'] == (0, [])
+
+        assert [v.value for v in summary['foo'][1]] == ['d', 'c', 'b']
+        assert summary['foo'][0] == 10
+
+    def test_cached(self):
+        GroupTagValue.get_tag_summary(self.group.id, ['foo', 'bar'], limit=3)
+        with self.assertNumQueries(0):
+            summary = GroupTagValue.get_tag_summary(self.group.id, ['foo'], limit=2)
+        assert summary.keys() == ['foo']
+        assert [v.value for v in summary['foo'][1]] == ['d', 'c']
+
+        # a larger limit, or keys which weren't summarized, are queried again
+        with self.assertNumQueries(2):
+            GroupTagValue.get_tag_summary(self.group.id, ['foo'], limit=4)
+        with self.assertNumQueries(2):
+            GroupTagValue.get_tag_summary(self.group.id, ['baz'], limit=3)
+
+    def test_invalidated_by_buffer(self):
+        assert GroupTagValue.get_tag_summary(self.group.id, ['foo'])['foo'][0] == 10
+
+        buffer.process(GroupTagValue, {
+            'times_seen': 5,
+        }, {
+            'group_id': self.group.id,
+            'key': 'foo',
+            'value': 'a',
+        }, {
+            'project': self.group.project_id,
+        })
+
+        total, top_values = GroupTagValue.get_tag_summary(self.group.id, ['foo'])['foo']
+        assert total == 15
+        assert top_values[0].value == 'a'
+
+    def test_invalidated_once_per_batch(self):
+        other = self.create_group()
+        with mock.patch.object(GroupTagValue, 'clear_tag_summary_cache') as clear:
+            buffer.process_batch(GroupTagValue, [
+                ({'times_seen': 1}, {'group_id': group.id, 'key': 'foo', 'value': value},
+                 {'project': group.project_id})
+                for group in (self.group, other)
+                for value in 'ab'
+            ])
+        assert sorted(c[1][0] for c in clear.mock_calls) == sorted([self.group.id, other.id])
@@ -0,0 +1,36 @@
+from __future__ import absolute_import
+
+from sentry.models import TagKey, TagValue
+from sentry.testutils import TestCase
+from sentry.utils.cache import cache
+
+
+class TagValueManagerTest(TestCase):
+    def test_get_or_create_ids(self):
+        key_ids = TagKey.objects.get_or_create_ids(self.project, ['foo'])
+        value_ids = TagValue.objects.get_or_create_ids(
+            self.project, [('foo', 'bar')], key_ids)
+        assert value_ids == {
+            ('foo', 'bar'): TagValue.objects.get(key='foo', value='bar').id,
+        }
+
+        with self.assertNumQueries(0):
+            assert TagKey.objects.get_or_create_ids(self.project, ['foo']) == key_ids
+            assert TagValue.objects.get_or_create_ids(
+                self.project, [('foo', 'bar')], key_ids) == value_ids
+
+    def test_delete_clears_id_cache(self):
+        key_ids = TagKey.objects.get_or_create_ids(self.project, ['foo'])
+        value_ids = TagValue.objects.get_or_create_ids(
+            self.project, [('foo', 'bar')], key_ids)
+        key_cache_key = TagKey.objects._get_id_cache_key(self.project.id, 'foo')
+        value_cache_key = TagValue.objects._get_id_cache_key(
+            self.project.id, key_ids['foo'], 'bar')
+        assert cache.get(key_cache_key) == key_ids['foo']
+        assert cache.get(value_cache_key) == value_ids[('foo', 'bar')]
+
+        TagValue.objects.get(id=value_ids[('foo', 'bar')]).delete()
+        assert cache.get(value_cache_key) is None
+
+        TagKey.objects.get(id=key_ids['foo']).delete()
+        assert cache.get(key_cache_key) is None
@@ -70,6 +70,27 @@ class DjangoNodeStorageTest(TestCase):
             'foo': 'baz',
         }
 
+    def test_set_multi_existing(self):
+        Node.objects.create(
+            id='d2502ebbd7df41ceba8d3275595cac33',
+            data={
+                'foo': 'bar',
+            }
+        )
+        self.ns.chunk_size = 2
+        values = dict(
+            ('node-%d' % i, {'foo': i})
+            for i in range(3)
+        )
+        values['d2502ebbd7df41ceba8d3275595cac33'] = {'foo': 'baz'}
+
+        # one query to look for existing nodes and one to insert the new ones
+        # (within a savepoint) per chunk, and one update for the existing node
+        with self.assertNumQueries(9):
+            self.ns.set_multi(values)
+
+        assert self.ns.get_multi(list(values) + ['missing']) == values
+
     def test_create(self):
         node_id = self.ns.create({
             'foo': 'bar',
@@ -2,14 +2,19 @@
 
 from __future__ import absolute_import
 
+import mock
+
 from sentry.nodestore.base import NodeStorage
-from sentry.nodestore.multi.backend import MultiNodeStorage
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.nodestore.multi.backend import MultiNodeStorage, _STOP
 from sentry.testutils import TestCase
 
 
 class InMemoryBackend(NodeStorage):
-    def __init__(self):
-        self._data = {}
+    # the data is passed in, as the backend is thread local but is written to
+    # from other threads
+    def __init__(self, data):
+        self._data = data
 
     def set(self, id, data):
         self._data[id] = data
@@ -17,13 +22,22 @@ class InMemoryBackend(NodeStorage):
     def get(self, id):
         return self._data.get(id)
 
+    def delete(self, id):
+        self._data.pop(id, None)
+
+
+class BrokenBackend(InMemoryBackend):
+    def set(self, id, data):
+        raise ValueError(id)
+
 
 class MultiNodeStorageTest(TestCase):
     def setUp(self):
         self.ns = MultiNodeStorage([
-            (InMemoryBackend, {}),
-            (InMemoryBackend, {}),
+            (InMemoryBackend, {'data': {}}),
+            (InMemoryBackend, {'data': {}}),
         ])
+        self.addCleanup(self.ns.close)
 
     def test_basic_integration(self):
         node_id = self.ns.create({
@@ -80,3 +94,62 @@ class MultiNodeStorageTest(TestCase):
             assert backend.get(node_id2) == {
                 'foo': 'bir',
             }
+
+    def test_delete_multi(self):
+        self.ns.set_multi({'a': {'foo': 'bar'}, 'b': {'foo': 'baz'}})
+        self.ns.delete_multi(iter(['a', 'c']))
+        for backend in self.ns.backends:
+            assert backend.get('a') is None
+            assert backend.get('b') == {'foo': 'baz'}
+
+    def test_writes_all_backends_on_error(self):
+        for broken in 0, 1:
+            backends = [(InMemoryBackend, {'data': {}}), (InMemoryBackend, {'data': {}})]
+            backends[broken] = (BrokenBackend, {'data': {}})
+            ns = MultiNodeStorage(backends)
+            self.addCleanup(ns.close)
+
+            with self.assertRaises(ValueError):
+                ns.set('a', {'foo': 'bar'})
+            assert ns.backends[1 - broken].get('a') == {'foo': 'bar'}
+
+    def test_restarts_workers_after_fork(self):
+        self.ns.set('a', {'foo': 'bar'})
+        workers = self.ns.workers
+        assert len(workers) == 1
+
+        with mock.patch('os.getpid', return_value=-1):
+            self.ns.set('a', {'foo': 'baz'})
+            assert self.ns.workers is not workers
+            self.ns.close()
+        for backend in self.ns.backends:
+            assert backend.get('a') == {'foo': 'baz'}
+
+        # the workers of the parent process
+        for worker in workers:
+            worker.queue.put(_STOP)
+            worker.join()
+
+    def test_close(self):
+        self.ns.set('a', {'foo': 'bar'})
+        workers = self.ns.workers
+        self.ns.close()
+        assert self.ns.workers is None
+        for worker in workers:
+            assert not worker.is_alive()
+
+        # the workers are started again when needed
+        self.ns.set('a', {'foo': 'baz'})
+        assert len(self.ns.workers) == 1
+        for backend in self.ns.backends:
+            assert backend.get('a') == {'foo': 'baz'}
+
+    def test_django_backends_on_calling_thread(self):
+        ns = MultiNodeStorage([
+            (InMemoryBackend, {'data': {}}),
+            (DjangoNodeStorage, {}),
+        ])
+        self.addCleanup(ns.close)
+        ns.set('a', {'foo': 'bar'})
+        assert ns.workers == []
+        assert ns.backends[1].get('a') == {'foo': 'bar'}
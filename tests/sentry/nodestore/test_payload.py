@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import mock
+import pytest
+import six
+
+from datetime import date, datetime
+
+from sentry.nodestore import payload
+from sentry.nodestore.payload import FORMAT_PREFIX, NodePayload, decode, encode
+from sentry.testutils import TestCase
+from sentry.utils.compat import pickle
+from sentry.utils.strings import compress
+
+DATA = {
+    'message': u'h\xe9llo',
+    'platform': 'python',
+    'level': 40,
+    'sentry.interfaces.Exception': {
+        'values': [{'type': 'ValueError', 'value': None}],
+    },
+    'extra': {'bytes': b'\xff\x00', 'float': 1.5, 'nested': [[1, 2], {'a': True}]},
+    'tags': [(u'foo', u'bar')],
+}
+
+
+class NodePayloadTest(TestCase):
+    def test_round_trip(self):
+        value = encode(DATA)
+        assert value.startswith(FORMAT_PREFIX)
+
+        result = decode(value)
+        assert isinstance(result, NodePayload)
+        assert result == dict(DATA, tags=[[u'foo', u'bar']])
+        assert isinstance(result['message'], six.text_type)
+        assert isinstance(result['extra']['bytes'], six.binary_type)
+
+    def test_decodes_sections_lazily(self):
+        result = decode(encode(DATA))
+        with mock.patch.object(payload, '_unpack', wraps=payload._unpack) as unpack:
+            assert result['platform'] == 'python'
+            assert not unpack.called
+            assert result['extra']['float'] == 1.5
+            assert result['extra']['float'] == 1.5
+            assert unpack.call_count == 1
+
+            # sections which were not accessed are written as they are
+            value = encode(result)
+            assert unpack.call_count == 1
+
+        assert decode(value) == decode(encode(DATA))
+
+    def test_mutation(self):
+        result = decode(encode(DATA))
+        result['extra']['new'] = 1
+        result['release'] = 'abc'
+        del result['tags']
+
+        copy = result.copy()
+        assert copy == decode(encode(result))
+        assert copy['extra']['new'] == 1
+        assert 'tags' not in copy
+
+        assert pickle.loads(pickle.dumps(result)) == copy
+
+    def test_legacy(self):
+        assert decode(compress(pickle.dumps(DATA))) == DATA
+
+    def test_converted_types(self):
+        data = {'extra': {
+            'now': datetime(2016, 1, 1),
+            'day': date(2016, 1, 1),
+            'set': set([1]),
+        }}
+        value = encode(data)
+        assert value.startswith(FORMAT_PREFIX)
+        assert decode(value) == {'extra': {
+            'now': u'2016-01-01T00:00:00.000000Z',
+            'day': u'2016-01-01',
+            'set': [1],
+        }}
+
+    def test_unsupported_types(self):
+        with pytest.raises(TypeError):
+            encode({'extra': {'obj': object()}})
+        with pytest.raises(TypeError):
+            encode({'level': 2 ** 64})
@@ -0,0 +1,64 @@
+from __future__ import absolute_import
+
+from django.core.signals import request_finished
+
+from sentry.plugins import Plugin
+from sentry.plugins.base.manager import PluginManager
+from sentry.testutils import TestCase
+
+
+class ExamplePlugin(Plugin):
+    slug = 'example'
+    title = 'Example'
+
+    calls = 0
+
+    def is_enabled(self, project=None):
+        if project is not None:
+            ExamplePlugin.calls += 1
+        return super(ExamplePlugin, self).is_enabled(project)
+
+
+class PluginManagerForProjectTest(TestCase):
+    def setUp(self):
+        ExamplePlugin.calls = 0
+        self.manager = PluginManager([
+            '%s.%s' % (ExamplePlugin.__module__, ExamplePlugin.__name__),
+        ])
+        self.plugin = self.manager.get('example')
+        self.project = self.create_project()
+
+    def for_project(self, project):
+        return [p.slug for p in self.manager.for_project(project)]
+
+    def test_caches_enabled_plugins(self):
+        self.plugin.enable(self.project)
+        assert self.for_project(self.project) == ['example']
+        assert self.for_project(self.project) == ['example']
+        assert ExamplePlugin.calls == 1
+
+        other_project = self.create_project()
+        assert self.for_project(other_project) == []
+        assert ExamplePlugin.calls == 2
+
+    def test_invalidated_by_project_options(self):
+        assert self.for_project(self.project) == []
+        self.plugin.enable(self.project)
+        assert self.for_project(self.project) == ['example']
+        self.plugin.disable(self.project)
+        assert self.for_project(self.project) == []
+        assert ExamplePlugin.calls == 3
+
+    def test_invalidated_by_registration(self):
+        self.plugin.enable(self.project)
+        assert self.for_project(self.project) == ['example']
+        self.manager.update(list(self.manager.get_class_list()))
+        assert self.for_project(self.project) == ['example']
+        assert ExamplePlugin.calls == 2
+
+    def test_cleared_on_request_finished(self):
+        self.plugin.enable(self.project)
+        assert self.for_project(self.project) == ['example']
+        request_finished.send(sender=None)
+        assert self.for_project(self.project) == ['example']
+        assert ExamplePlugin.calls == 2
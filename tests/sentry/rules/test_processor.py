@@ -2,9 +2,12 @@
 
 from __future__ import absolute_import
 
+import mock
+
 from datetime import timedelta
 from django.utils import timezone
 
+from sentry.app import tsdb
 from sentry.models import GroupRuleStatus, Rule
 from sentry.plugins import plugins
 from sentry.testutils import TestCase
@@ -54,6 +57,40 @@ class RuleProcessorTest(TestCase):
         results = list(rp.apply())
         assert len(results) == 1
 
+    def test_batched(self):
+        event = self.create_event()
+
+        Rule.objects.filter(project=event.project).delete()
+        rules = [
+            Rule.objects.create(
+                project=event.project,
+                data={
+                    'conditions': [{
+                        'id': 'sentry.rules.conditions.event_frequency.EventFrequencyCondition',
+                        'interval': interval,
+                        'value': value,
+                    }],
+                    'actions': [{
+                        'id': 'sentry.rules.actions.notify_event.NotifyEventAction',
+                    }],
+                }
+            )
+            for interval, value in (('1h', 100), ('1h', 0), ('1d', 100))
+        ]
+        tsdb.incr(tsdb.models.group, event.group_id, count=10)
+
+        rp = RuleProcessor(event, is_new=True, is_regression=True, is_sample=False)
+        with mock.patch.object(tsdb, 'get_sums', wraps=tsdb.get_sums) as get_sums:
+            results = list(rp.apply())
+        assert [f.rule for f in results[0][1]] == [rules[1]]
+        # the rules over the same interval share their query
+        assert get_sums.call_count == 2
+        assert GroupRuleStatus.objects.filter(group=event.group).count() == 3
+
+        # the rules are cached and their statuses fetched with a single query
+        with self.assertNumQueries(1):
+            assert list(rp.apply()) == []
+
 
 class EventCompatibilityProxyTest(TestCase):
     def test_simple(self):
@@ -2,13 +2,71 @@
 
 from __future__ import absolute_import
 
-from sentry.models import Event, Group, GroupTagValue, TagValue, TagKey
-from sentry.runner.commands.cleanup import cleanup
+import mock
+
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from six.moves import queue
+
+from sentry.app import locks
+from sentry.db.deletion import BulkDeleteQuery
+from sentry.models import (
+    Event, File, FileBlob, FileBlobIndex, Group, GroupTagValue, TagValue, TagKey
+)
+from sentry.models.file import get_storage
+from sentry.runner.commands.cleanup import (
+    cleanup, cleanup_unused_files, get_checkpoint, get_checkpoint_key,
+    set_checkpoint,
+)
 from sentry.testutils import CliTestCase
 
 ALL_MODELS = (Event, Group, GroupTagValue, TagValue, TagKey)
 
 
+class InlineProcess(object):
+    """
+    Runs the target of a worker process when it is started, as the test
+    database can't be shared with other processes.
+    """
+    exitcode = 0
+
+    def __init__(self, target, args):
+        self.target = target
+        self.args = args
+
+    def start(self):
+        self.target(*self.args)
+
+    def is_alive(self):
+        return False
+
+    def join(self):
+        pass
+
+
+class LateQueue(object):
+    """
+    A queue on which the last message of every worker only arrives after
+    one ``get`` has timed out.
+    """
+    def __init__(self):
+        self.messages = []
+        self.late = []
+
+    def put(self, message):
+        if message[1] is None:
+            self.late.append(message)
+        else:
+            self.messages.append(message)
+
+    def get(self, timeout=None):
+        if not self.messages:
+            self.messages, self.late = self.late, []
+            raise queue.Empty
+        return self.messages.pop(0)
+
+
 class SentryCleanupTest(CliTestCase):
     fixtures = ['tests/fixtures/cleanup.json']
     command = cleanup
@@ -36,3 +94,127 @@ class SentryCleanupTest(CliTestCase):
 
         for model in ALL_MODELS:
             assert model.objects.count() == 0
+
+    @mock.patch('django.db.connections.all', mock.Mock(return_value=[]))
+    @mock.patch('multiprocessing.Process', InlineProcess)
+    def test_concurrency(self):
+        rv = self.invoke('--days=1', '--concurrency=3')
+        assert rv.exit_code == 0, rv.output
+        assert 'Deleted 10 Event' in rv.output
+        assert 'Deleted 4 Group' in rv.output
+
+        for model in ALL_MODELS:
+            assert model.objects.count() == 0
+
+    @mock.patch('django.db.connections.all', mock.Mock(return_value=[]))
+    @mock.patch('multiprocessing.Process', InlineProcess)
+    @mock.patch('multiprocessing.Queue', LateQueue)
+    def test_concurrency_late_results(self):
+        rv = self.invoke('--days=1', '--concurrency=3', '--model=Event')
+        assert rv.exit_code == 0, rv.output
+        assert 'Deleted 10 Event' in rv.output
+        assert Event.objects.count() == 0
+
+    def test_resumes_from_checkpoint(self):
+        ids = sorted(Event.objects.values_list('id', flat=True))
+        key = get_checkpoint_key(BulkDeleteQuery(
+            model=Event,
+            dtfield='datetime',
+            days=1,
+        ))
+        # the first partition was interrupted, the second one is done
+        set_checkpoint(key, [[ids[3], ids[5]], [ids[9] + 1, ids[9]]])
+
+        rv = self.invoke('--days=1', '--model=Event')
+        assert rv.exit_code == 0, rv.output
+        assert 'Resuming Event from checkpoint' in rv.output
+        assert 'Deleted 3 Event' in rv.output
+        assert get_checkpoint(key) is None
+
+        assert sorted(Event.objects.values_list('id', flat=True)) == \
+            ids[:3] + ids[6:]
+
+    def test_failure_keeps_checkpoint(self):
+        with mock.patch.object(BulkDeleteQuery, 'delete_ids', side_effect=Exception('boom')):
+            rv = self.invoke('--days=1', '--model=Group')
+        assert rv.exit_code == 1, rv.output
+        assert 'run cleanup again to resume' in rv.output
+
+        key = get_checkpoint_key(BulkDeleteQuery(
+            model=Group,
+            dtfield='last_seen',
+            days=1,
+        ))
+        assert get_checkpoint(key) is not None
+
+
+class CleanupUnusedFilesTest(CliTestCase):
+    command = cleanup
+
+    def create_blob(self, contents, days=2):
+        blob = FileBlob.from_file(ContentFile(contents))
+        blob.update(timestamp=timezone.now() - timedelta(days=days))
+        return blob
+
+    def setUp(self):
+        self.unused = [self.create_blob(b'unused %d' % i) for i in range(3)]
+        self.recent = self.create_blob(b'recent', days=0)
+
+        file = File.objects.create(name='foo.js', type='default')
+        self.indexed = self.create_blob(b'indexed')
+        FileBlobIndex.objects.create(file=file, blob=self.indexed, offset=0)
+        self.legacy = self.create_blob(b'legacy')
+        File.objects.create(name='bar.js', type='default', blob=self.legacy)
+
+    def assert_remaining(self, blobs):
+        assert sorted(FileBlob.objects.values_list('id', flat=True)) == \
+            sorted(b.id for b in blobs)
+
+    def test_simple(self):
+        # ids and unused blobs for each chunk of two blobs, but only the
+        # first two chunks have unused blobs to delete and check
+        with self.assertNumQueries(11):
+            assert cleanup_unused_files(quiet=True, chunk_size=2) == (
+                3, sum(b.size for b in self.unused),
+            )
+        self.assert_remaining([self.recent, self.indexed, self.legacy])
+
+        storage = get_storage()
+        assert not any(storage.exists(b.path) for b in self.unused)
+        assert storage.exists(self.indexed.path)
+
+    def test_skips_blobs_being_uploaded(self):
+        lock = locks.get('fileblob:upload:{}'.format(self.unused[0].checksum), duration=60)
+        with lock.acquire():
+            assert cleanup_unused_files(quiet=True) == (
+                2, sum(b.size for b in self.unused[1:]),
+            )
+        self.assert_remaining([self.unused[0], self.recent, self.indexed, self.legacy])
+        assert get_storage().exists(self.unused[0].path)
+
+    def test_rechecks_references(self):
+        get_lock = locks.get
+
+        # the blob gets referenced again after it was found to be unused
+        def referencing_get(key, *args, **kwargs):
+            if key == 'fileblob:upload:{}'.format(self.unused[0].checksum):
+                file = File.objects.create(name='baz.js', type='default')
+                FileBlobIndex.objects.create(file=file, blob=self.unused[0], offset=0)
+            return get_lock(key, *args, **kwargs)
+
+        with mock.patch.object(locks, 'get', side_effect=referencing_get):
+            assert cleanup_unused_files(quiet=True) == (
+                2, sum(b.size for b in self.unused[1:]),
+            )
+        self.assert_remaining([self.unused[0], self.recent, self.indexed, self.legacy])
+        assert get_storage().exists(self.unused[0].path)
+
+    def test_dry_run(self):
+        rv = self.invoke('--dry-run-files')
+        assert rv.exit_code == 0, rv.output
+        assert 'Found 3 unused FileBlob (%d bytes)' % sum(
+            b.size for b in self.unused) in rv.output
+
+        self.assert_remaining(self.unused + [self.recent, self.indexed, self.legacy])
+        storage = get_storage()
+        assert all(storage.exists(b.path) for b in self.unused)
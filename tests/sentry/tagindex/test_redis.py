@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import mock
+
+from datetime import timedelta
+from django.utils import timezone
+
+from sentry.models import Group, GroupTagKey, GroupTagValue, TagKey, TagKeyStatus
+from sentry.runner.commands.cleanup import delete_tag_index
+from sentry.tagindex.redis import RedisTagIndex
+from sentry.tasks.deletion import delete_tag_key
+from sentry.testutils import TestCase
+
+
+class RedisTagIndexTest(TestCase):
+    def setUp(self):
+        self.index = RedisTagIndex(capacity=3)
+
+    def test_records_new_groups_only(self):
+        self.index.record(1, [('foo', 'a'), ('bar', 'b')])
+        assert self.index.get_top_values(1, ['foo', 'bar'], 10) == {}
+
+        self.index.record(2, [('foo', 'a')], is_new=True)
+        self.index.record(2, [('foo', 'b'), ('bar', u'\xe9')])
+        self.index.record(2, [('foo', 'b')])
+
+        assert self.index.get_top_values(2, ['foo', 'bar', 'baz'], 10) == {
+            'foo': (3, [(u'b', 2), (u'a', 1)]),
+            'bar': (1, [(u'\xe9', 1)]),
+            'baz': (0, []),
+        }
+        assert self.index.get_top_values(2, ['foo'], 1) == {
+            'foo': (3, [(u'b', 2)]),
+        }
+        assert self.index.get_top_values(1, ['foo'], 10) == {}
+
+    def test_bounded(self):
+        self.index.record(1, [('foo', 'a')], is_new=True)
+        for value in 'aabbc':
+            self.index.record(1, [('foo', value)])
+        assert self.index.get_top_values(1, ['foo'], 10)['foo'] == (
+            6, [(u'a', 3), (u'b', 2), (u'c', 1)],
+        )
+
+        # new values replace the least seen value, with its count
+        self.index.record(1, [('foo', 'e')])
+        self.index.record(1, [('foo', 'f')])
+        assert self.index.get_top_values(1, ['foo'], 10)['foo'] == (
+            8, [(u'f', 3), (u'a', 3), (u'e', 2)],
+        )
+
+    def test_expired_values(self):
+        self.index.record(1, [('foo', 'a'), ('bar', 'b')], is_new=True)
+        self.index.get_client(1).delete(self.index.make_values_key(1, 'foo'))
+        assert list(self.index.get_top_values(1, ['foo', 'bar'], 10)) == ['bar']
+
+        # the counts of the key are incomplete for good
+        self.index.record(1, [('foo', 'a'), ('bar', 'b')])
+        assert self.index.get_top_values(1, ['foo', 'bar'], 10) == {
+            'bar': (2, [(u'b', 2)]),
+        }
+
+    def test_delete(self):
+        self.index.record(1, [('foo', 'a'), ('bar', 'b')], is_new=True)
+        self.index.delete(1, ['foo'])
+        self.index.record(1, [('foo', 'a')])
+        assert list(self.index.get_top_values(1, ['foo', 'bar'], 10)) == ['bar']
+
+        # groups which aren't indexed stay that way
+        self.index.delete(2, ['foo'])
+        self.index.record(2, [('foo', 'a')])
+        assert self.index.get_top_values(2, ['foo'], 10) == {}
+
+    def test_group_tag_summary(self):
+        group = self.create_group()
+
+        with mock.patch('sentry.app.tagindex', self.index), \
+                mock.patch('sentry.models.group.tagindex', self.index):
+            Group.objects.add_tags(group, [('foo', 'b')], is_new=True)
+            for value in 'abb':
+                Group.objects.add_tags(group, [('foo', value)])
+
+            # the tag values are still in the buffer
+            with self.assertNumQueries(1):
+                total, values = GroupTagValue.get_tag_summary(group.id, ['foo'])['foo']
+            assert total == 4
+            assert values == []
+
+            for value, times_seen in (('a', 1), ('b', 3)):
+                GroupTagValue.objects.create(
+                    project=group.project,
+                    group=group,
+                    key='foo',
+                    value=value,
+                    times_seen=times_seen,
+                )
+            GroupTagValue.clear_tag_summary_cache(group.id)
+
+            total, values = GroupTagValue.get_tag_summary(group.id, ['foo'])['foo']
+            assert total == 4
+            assert [(v.value, v.times_seen) for v in values] == [('b', 3), ('a', 1)]
+
+    def test_cleanup(self):
+        group = self.create_group(last_seen=timezone.now())
+        GroupTagValue.objects.create(
+            project=group.project,
+            group=group,
+            key='foo',
+            value='a',
+            last_seen=timezone.now() - timedelta(days=31),
+        )
+        self.index.record(group.id, [('foo', 'a'), ('bar', 'b')], is_new=True)
+
+        with mock.patch('sentry.app.tagindex', self.index):
+            delete_tag_index(30)
+        assert list(self.index.get_top_values(group.id, ['foo', 'bar'], 10)) == ['bar']
+
+    def test_delete_tag_key(self):
+        group = self.create_group()
+        tagkey = TagKey.objects.create(
+            project=group.project,
+            key='foo',
+            status=TagKeyStatus.PENDING_DELETION,
+        )
+        GroupTagKey.objects.create(project=group.project, group=group, key='foo')
+        self.index.record(group.id, [('foo', 'a'), ('bar', 'b')], is_new=True)
+
+        with mock.patch('sentry.app.tagindex', self.index):
+            with self.tasks():
+                delete_tag_key(object_id=tagkey.id)
+        assert list(self.index.get_top_values(group.id, ['foo', 'bar'], 10)) == ['bar']
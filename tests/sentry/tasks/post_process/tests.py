@@ -2,12 +2,15 @@
 
 from __future__ import absolute_import
 
-from mock import Mock, patch
+from mock import Mock, call, patch
 
 from sentry.models import EventTag, TagKey, TagValue
 from sentry.testutils import TestCase
 from sentry.tasks.merge import merge_group
-from sentry.tasks.post_process import index_event_tags, post_process_group
+from sentry.tasks.post_process import (
+    index_event_tags, index_event_tags_batch, post_process_group,
+    queue_event_tags
+)
 
 
 class PostProcessGroupTest(TestCase):
@@ -122,3 +125,95 @@ class IndexEventTagsTest(TestCase):
             event_id=event.id,
         )
         assert queryset.count() == 2
+
+
+class IndexEventTagsBatchTest(TestCase):
+    def test_simple(self):
+        group = self.create_group(project=self.project)
+        event1 = self.create_event(group=group)
+        event2 = self.create_event(group=group, event_id='b' * 32)
+        other_project = self.create_project()
+        event3 = self.create_event(group=self.create_group(project=other_project),
+                                   event_id='c' * 32)
+        TagKey.objects.create(project=self.project, key='foo')
+
+        items = [{
+            'organization_id': self.project.organization_id,
+            'project_id': self.project.id,
+            'group_id': group.id,
+            'event_id': event1.id,
+            'tags': [('foo', 'bar'), ('biz', 'baz')],
+        }, {
+            'organization_id': self.project.organization_id,
+            'project_id': self.project.id,
+            'group_id': group.id,
+            'event_id': event2.id,
+            'tags': [('foo', 'bar'), ('foo', 'bar'), ('foo', 'qux')],
+        }, {
+            'organization_id': other_project.organization_id,
+            'project_id': other_project.id,
+            'group_id': event3.group_id,
+            'event_id': event3.id,
+            'tags': [('foo', 'bar')],
+        }]
+
+        with self.tasks():
+            index_event_tags_batch.delay(items=items)
+
+        def get_tags(event):
+            return set(
+                (TagKey.objects.get(id=key_id).key, TagValue.objects.get(id=value_id).value)
+                for key_id, value_id in EventTag.objects.filter(
+                    event_id=event.id,
+                ).values_list('key_id', 'value_id')
+            )
+
+        assert get_tags(event1) == set([('foo', 'bar'), ('biz', 'baz')])
+        assert get_tags(event2) == set([('foo', 'bar'), ('foo', 'qux')])
+        assert get_tags(event3) == set([('foo', 'bar')])
+        assert EventTag.objects.get(event_id=event3.id).project_id == other_project.id
+        assert TagKey.objects.filter(key='foo').count() == 2
+        assert TagValue.objects.filter(key='foo', value='bar').count() == 2
+
+        # ids are cached, and replaying the batch is safe
+        with self.tasks(), self.assertNumQueries(4):
+            index_event_tags_batch.delay(items=items)
+        assert EventTag.objects.count() == 5
+
+    @patch('sentry.tasks.post_process.index_event_tags')
+    @patch('sentry.tasks.post_process._index_event_tags')
+    def test_failed_batch_falls_back_to_single_events(self, _index_event_tags,
+                                                      index_event_tags):
+        _index_event_tags.side_effect = Exception('boom')
+        items = [{
+            'organization_id': self.project.organization_id,
+            'project_id': self.project.id,
+            'group_id': 1,
+            'event_id': event_id,
+            'tags': [('foo', 'bar')],
+        } for event_id in (2, 3)]
+
+        with self.tasks():
+            index_event_tags_batch.delay(items=items)
+        assert index_event_tags.delay.call_args_list == [
+            call(**item) for item in items
+        ]
+
+    @patch('sentry.tasks.post_process.index_event_tags_batch')
+    def test_queue_event_tags(self, index_event_tags_batch):
+        item = {
+            'organization_id': self.project.organization_id,
+            'project_id': self.project.id,
+            'group_id': 1,
+            'event_id': 2,
+            'tags': [('foo', 'bar')],
+        }
+        queue_event_tags(**item)
+        index_event_tags_batch.delay.assert_called_once_with(items=[item])
+
+        index_event_tags_batch.reset_mock()
+        with self.settings(SENTRY_EVENT_TAG_BATCH_INTERVAL=3600), \
+                patch('sentry.tasks.post_process.event_tag_aggregator') as aggregator:
+            queue_event_tags(**item)
+        aggregator.add.assert_called_once_with(item)
+        assert not index_event_tags_batch.delay.called
@@ -1,7 +1,9 @@
 from __future__ import absolute_import
 
+import mock
 import pytest
 
+from sentry.app import nodestore
 from sentry.constants import ObjectStatus
 from sentry.exceptions import DeleteAborted
 from sentry.models import (
@@ -245,6 +247,33 @@ class DeleteGroupTest(TestCase):
         assert not EventTag.objects.filter(event_id=event.id).exists()
         assert not GroupRedirect.objects.filter(group_id=group.id).exists()
 
+    def test_deletes_nodes_in_bulk(self):
+        group = self.create_group(status=GroupStatus.PENDING_DELETION)
+        events = [self.create_event(group=group) for _ in range(3)]
+        node_ids = [e.data.id for e in events]
+        assert nodestore.get_multi(node_ids)
+
+        remaining_events = []
+
+        def delete_multi(id_list):
+            # the nodes go first, the events still exist
+            remaining_events.append(Event.objects.filter(group_id=group.id).count())
+            return original_delete_multi(id_list)
+
+        original_delete_multi = nodestore.delete_multi
+        with mock.patch.object(type(nodestore), 'delete') as delete, \
+                mock.patch.object(type(nodestore), 'delete_multi',
+                                  side_effect=delete_multi) as delete_multi_mock:
+            with self.tasks():
+                delete_group(object_id=group.id)
+
+        assert not delete.called
+        assert delete_multi_mock.call_count == 1
+        assert sorted(delete_multi_mock.call_args[0][0]) == sorted(node_ids)
+        assert remaining_events == [3]
+        assert nodestore.get_multi(node_ids) == {}
+        assert not Event.objects.filter(group_id=group.id).exists()
+
 
 class GenericDeleteTest(TestCase):
     def test_does_not_delete_visible(self):
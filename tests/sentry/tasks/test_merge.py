@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 
+import mock
+
 from collections import defaultdict
 
-from sentry.tasks.merge import merge_group, rehash_group_events
-from sentry.models import Event, Group, GroupMeta, GroupRedirect, GroupTagKey, GroupTagValue
+from sentry.tasks.merge import merge_group, merge_objects, rehash_group_events
+from sentry.models import (
+    Event, Group, GroupHash, GroupMeta, GroupRedirect, GroupTagKey, GroupTagValue
+)
 from sentry.testutils import TestCase
 
 
@@ -53,6 +57,26 @@ class MergeGroupTest(TestCase):
             group_id=groups[2].id,
         ).count() == 2
 
+    def test_merge_clears_hash_cache_after_moving_hashes(self):
+        project = self.create_project()
+        group1 = self.create_group(project)
+        group2 = self.create_group(project)
+        GroupHash.objects.create(project=project, hash='a' * 32, group=group1)
+
+        def merge_and_resolve(*args, **kwargs):
+            # an event looked the hash up before it was moved, and caches
+            # the old group
+            GroupHash.objects.get_or_create_many(project, ['a' * 32])
+            return merge_objects(*args, **kwargs)
+
+        with mock.patch('sentry.tasks.merge.merge_objects', side_effect=merge_and_resolve):
+            with self.tasks():
+                merge_group(group1.id, group2.id)
+
+        assert GroupHash.objects.get_or_create_many(project, ['a' * 32]) == [
+            (group2.id, 'a' * 32),
+        ]
+
     def test_merge_updates_tag_values_seen(self):
         project = self.create_project()
         target, other = [self.create_group(project) for _ in range(0, 2)]
@@ -18,7 +18,7 @@ from sentry.event_manager import (
     generate_culprit, md5_from_hash
 )
 from sentry.models import (
-    Activity, Event, Group, GroupRelease, GroupResolution, GroupStatus,
+    Activity, Event, Group, GroupHash, GroupRelease, GroupResolution, GroupStatus,
     EventMapping, Release
 )
 from sentry.testutils import TestCase, TransactionTestCase
@@ -225,6 +225,28 @@ class EventManagerTest(TransactionTestCase):
         assert group.last_seen.replace(microsecond=0) == event.datetime.replace(microsecond=0)
         assert group.message == event2.message
 
+    def test_updates_group_with_stale_hash_cache(self):
+        manager = EventManager(self.make_event(
+            message='foo', event_id='a' * 32,
+            checksum='a' * 32,
+        ))
+        event = manager.save(1)
+        # looking up the (now assigned) hash again caches its group
+        assert manager._find_hashes(event.project, ['a' * 32]) == [(event.group_id, 'a' * 32)]
+
+        # the group was merged into another one, while the hash still points
+        # to the old group in the cache
+        other_group = self.create_group(project=event.project)
+        GroupHash.objects.filter(group=event.group_id).update(group=other_group)
+        Group.objects.filter(id=event.group_id).delete()
+
+        manager = EventManager(self.make_event(
+            message='foo bar', event_id='b' * 32,
+            checksum='a' * 32,
+        ))
+        event2 = manager.save(1)
+        assert event2.group_id == other_group.id
+
     def test_differentiates_with_fingerprint(self):
         manager = EventManager(self.make_event(
             message='foo', event_id='a' * 32,
@@ -6,7 +6,7 @@ import pytz
 from datetime import datetime, timedelta
 
 from sentry.testutils import TestCase
-from sentry.tsdb.base import BaseTSDB, ONE_MINUTE, ONE_HOUR, ONE_DAY
+from sentry.tsdb.base import BaseTSDB, TSDBModel, ONE_MINUTE, ONE_HOUR, ONE_DAY
 from sentry.utils.dates import to_timestamp
 
 
@@ -43,6 +43,39 @@ class BaseTSDBTest(TestCase):
             [1368889200, 15], [1368892800, 7]
         ]
 
+    def test_batch(self):
+        timestamp = datetime(2013, 5, 18, 15, 13, 58, 132928, tzinfo=pytz.UTC)
+        other = timestamp + timedelta(hours=1)
+        self.tsdb.incr_multi = mock.Mock()
+        self.tsdb.record_multi = mock.Mock()
+        self.tsdb.record_frequency_multi = mock.Mock()
+
+        with self.tsdb.batch(timestamp) as batch:
+            batch.incr(TSDBModel.project, 1)
+            batch.incr_multi([(TSDBModel.group, 2)], other, count=2)
+            batch.record(TSDBModel.users_affected_by_group, 2, ('foo',))
+            batch.record_frequency_multi([
+                (TSDBModel.frequent_environments_by_group, {2: {3: 1}}),
+            ])
+            assert not self.tsdb.incr_multi.called
+
+        assert self.tsdb.incr_multi.mock_calls == [
+            mock.call([(TSDBModel.project, 1)], timestamp, 1),
+            mock.call([(TSDBModel.group, 2)], other, 2),
+        ]
+        self.tsdb.record_multi.assert_called_once_with(
+            [(TSDBModel.users_affected_by_group, 2, ('foo',))], timestamp)
+        self.tsdb.record_frequency_multi.assert_called_once_with(
+            [(TSDBModel.frequent_environments_by_group, {2: {3: 1}})], timestamp)
+
+    def test_batch_discarded_on_error(self):
+        self.tsdb.flush_batch = mock.Mock()
+        with self.assertRaises(ValueError):
+            with self.tsdb.batch() as batch:
+                batch.incr(TSDBModel.project, 1)
+                raise ValueError
+        assert not self.tsdb.flush_batch.called
+
     def test_calculate_expiry(self):
         timestamp = datetime(2013, 5, 18, 15, 13, 58, 132928, tzinfo=pytz.UTC)
         result = self.tsdb.calculate_expiry(10, 30, timestamp)
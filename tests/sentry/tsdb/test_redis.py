@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import mock
 import pytz
 
 from datetime import (
@@ -327,3 +328,66 @@ class RedisTSDBTest(TestCase):
                 "project:1": 0.0,
             },
         }
+
+    def test_batch(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        timestamp = int(to_timestamp(now))
+        timestamp = timestamp - (timestamp % 3600)
+
+        with mock.patch.object(
+            self.db.cluster, 'execute_commands',
+            wraps=self.db.cluster.execute_commands,
+        ) as execute_commands:
+            with self.db.batch(now) as batch:
+                batch.incr_multi([
+                    (TSDBModel.project, 1),
+                    (TSDBModel.group, 2),
+                ])
+                batch.incr(TSDBModel.project, 1, count=2)
+                batch.record_multi([
+                    (TSDBModel.users_affected_by_group, 2, ('foo', 'bar')),
+                ])
+                batch.record_frequency_multi([
+                    (TSDBModel.frequent_environments_by_group, {
+                        2: {3: 1},
+                    }),
+                ])
+            assert execute_commands.call_count == 1
+
+        assert self.db.get_range(TSDBModel.project, [1], now, now, rollup=3600) == {
+            1: [(timestamp, 3)],
+        }
+        assert self.db.get_range(TSDBModel.group, [2], now, now, rollup=3600) == {
+            2: [(timestamp, 1)],
+        }
+        assert self.db.get_distinct_counts_totals(
+            TSDBModel.users_affected_by_group, [2], now, now, rollup=3600,
+        ) == {2: 2}
+        assert self.db.get_most_frequent(
+            TSDBModel.frequent_environments_by_group, [2], now, now, rollup=3600,
+        ) == {2: [('3', 1.0)]}
+
+    def test_get_range_many_keys(self):
+        # 14 days of hourly buckets (as requested by the stream)
+        self.db = RedisTSDB(rollups=((ONE_HOUR, 24 * 15),), vnodes=64)
+        end = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start = end - timedelta(days=14)
+        keys = range(100)
+
+        for key in keys:
+            self.db.incr(TSDBModel.group, key, end - timedelta(hours=key), count=key)
+            self.db.incr(TSDBModel.group, key, start, count=1)
+
+        rollup, series = self.db.get_optimal_rollup_series(start, end, ONE_HOUR)
+        assert len(series) == 337
+
+        results = self.db.get_range(TSDBModel.group, keys, start, end, rollup=ONE_HOUR)
+        assert sorted(results) == keys
+        for key in keys:
+            expected = {float(ts): 0 for ts in series}
+            expected[float(series[0])] += 1
+            expected[float(series[-1 - key])] += key
+            assert results[key] == sorted(expected.items())
+
+        sums = self.db.get_sums(TSDBModel.group, keys, start, end, rollup=ONE_HOUR)
+        assert sums == {key: key + 1 for key in keys}
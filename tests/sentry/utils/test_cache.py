@@ -0,0 +1,120 @@
+from __future__ import absolute_import
+
+import mock
+
+from sentry.models import Environment, Project
+from sentry.testutils import TestCase
+from sentry.utils.cache import LocalCache, cache
+
+
+class LocalCacheTest(TestCase):
+    def test_reads_through_shared_cache(self):
+        local_cache = LocalCache('test')
+        cache.set('foo', 'bar', 60)
+
+        assert local_cache.get('foo') == 'bar'
+        cache.delete('foo')
+        assert local_cache.get('foo') == 'bar'
+
+        local_cache.delete('foo')
+        assert local_cache.get('foo') is None
+
+    def test_set(self):
+        local_cache = LocalCache('test')
+        local_cache.set('foo', 'bar', 60)
+        assert cache.get('foo') == 'bar'
+        assert local_cache.get_local('foo') == 'bar'
+
+    def test_expires(self):
+        local_cache = LocalCache('test')
+        with mock.patch('sentry.utils.cache.time', return_value=1000):
+            local_cache.set('foo', 'bar', 60)
+        cache.delete('foo')
+
+        with mock.patch('sentry.utils.cache.time', return_value=1005):
+            assert local_cache.get('foo') == 'bar'
+        with mock.patch('sentry.utils.cache.time', return_value=1011):
+            assert local_cache.get('foo') is None
+
+        # the shared timeout is respected as well
+        with mock.patch('sentry.utils.cache.time', return_value=1000):
+            local_cache.set_local('foo', 'bar', 2)
+        with mock.patch('sentry.utils.cache.time', return_value=1003):
+            assert local_cache.get_local('foo') is None
+
+    def test_bounded(self):
+        local_cache = LocalCache('test')
+        with self.settings(SENTRY_LOCAL_CACHE_SIZE=2):
+            local_cache.set_local('a', 1)
+            local_cache.set_local('b', 2)
+            assert local_cache.get_local('a') == 1
+            local_cache.set_local('c', 3)
+
+        assert len(local_cache) == 2
+        assert local_cache.get_local('a') == 1
+        assert local_cache.get_local('b') is None
+        assert local_cache.get_local('c') == 3
+
+    def test_disabled(self):
+        local_cache = LocalCache('test')
+        with self.settings(SENTRY_LOCAL_CACHE_TTL=0):
+            local_cache.set('foo', 'bar', 60)
+        assert len(local_cache) == 0
+        assert cache.get('foo') == 'bar'
+
+    def test_invalidated_on_save(self):
+        project = self.create_project()
+        local_cache = LocalCache('test', model=Environment)
+        env = Environment.objects.create(project_id=project.id, name='prod')
+        local_cache.set_local('env', env)
+
+        # instances are copied, so callers can't change cached values
+        cached_env = local_cache.get_local('env')
+        assert cached_env == env
+        assert cached_env is not env
+        cached_env.name = 'staging'
+        assert local_cache.get_local('env').name == 'prod'
+
+        Environment.objects.create(project_id=project.id, name='staging')
+        assert local_cache.get_local('env') is not None
+
+        env.save()
+        assert local_cache.get_local('env') is None
+
+    @mock.patch('sentry.utils.metrics.incr')
+    def test_stats(self, incr):
+        local_cache = LocalCache('test')
+        local_cache.set('foo', 'bar', 60)
+        local_cache.get('foo')
+        local_cache.get('baz')
+        assert not incr.called
+
+        local_cache.last_stats_flush = 0
+        local_cache.get('foo')
+        assert sorted(c[0] + (c[1]['amount'],) for c in incr.call_args_list) == [
+            ('cache.local.hit', 2),
+            ('cache.local.miss', 1),
+            ('cache.shared.miss', 1),
+        ]
+        assert all(c[1]['tags'] == {'cache': 'test'} for c in incr.call_args_list)
+
+
+class ModelLocalCacheTest(TestCase):
+    def test_project_get_from_cache(self):
+        project = self.create_project()
+        assert Project.objects.get_from_cache(id=project.id) == project
+
+        cache.clear()
+        with self.assertNumQueries(0):
+            assert Project.objects.get_from_cache(id=project.id) == project
+
+        project.update(name='foo')
+        assert Project.objects.get_from_cache(id=project.id).name == 'foo'
+
+    def test_environment_get_or_create(self):
+        project = self.create_project()
+        env = Environment.get_or_create(project=project, name='prod')
+
+        cache.clear()
+        with self.assertNumQueries(0):
+            assert Environment.get_or_create(project=project, name='prod') == env
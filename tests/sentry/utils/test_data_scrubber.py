@@ -4,7 +4,9 @@ from __future__ import absolute_import
 
 from sentry.constants import FILTER_MASK
 from sentry.testutils import TestCase
-from sentry.utils.data_scrubber import SensitiveDataFilter
+from sentry.utils.data_scrubber import (
+    SensitiveDataFilter, compile_fields, varmap
+)
 
 
 VARS = {
@@ -355,3 +357,66 @@ class SensitiveDataFilterTest(TestCase):
         proc = SensitiveDataFilter(exclude_fields=['foobar'])
         proc.apply(data)
         assert data['extra'] == {'foobar': '123-45-6789'}
+
+    def test_compiled_fields_are_shared(self):
+        proc = SensitiveDataFilter(fields=['foo'], include_defaults=False)
+        assert proc.fields_re is SensitiveDataFilter(
+            fields=['foo'], include_defaults=False).fields_re
+        assert proc.sanitize('xfoox', 'bar') == FILTER_MASK
+        assert proc.sanitize('bar', 'xFOOx') == FILTER_MASK
+        assert proc.sanitize('bar', 'baz') == 'baz'
+
+        proc = SensitiveDataFilter(fields=['a.b'], include_defaults=False)
+        assert proc.sanitize('axb', 'bar') == 'bar'
+        assert proc.sanitize('a.b', 'bar') == FILTER_MASK
+
+    def test_without_fields(self):
+        assert compile_fields([]) is None
+        proc = SensitiveDataFilter(include_defaults=False)
+        assert proc.sanitize('password', 'hello') == 'hello'
+
+
+class VarmapTest(TestCase):
+    def func(self, key, value):
+        return (key, value)
+
+    def test_simple(self):
+        data = {
+            'foo': 'bar',
+            'list': [1, {'baz': 2}],
+            'pairs': [('a', 1), ['b', {'c': 3}]],
+            'tuple': (4, 5, 6),
+        }
+        result = varmap(self.func, data)
+        assert result is data
+        assert result == {
+            'foo': ('foo', 'bar'),
+            'list': [('list', 1), {'baz': ('baz', 2)}],
+            'pairs': [['a', ('a', 1)], ['b', {'c': ('c', 3)}]],
+            'tuple': [('tuple', 4), ('tuple', 5), ('tuple', 6)],
+        }
+
+    def test_scalar(self):
+        assert varmap(self.func, 1, name='foo') == ('foo', 1)
+
+    def test_recursive(self):
+        data = {'foo': 'bar'}
+        data['self'] = data
+        varmap(self.func, data)
+        assert data == {'foo': ('foo', 'bar'), 'self': ('self', '<...>')}
+
+    def test_shared_values(self):
+        shared = {'foo': 'bar'}
+        data = {'a': shared, 'b': [shared]}
+        varmap(lambda k, v: v.upper(), data)
+        assert data == {'a': {'foo': 'BAR'}, 'b': [{'foo': 'BAR'}]}
+
+    def test_deeply_nested(self):
+        data = value = {}
+        for _ in range(5000):
+            value['child'] = {}
+            value = value['child']
+        value['foo'] = 'bar'
+
+        varmap(self.func, data)
+        assert value == {'foo': ('foo', 'bar')}
@@ -3,7 +3,14 @@ from __future__ import absolute_import
 import mock
 import pytest
 
-from sentry.utils.metrics import timer
+from datetime import timedelta
+from django.utils import timezone
+from six.moves.queue import Full
+
+from sentry.app import tsdb
+from sentry.testutils import TestCase
+from sentry.utils import metrics
+from sentry.utils.metrics import MetricsPipeline, pipeline, timer
 
 
 def test_timer_success():
@@ -38,3 +45,92 @@ def test_timer_failure():
             'foo': True,
             'result': 'failure',
         }
+
+
+class MetricsPipelineTest(TestCase):
+    def setUp(self):
+        self.pipeline = MetricsPipeline(interval=60)
+        self.addCleanup(self.pipeline.shutdown)
+
+    def get_internal_sums(self, keys):
+        now = timezone.now()
+        return tsdb.get_sums(
+            tsdb.models.internal, keys, now - timedelta(minutes=1), now,
+        )
+
+    @mock.patch('sentry.utils.metrics.backend')
+    def test_aggregates(self, backend):
+        self.pipeline.incr('foo', tags={'a': 'b'})
+        self.pipeline.incr('foo', amount=2, tags={'a': 'b'})
+        self.pipeline.incr('foo', instance='bar')
+        self.pipeline.timing('baz', 1.5, tags={'a': 'b'})
+        self.pipeline.timing('baz', 2.5)
+        assert not backend.incr.called
+
+        with mock.patch.object(tsdb, 'incr_multi', wraps=tsdb.incr_multi) as incr_multi:
+            self.pipeline.shutdown()
+        assert incr_multi.call_count == 2
+
+        assert self.get_internal_sums(['foo', 'foo.bar']) == {
+            'foo': 3,
+            'foo.bar': 1,
+        }
+        assert sorted(backend.incr.call_args_list) == sorted([
+            mock.call('foo', None, {'a': 'b'}, 3, 1),
+            mock.call('foo', 'bar', {}, 1, 1),
+        ])
+        assert backend.timing.call_args_list == [
+            mock.call('baz', 1.5, None, {'a': 'b'}, 1.0),
+            mock.call('baz', 2.5, None, {}, 1.0),
+        ]
+
+    @mock.patch('sentry.utils.metrics.backend')
+    def test_drops_when_full(self, backend):
+        self.pipeline.incr('foo')
+        with mock.patch.object(self.pipeline.queue, 'put_nowait', side_effect=Full):
+            self.pipeline.incr('foo')
+            self.pipeline.timing('bar', 1)
+        self.pipeline.shutdown()
+
+        assert self.get_internal_sums(['foo', 'metrics.dropped']) == {
+            'foo': 1,
+            'metrics.dropped': 2,
+        }
+        assert not backend.timing.called
+
+    @mock.patch('atexit.register')
+    def test_restarts_after_shutdown(self, register):
+        self.pipeline.incr('foo')
+        thread = self.pipeline._thread
+        self.pipeline.shutdown()
+        assert not thread.is_alive()
+
+        self.pipeline.incr('foo')
+        assert self.pipeline._thread is not thread
+        self.pipeline.shutdown()
+
+        assert self.get_internal_sums(['foo']) == {'foo': 2}
+        assert register.call_count == 1
+
+    def test_sampled(self):
+        with self.settings(SENTRY_METRICS_FLUSH_INTERVAL=10,
+                           SENTRY_METRICS_SAMPLE_RATE=0.5), \
+                mock.patch.object(pipeline, 'incr') as incr:
+            with mock.patch('sentry.utils.metrics.random', return_value=0.4):
+                metrics.incr('foo')
+            assert not incr.called
+
+            with mock.patch('sentry.utils.metrics.random', return_value=0.6):
+                metrics.incr('foo')
+            incr.assert_called_once_with('foo', 2, None, None)
+
+    def test_synchronous(self):
+        with mock.patch.object(pipeline, 'incr') as incr:
+            metrics.incr('foo')
+        assert not incr.called
+        assert self.get_internal_sums(['foo']) == {'foo': 1}
+
+        with self.settings(SENTRY_METRICS_FLUSH_INTERVAL=10), \
+                mock.patch.object(pipeline, 'incr') as incr:
+            metrics.incr('foo', instance='bar')
+        incr.assert_called_once_with('foo', 1, 'bar', None)
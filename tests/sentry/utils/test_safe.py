@@ -1,11 +1,61 @@
+# -*- coding: utf-8 -*-
+
 from __future__ import absolute_import
 
+import mock
+import six
+
+from django.utils.encoding import force_text
+
+from sentry.interfaces.stacktrace import handle_nan
 from sentry.testutils import TestCase
 from sentry.utils.safe import safe_execute, trim, trim_dict
+from sentry.utils.strings import truncatechars
 
 a_very_long_string = 'a' * 1024
 
 
+def legacy_trim(value, max_size=512, max_depth=3, object_hook=None,
+                _depth=0, _size=0):
+    # the previous implementation, which converted every trimmed item to
+    # text to measure it
+    options = {
+        'max_depth': max_depth,
+        'max_size': max_size,
+        'object_hook': object_hook,
+        '_depth': _depth + 1,
+    }
+
+    if _depth > max_depth:
+        return legacy_trim(repr(value), _size=_size, max_size=max_size)
+    elif isinstance(value, dict):
+        result = {}
+        _size += 2
+        for k, v in six.iteritems(value):
+            trim_v = legacy_trim(v, _size=_size, **options)
+            result[k] = trim_v
+            _size += len(force_text(trim_v)) + 1
+            if _size >= max_size:
+                break
+    elif isinstance(value, (list, tuple)):
+        result = []
+        _size += 2
+        for v in value:
+            trim_v = legacy_trim(v, _size=_size, **options)
+            result.append(trim_v)
+            _size += len(force_text(trim_v))
+            if _size >= max_size:
+                break
+    elif isinstance(value, six.string_types):
+        result = truncatechars(value, max_size - _size)
+    else:
+        result = value
+
+    if object_hook is None:
+        return result
+    return object_hook(result)
+
+
 class TrimTest(TestCase):
     def test_simple_string(self):
         assert trim(a_very_long_string) == a_very_long_string[:509] + '...'
@@ -19,6 +69,34 @@ class TrimTest(TestCase):
         assert trim({'x': '\xc3\xbc'}) == {'x': '\xc3\xbc'}
         assert trim(['x', '\xc3\xbc']) == ['x', '\xc3\xbc']
 
+    def test_matches_legacy_implementation(self):
+        values = [
+            {'a': [1, 2.5, 1.0 / 3, 10 ** 20, True, None], 'b': {'c': 'd' * 100}},
+            [u'ünïcödé' * 20, 'bytes\xc3\xbc', {u'k\xfc': [[], {}, ()]}],
+            dict(('key%d' % i, {'nested': ['x' * i, i, float(i)]}) for i in range(50)),
+            [[[[['too deep', {'a': 1}]]]], {'b': [{'c': [{'d': 'e'}]}]}],
+            [(1, 2), ('a', {'b': 'c'})] * 30,
+            {'inf': float('inf'), 'nan': [float('nan'), float('-inf')], 'n': 1},
+            {'a': 'x' * 1000},
+            [],
+            {},
+        ]
+        for value in values:
+            for max_size in (10, 64, 512, 4096):
+                assert trim(value, max_size=max_size) == \
+                    legacy_trim(value, max_size=max_size)
+                assert repr(trim(value, max_size=max_size, object_hook=handle_nan)) == \
+                    repr(legacy_trim(value, max_size=max_size, object_hook=handle_nan))
+
+    def test_containers_are_not_converted_to_text(self):
+        value = {'a': [{'b': ['c' * 10] * 10}] * 10, 'd': [1, 2, 3]}
+        with mock.patch('sentry.utils.safe.force_text', side_effect=force_text) as m:
+            assert trim(value, max_size=4096) == legacy_trim(value, max_size=4096)
+        assert not [
+            args for args, _ in m.call_args_list
+            if isinstance(args[0], (dict, list, tuple))
+        ]
+
 
 class TrimDictTest(TestCase):
     def test_large_dict(self):